@@ -0,0 +1,108 @@
+"""
+Paridade e latência do motor de árvores compilado.
+
+Treina os ensembles do grid de experimentos em Outubro, compila com
+`comum.arvores.compilar` e:
+  1. confere que `predict_proba` bate com o do modelo original em
+     `dados/outubro_2025.csv` e `dados/novembro_2025.csv` (falha se divergir);
+  2. mede a latência por chamada para vários tamanhos de lote.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_arvores.py
+    python benchmarks/bench_arvores.py producao/models/<versao>-<run>/modelo.pkl
+"""
+import pickle
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+from comum.arvores import compilar
+from comum.features import FEATURES
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+TAMANHOS_LOTE = [1, 16, 256, 4096]
+TOLERANCIA = 1e-5
+
+
+def modelos_referencia(X, y):
+    modelos = {
+        "RandomForest (n=500, depth=20)": RandomForestClassifier(n_estimators=500, max_depth=20, random_state=42),
+        "GradientBoosting (n=300, lr=0.1)": GradientBoostingClassifier(n_estimators=300, learning_rate=0.1, random_state=42),
+        "GradientBoosting (n=300, lr=0.1, exponential)": GradientBoostingClassifier(
+            n_estimators=300, learning_rate=0.1, loss="exponential", random_state=42),
+    }
+    try:
+        from xgboost import XGBClassifier
+        modelos["XGBoost (n=300, lr=0.1)"] = XGBClassifier(n_estimators=300, learning_rate=0.1, random_state=42, eval_metric='logloss')
+    except ImportError:
+        pass
+
+    for nome, modelo in modelos.items():
+        print(f"   Treinando {nome}...")
+        modelo.fit(X, y)
+    return modelos
+
+
+def medir_ms(funcao, X, minimo_s=0.2):
+    """Mediana do tempo por chamada, em milissegundos"""
+    funcao(X)
+    tempos = []
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < minimo_s or len(tempos) < 5:
+        t0 = time.perf_counter()
+        funcao(X)
+        tempos.append(time.perf_counter() - t0)
+    return float(np.median(tempos)) * 1000
+
+
+if __name__ == "__main__":
+    print("🌲 MOTOR DE ÁRVORES COMPILADO")
+    print("=" * 60)
+
+    dfs = [pd.read_csv(RAIZ / "dados" / f) for f in ("outubro_2025.csv", "novembro_2025.csv")]
+    X_todos = pd.concat(dfs, ignore_index=True)[FEATURES]
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            modelos = {Path(sys.argv[1]).name: pickle.load(f)}
+    else:
+        modelos = modelos_referencia(dfs[0][FEATURES], dfs[0]["is_fraud"])
+
+    falhou = False
+    for nome, modelo in modelos.items():
+        motor = compilar(modelo)
+        if motor is None:
+            print(f"\n⚠️  {nome}: modelo não é um ensemble de árvores")
+            continue
+
+        # Paridade
+        esperado = modelo.predict_proba(X_todos)[:, 1]
+        obtido = motor.predict_proba(X_todos.to_numpy())[:, 1]
+        diferenca = float(np.abs(esperado - obtido).max())
+        ok = diferenca <= TOLERANCIA
+        falhou |= not ok
+
+        print(f"\n{'✅' if ok else '❌'} {nome}")
+        print(f"   {motor.n_arvores} árvores, {motor.n_nos} nós, profundidade {motor.profundidade}")
+        print(f"   Paridade predict_proba ({len(X_todos)} linhas): diferença máx {diferenca:.2e}")
+
+        # Latência
+        print(f"\n   {'Lote':>6} | {'original (ms)':>14} | {'compilado (ms)':>14} | {'ganho':>6}")
+        print(f"   {'─' * 50}")
+        for tamanho in TAMANHOS_LOTE:
+            X_lote = np.resize(X_todos.to_numpy(dtype=np.float32), (tamanho, len(FEATURES)))
+            t_original = medir_ms(modelo.predict_proba, X_lote)
+            t_compilado = medir_ms(motor.predict_proba, X_lote)
+            print(f"   {tamanho:>6} | {t_original:>14.3f} | {t_compilado:>14.3f} | {t_original / t_compilado:>5.1f}x")
+
+    if falhou:
+        print(f"\n❌ Paridade falhou (tolerância {TOLERANCIA:g})")
+        sys.exit(1)
@@ -0,0 +1,63 @@
+"""
+Microbenchmark da codificação de features por requisição.
+
+Compara o caminho antigo da API (dict de categorias + DataFrame de uma
+linha) com o `CodificadorFeatures` (buffer NumPy pré-alocado).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_codificador.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+import pandas as pd
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.features import CodificadorFeatures
+
+
+class Transacao(BaseModel):
+    valor: float
+    hora: int
+    categoria: str
+    qtd_transacoes_24h: int
+
+
+def codificar_antigo(transacao):
+    categoria_map = {
+        "alimentacao": 1, "farmacia": 2, "transporte": 3,
+        "vestuario": 4, "restaurante": 5, "lazer": 6,
+        "eletronicos": 7, "livros": 8, "assinatura": 9,
+        "supermercado": 10, "joias": 11, "viagem": 12,
+        "pix": 13, "transferencia": 14
+    }
+    return pd.DataFrame([{
+        "valor": transacao.valor,
+        "hora": transacao.hora,
+        "categoria_cod": categoria_map[transacao.categoria],
+        "qtd_transacoes_24h": transacao.qtd_transacoes_24h
+    }])
+
+
+def medir(funcao, repeticoes=5, numero=2000):
+    """Melhor tempo por chamada, em microssegundos"""
+    return min(timeit.repeat(funcao, repeat=repeticoes, number=numero)) / numero * 1e6
+
+
+if __name__ == "__main__":
+    transacao = Transacao(valor=6061.08, hora=1, categoria="eletronicos", qtd_transacoes_24h=10)
+    lote = [transacao] * 256
+    codificador = CodificadorFeatures()
+
+    print("⏱️  CODIFICAÇÃO DE FEATURES (µs por transação)")
+    print("=" * 60)
+
+    antigo = medir(lambda: codificar_antigo(transacao))
+    novo = medir(lambda: codificador.codificar([transacao]))
+    novo_lote = medir(lambda: codificador.codificar(lote), numero=50) / len(lote)
+
+    print(f"   dict + DataFrame (antigo):   {antigo:9.2f}")
+    print(f"   CodificadorFeatures (1):     {novo:9.2f}   {antigo / novo:6.0f}x")
+    print(f"   CodificadorFeatures (256):   {novo_lote:9.2f}   {antigo / novo_lote:6.0f}x")
@@ -0,0 +1,63 @@
+"""
+Leitura dos CSVs mensais: `pd.read_csv` vs cache colunar.
+
+Replica os CSVs de `dados/` N vezes em um diretório temporário (para
+simular um extrato maior), converte para o cache de `comum.dados` e
+compara tempo e memória do DataFrame resultante.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_dados.py [N=200]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    temporario = Path(tempfile.mkdtemp(prefix="bench_dados."))
+    os.environ["DADOS_CACHE_DIR"] = str(temporario / ".cache")
+
+    import pandas as pd
+    from comum import dados
+
+    print("🗂️  LEITURA DE DADOS")
+    print("=" * 60)
+
+    for arquivo in ("outubro_2025.csv", "novembro_2025.csv"):
+        linhas = (RAIZ / "dados" / arquivo).read_text().splitlines(keepends=True)
+        with open(temporario / arquivo, "w") as f:
+            f.write(linhas[0])
+            for _ in range(n):
+                f.writelines(linhas[1:])
+
+    csv = temporario / "novembro_2025.csv"
+    df_csv, t_csv = medir(lambda: pd.read_csv(csv))
+    _, t_conversao = medir(lambda: dados.atualizar_indice(temporario))
+    _, t_indice = medir(lambda: dados.atualizar_indice(temporario))
+    df_cache, t_cache = medir(lambda: dados.carregar_periodo("2025-11", diretorio=temporario))
+    _, t_blocos = medir(lambda: sum(len(b) for b in dados.iterar_periodo("2025-11", diretorio=temporario)))
+
+    mb = lambda df: df.memory_usage(deep=True).sum() / 1e6
+    mb_num = lambda df: df.drop(columns=["transaction_id", "data"]).memory_usage(deep=True).sum() / 1e6
+
+    print(f"\n   Novembro x{n}: {len(df_csv)} linhas, {csv.stat().st_size / 1e6:.1f} MB de CSV\n")
+    print(f"   pd.read_csv:                  {t_csv * 1000:8.1f} ms | {mb(df_csv):6.1f} MB ({mb_num(df_csv):5.1f} MB sem ids)")
+    print(f"   conversão para o cache (1x):  {t_conversao * 1000:8.1f} ms (os dois meses)")
+    print(f"   índice (arquivos sem mudança): {t_indice * 1000:7.1f} ms")
+    print(f"   carregar_periodo (cache):     {t_cache * 1000:8.1f} ms | {mb(df_cache):6.1f} MB ({mb_num(df_cache):5.1f} MB sem ids)")
+    print(f"   iterar_periodo (blocos):      {t_blocos * 1000:8.1f} ms")
+    print(f"\n   Ganho na leitura: {t_csv / t_cache:.1f}x")
+    shutil.rmtree(temporario, ignore_errors=True)
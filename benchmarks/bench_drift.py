@@ -0,0 +1,92 @@
+"""
+Custo do monitor de drift na API e PSI de Outubro vs Novembro.
+
+  1. mede o `MonitorDrift.registrar` (o que roda por lote pontuado) e
+     o `processar` da tarefa de segundo plano;
+  2. monta a referência com Outubro e passa Novembro pelo monitor, como
+     se fosse tráfego da API.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_drift.py
+"""
+import asyncio
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.dados import carregar_periodo, iterar_periodo
+from comum.drift import EsbocoFeatures, MonitorDrift
+from comum.features import FEATURES, CodificadorFeatures
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+class Modelo:
+    """Equivalente mínimo do ModeloProducao da API"""
+
+    def __init__(self, estimador, referencia):
+        self.estimador = estimador
+        self.referencia = referencia
+        self.versao = "bench"
+        self.codificador = CodificadorFeatures.do_modelo(estimador)
+
+
+def por_chamada_us(funcao, n=200_000):
+    inicio = time.perf_counter()
+    for _ in range(n):
+        funcao()
+    return (time.perf_counter() - inicio) / n * 1e6
+
+
+async def main():
+    print("📡 MONITOR DE DRIFT")
+    print("=" * 60)
+
+    outubro = carregar_periodo("2025-10")
+    estimador = RandomForestClassifier(n_estimators=50, max_depth=10, random_state=42)
+    estimador.fit(outubro[FEATURES], outubro["is_fraud"])
+    modelo = Modelo(estimador, EsbocoFeatures.de_blocos(estimador, iterar_periodo("2025-10")))
+
+    monitor = MonitorDrift(lambda: modelo, intervalo_s=3600)
+    await monitor.iniciar()
+
+    print(f"\n⏱️  Caminho da requisição (registrar)\n")
+    for n in (1, 16, 64):
+        X = np.random.rand(n, len(FEATURES)).astype(modelo.codificador.dtype)
+        p = np.random.rand(n)
+        us = por_chamada_us(lambda: monitor.registrar(modelo, X, p), n=100_000)
+        monitor._anel.clear()
+        print(f"   lote de {n:3d}: {us:5.2f} µs por lote | {us / n:5.2f} µs por transação")
+
+    X = np.random.rand(64, len(FEATURES)).astype(modelo.codificador.dtype)
+    p = np.random.rand(64)
+    for _ in range(1000):
+        monitor.registrar(modelo, X, p)
+    monitor.processar()
+    print(f"\n   processar (segundo plano): {monitor.processamento_ms:.2f} ms para 64000 transações")
+
+    # Novembro como tráfego: 1 fatia da janela por bloco de 200 transações
+    monitor = MonitorDrift(lambda: modelo, intervalo_s=1, janela_s=3600)
+    await monitor.iniciar()
+    for bloco in iterar_periodo("2025-11", linhas_por_bloco=200):
+        X = modelo.codificador.codificar_dataframe(bloco)
+        monitor.registrar(modelo, X, estimador.predict_proba(X)[:, 1])
+        monitor.processar()
+
+    relatorio = monitor.relatorio()
+    print(f"\n📊 Outubro (referência) vs Novembro ({relatorio['n_janela']} transações): {relatorio['status'].upper()}\n")
+    for nome, f in relatorio["features"].items():
+        ks = f"{f['ks']:.3f}" if f["ks"] is not None else "  -  "
+        print(f"   {nome:20} PSI {f['psi']:6.3f} | KS {ks} | {f['status']}")
+    if relatorio["categorias_novas"]:
+        print(f"   Categorias novas: {', '.join(relatorio['categorias_novas'])}")
+    await monitor.parar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
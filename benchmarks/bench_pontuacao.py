@@ -0,0 +1,87 @@
+"""
+Vazão da pontuação em lote (`comum.pontuacao`) contra o número de workers.
+
+Replica `dados/novembro_2025.csv` N vezes em um diretório temporário e o
+pontua do zero com 1, 2, 4, ... workers (até as CPUs disponíveis), com a
+versão em produção ou, sem ela, um GradientBoosting treinado em Outubro.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_pontuacao.py
+    python benchmarks/bench_pontuacao.py --copias 1000 --workers 1,2,4,8 --bloco-mb 16
+"""
+import argparse
+import os
+import sys
+
+# Uma thread nativa por worker, antes de importar numpy (ver producao/pontuar_arquivos.py)
+for variavel in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ[variavel] = "1"
+
+import shutil
+import tempfile
+import warnings
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+from comum.pontuacao import BLOCO_MB, ModeloLote, pontuar_arquivos
+from comum.versoes import PONTEIRO, ler_ponteiro
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def modelo_do_bench():
+    if PONTEIRO.exists():
+        return ModeloLote.da_versao(ler_ponteiro())
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    from comum.dados import carregar_periodo
+    from comum.features import FEATURES
+
+    df = carregar_periodo("2025-10")
+    modelo = GradientBoostingClassifier(n_estimators=200, learning_rate=0.05, random_state=42)
+    return ModeloLote(modelo.fit(df[FEATURES], df["is_fraud"]), "bench")
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0))
+    padrao = sorted({2 ** i for i in range(cpus.bit_length()) if 2 ** i <= cpus} | {cpus})
+    parser = argparse.ArgumentParser(description="Vazão da pontuação em lote por número de workers")
+    parser.add_argument("--copias", type=int, default=500, help="vezes que Novembro é replicado")
+    parser.add_argument("--workers", default=",".join(map(str, padrao)), help="contagens de workers, separadas por vírgula")
+    parser.add_argument("--bloco-mb", type=float, default=BLOCO_MB)
+    args = parser.parse_args()
+
+    print("🧮 PONTUAÇÃO EM LOTE x WORKERS")
+    print("=" * 60)
+
+    modelo = modelo_do_bench()
+    temporario = Path(tempfile.mkdtemp(prefix="bench_pontuacao."))
+    try:
+        linhas = (RAIZ / "dados" / "novembro_2025.csv").read_text().splitlines(keepends=True)
+        csv = temporario / "novembro_2025.csv"
+        with open(csv, "w") as f:
+            f.write(linhas[0])
+            for _ in range(args.copias):
+                f.writelines(linhas[1:])
+
+        print(f"\n   Modelo: {modelo.versao} ({type(modelo.modelo).__name__}) | "
+              f"{(len(linhas) - 1) * args.copias} linhas, {csv.stat().st_size / 1e6:.0f} MB de CSV | {cpus} CPU(s)\n")
+        print(f"   {'workers':>7} | {'partes':>6} | {'tempo':>7} | {'linhas/s':>10} | {'ganho':>6} | {'ocupação':>8}")
+        print(f"   {'─' * 61}")
+        base = None
+        for workers in sorted(int(w) for w in args.workers.split(",")):
+            resumo = pontuar_arquivos([csv], temporario / f"saida-{workers}", modelo, workers=workers,
+                                      bloco_mb=args.bloco_mb)
+            base = base or resumo["linhas_s"]
+            ocupacao = resumo["segundos_worker"] / (resumo["segundos"] * resumo["workers"])
+            print(f"   {workers:>7} | {resumo['partes']:>6} | {resumo['segundos']:6.2f}s | {resumo['linhas_s']:>10,.0f} | "
+                  f"{resumo['linhas_s'] / base:5.2f}x | {ocupacao * 100:7.0f}%")
+        if cpus < max(int(w) for w in args.workers.split(",")):
+            print(f"\n   ⚠️  Mais workers que CPUs ({cpus}): o ganho para no número de CPUs")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
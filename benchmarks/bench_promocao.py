@@ -0,0 +1,123 @@
+"""
+Tempo da promoção contra o número de runs no experimento: busca no MLflow x placar.
+
+Para cada tamanho de `--runs`, monta um file store temporário com runs
+sintéticos (métricas e parâmetros, sem modelo) e um run com um modelo
+de verdade, e mede:
+  1. escolha do melhor run: `mlflow.search_runs` ordenado por F1 x topo do placar;
+  2. modelo: `mlflow.sklearn.load_model` + nova serialização x `pickle.load`
+     do arquivo do run + hardlink;
+  3. reconstrução do placar (custo único, para experimentos antigos).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_promocao.py
+    python benchmarks/bench_promocao.py --runs 100,1000,10000 --repeticoes 5
+"""
+import argparse
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import mlflow
+import numpy as np
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+from sklearn.ensemble import GradientBoostingClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.artefato import escrever_atomico, vincular_atomico
+from comum.experimentos import avaliar, registrar_no_mlflow
+from comum.placar import PLACAR, adicionar_run, carregar_modelo_run, melhores_runs, reconstruir_placar
+
+warnings.filterwarnings("ignore")
+
+
+def melhor_tempo(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos) * 1000, resultado
+
+
+def povoar(cliente, experiment_id, n, rng):
+    """`n` runs sintéticos, com as métricas e parâmetros de uma grade, também inseridos no placar"""
+    agora = int(time.time() * 1000)
+    for i in range(n):
+        params = {"n_estimators": rng.choice([100, 200, 300]), "max_depth": rng.choice([3, 10, 20]), "indice": i}
+        metricas = {"f1_score": rng.uniform(0.5, 0.9), "precision": rng.uniform(0.5, 1), "recall": rng.uniform(0.5, 1)}
+        run = cliente.create_run(experiment_id, run_name=f"Sintético {i}")
+        cliente.log_batch(run.info.run_id,
+                          metrics=[Metric(k, v, agora, 0) for k, v in metricas.items()],
+                          params=[Param(k, str(v)) for k, v in params.items()])
+        cliente.set_terminated(run.info.run_id)
+        adicionar_run(run.info, f"Sintético {i}", metricas, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da escolha e cópia do modelo na promoção")
+    parser.add_argument("--runs", default="100,1000,5000", help="tamanhos do experimento, separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    tamanhos = sorted(int(float(n)) for n in args.runs.split(","))
+
+    print("🏁 PROMOÇÃO x NÚMERO DE RUNS")
+    print("=" * 60)
+
+    rng = random.Random(42)
+    X = np.random.default_rng(42).random((2000, 4))
+    y = (X[:, 0] + X[:, 3] > 1.2).astype(int)
+    raiz = Path(tempfile.mkdtemp(prefix="bench_promocao."))
+    try:
+        mlflow.set_tracking_uri(raiz.as_uri())
+        experiment_id = mlflow.set_experiment("bench-promocao").experiment_id
+        cliente = MlflowClient()
+
+        # O run vencedor, com modelo de verdade, registrado como na grade
+        modelo = GradientBoostingClassifier(n_estimators=300, random_state=42)
+        metricas = {**avaliar(modelo, X[:1500], y[:1500], X[1500:], y[1500:]), "f1": 0.99}
+        run_modelo = registrar_no_mlflow("GradientBoosting (n=300)", modelo, metricas)
+        destino = raiz / "destino"
+        destino.mkdir()
+
+        print(f"\n   {'runs':>6} | {'search_runs':>11} | {'placar':>8} | {'load_model+pickle':>17} | "
+              f"{'pickle.load+link':>16} | {'reconstruir':>11}")
+        print(f"   {'─' * 85}")
+        existentes = 1
+        for n in tamanhos:
+            povoar(cliente, experiment_id, n - existentes, rng)
+            existentes = n
+
+            busca_ms, runs = melhor_tempo(lambda: mlflow.search_runs(
+                experiment_ids=[experiment_id], order_by=["metrics.f1_score DESC"]), args.repeticoes)
+            placar_ms, melhores = melhor_tempo(lambda: melhores_runs(experiment_id), args.repeticoes)
+            assert runs.iloc[0]["run_id"] == melhores[0]["run_id"] == run_modelo
+
+            def pelo_mlflow():
+                m = mlflow.sklearn.load_model(f"runs:/{run_modelo}/model")
+                escrever_atomico(destino / "modelo.pkl", pickle.dumps(m))
+
+            def pelo_placar():
+                _, caminho = carregar_modelo_run(melhores[0])
+                vincular_atomico(caminho, destino / "modelo.pkl")
+
+            mlflow_ms, _ = melhor_tempo(pelo_mlflow, args.repeticoes)
+            link_ms, _ = melhor_tempo(pelo_placar, args.repeticoes)
+            reconstruir_ms, _ = melhor_tempo(lambda: reconstruir_placar(experiment_id), 1)
+            print(f"   {n:>6} | {busca_ms:>9.0f}ms | {placar_ms:>6.2f}ms | {mlflow_ms:>15.1f}ms | "
+                  f"{link_ms:>14.1f}ms | {reconstruir_ms:>9.0f}ms")
+
+        tamanho = (Path(melhores[0]["diretorio"]) / PLACAR).stat().st_size
+        print(f"\n   placar.json: {tamanho / 1024:.0f} KB (top {len(reconstruir_placar(experiment_id)['runs'])} runs)")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Vazão e memória do contador de velocidade (comum/velocidade.py) com milhões de clientes.
+
+  1. registra `--eventos` eventos de `--clientes` clientes distintos em
+     lotes de 64 (o tamanho do micro-lote da API), ao longo de três dias
+     simulados, e mede eventos/s, consultas/s e a memória residente;
+  2. confere as contagens de uma amostra de clientes contra uma
+     referência exata (na resolução do balde);
+  3. com a tabela menor que o número de clientes ativos, mede as expulsões;
+  4. grava o estado em disco, reabre e confere que nada se perdeu.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_velocidade.py
+    python benchmarks/bench_velocidade.py --clientes 5e6 --eventos 10e6
+"""
+import argparse
+import collections
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.velocidade import ContadorVelocidade
+
+LOTE = 64
+INICIO = 1_760_000_000.0
+DURACAO_S = 3 * 86400
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def gerar_eventos(n_clientes, n_eventos, semente=42):
+    """Todos os clientes aparecem ao menos uma vez; o resto segue uma cauda longa (poucos clientes muito ativos)"""
+    rng = np.random.default_rng(semente)
+    extras = max(n_eventos - n_clientes, 0)
+    repetidos = (rng.zipf(1.3, extras) - 1) % n_clientes
+    indices = np.concatenate([rng.permutation(n_clientes), repetidos])[:n_eventos]
+    rng.shuffle(indices)
+    instantes = INICIO + np.sort(rng.uniform(0, DURACAO_S, len(indices)))
+    return indices, instantes
+
+
+def registrar_todos(contador, chaves, indices, instantes):
+    indices = indices.tolist()
+    inicio = time.perf_counter()
+    for k in range(0, len(indices), LOTE):
+        contador.registrar_lote([chaves[i] for i in indices[k:k + LOTE]], float(instantes[k]))
+    return time.perf_counter() - inicio
+
+
+def referencia(contador, indices, instantes, amostra):
+    """Contagens exatas (por balde) no fim do período para os clientes da `amostra`"""
+    baldes = collections.defaultdict(list)
+    # Cada lote usa o instante do seu primeiro evento, como em `registrar_todos`
+    instantes_lote = np.repeat(instantes[::LOTE], LOTE)[:len(indices)]
+    for i, t in zip(indices.tolist(), instantes_lote.tolist()):
+        if i in amostra:
+            baldes[i].append(int(t // contador.balde_s))
+    final = int(instantes_lote[-1] // contador.balde_s)
+    return {
+        i: {janela: sum(1 for b in baldes[i] if b > final - largura)
+            for janela, largura in zip(contador.janelas_s, contador.larguras)}
+        for i in amostra
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do contador de velocidade")
+    parser.add_argument("--clientes", type=float, default=2e6)
+    parser.add_argument("--eventos", type=float, default=4e6)
+    parser.add_argument("--capacidade", type=float, default=4e6, help="linhas da tabela (arredonda para potência de 2)")
+    args = parser.parse_args()
+    n_clientes, n_eventos = int(args.clientes), int(args.eventos)
+
+    print("🏎️  CONTADOR DE VELOCIDADE")
+    print("=" * 60)
+    print(f"\n🎲 Gerando {n_eventos:,} eventos de {n_clientes:,} clientes em 3 dias...")
+    chaves = [f"cliente-{i:09d}" for i in range(n_clientes)]
+    indices, instantes = gerar_eventos(n_clientes, n_eventos)
+
+    rss_antes = rss_mb()
+    contador = ContadorVelocidade(capacidade=int(args.capacidade))
+    print(f"\n⏱️  Registro em lotes de {LOTE} (tabela de {contador.capacidade:,} linhas, "
+          f"{contador.bytes_por_cliente()} bytes por linha)")
+    segundos = registrar_todos(contador, chaves, indices, instantes)
+    print(f"   {n_eventos / segundos:>12,.0f} eventos/s ({segundos / n_eventos * 1e6:.2f} µs por evento)")
+    print(f"   memória residente: +{rss_mb() - rss_antes:.0f} MB "
+          f"(limite da tabela: {contador.bytes_por_cliente() * contador.capacidade / 2**20:.0f} MB)")
+    e = contador.estatisticas()
+    print(f"   clientes novos {e['clientes_novos']:,} | linhas reaproveitadas {e['linhas_reaproveitadas']:,} | "
+          f"expulsões {e['expulsoes']:,}")
+
+    final = float(instantes[::LOTE][-1])
+    consultados = [chaves[i] for i in indices[:100_000]]
+    inicio = time.perf_counter()
+    for chave in consultados:
+        contador.consultar(chave, final)
+    print(f"   {len(consultados) / (time.perf_counter() - inicio):>12,.0f} consultas/s")
+
+    print("\n🔍 Conferência com a contagem exata")
+    rng = np.random.default_rng(7)
+    amostra = set(rng.choice(indices, 2000).tolist())
+    esperado = referencia(contador, indices, instantes, amostra)
+    divergentes = sum(contador.consultar(chaves[i], final) != esperado[i] for i in amostra)
+    mais_ativo = max(esperado, key=lambda i: esperado[i][contador.janelas_s[-1]])
+    print(f"   {len(amostra) - divergentes}/{len(amostra)} clientes com contagem exata "
+          f"(mais ativo: {esperado[mais_ativo]})")
+
+    print("\n📉 Tabela menor que a base de clientes")
+    pequeno = ContadorVelocidade(capacidade=n_clientes // 8)
+    segundos = registrar_todos(pequeno, chaves, indices, instantes)
+    e = pequeno.estatisticas()
+    print(f"   {pequeno.capacidade:,} linhas: {n_eventos / segundos:,.0f} eventos/s, "
+          f"{e['linhas_reaproveitadas']:,} linhas expiradas reaproveitadas, {e['expulsoes']:,} expulsões")
+    del pequeno
+
+    print("\n💾 Persistência (arquivos mapeados)")
+    diretorio = Path(tempfile.mkdtemp(prefix="bench_velocidade."))
+    try:
+        metade = n_eventos // 2
+        persistente = ContadorVelocidade(capacidade=int(args.capacidade), diretorio=diretorio)
+        segundos = registrar_todos(persistente, chaves, indices[:metade], instantes[:metade])
+        print(f"   {metade / segundos:>12,.0f} eventos/s com a tabela em arquivo")
+        print(f"   sincronizar: {persistente.sincronizar():.0f} ms")
+        instante = float(instantes[:metade][::LOTE][-1])
+        antes = {i: persistente.consultar(chaves[i], instante) for i in list(amostra)[:500]}
+        del persistente
+
+        inicio = time.perf_counter()
+        reaberto = ContadorVelocidade(capacidade=int(args.capacidade), diretorio=diretorio)
+        abrir_ms = (time.perf_counter() - inicio) * 1000
+        iguais = sum(reaberto.consultar(chaves[i], instante) == antes[i] for i in antes)
+        tamanho = sum(p.stat().st_blocks * 512 for p in diretorio.iterdir()) / 2**20
+        print(f"   reabrir: {abrir_ms:.1f} ms (restaurado={reaberto.restaurado}), {iguais}/{len(antes)} contagens iguais, "
+              f"{tamanho:.0f} MB em disco")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Teste de carga da API servida por `producao/servir.py`, com 1..N workers.
+
+Para cada número de workers, sobe o servidor em uma porta local, espera o
+`/health/ready` e dispara requisições por `--duracao` segundos. Cada
+processo cliente mantém suas conexões HTTP/1.1 keep-alive com asyncio
+puro, sem dependências, para o gerador de carga custar pouco. Ao final, mostra
+vazão, p50/p99, a eficiência contra 1 worker (1.0 = escala linear) e a
+memória dos workers (RSS somado contra PSS, que divide as páginas
+compartilhadas por copy-on-write).
+
+A carga disputa CPU com o servidor: para medir escala, deixe CPUs livres
+para os clientes (ex.: 8 CPUs → até 6 workers e 2 clientes).
+
+Uso (na raiz do projeto):
+    python benchmarks/carga.py --workers 1,2,4
+    python benchmarks/carga.py --workers 1,2 --lote 100 --duracao 20
+    python benchmarks/carga.py --url http://localhost:8001   # servidor já em execução
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+from comum.features import CATEGORIAS
+
+
+def corpo_requisicao(rng, lote):
+    def transacao():
+        return {
+            "valor": round(rng.lognormvariate(4.5, 1.0), 2),
+            "hora": rng.randrange(24),
+            "categoria": rng.choice(list(CATEGORIAS)),
+            "qtd_transacoes_24h": rng.randrange(30),
+        }
+    return json.dumps([transacao() for _ in range(lote)] if lote else transacao()).encode()
+
+
+def requisicoes(host, porta, lote, n=256, semente=0):
+    """Requisições HTTP já serializadas (bytes), com transações variadas"""
+    rng = random.Random(semente)
+    rota = "/predict/batch" if lote else "/predict"
+    pedidos = []
+    for _ in range(n):
+        corpo = corpo_requisicao(rng, lote)
+        cabecalho = (f"POST {rota} HTTP/1.1\r\nHost: {host}:{porta}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(corpo)}\r\n\r\n")
+        pedidos.append(cabecalho.encode() + corpo)
+    return pedidos
+
+
+async def _conexao(host, porta, pedidos, fim, latencias, falhas):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    i = random.randrange(len(pedidos))
+    try:
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            escritor.write(pedidos[i % len(pedidos)])
+            status = await leitor.readline()
+            tamanho = 0
+            while True:
+                linha = await leitor.readline()
+                if linha in (b"\r\n", b""):
+                    break
+                if linha[:15].lower() == b"content-length:":
+                    tamanho = int(linha[15:])
+            await leitor.readexactly(tamanho)
+            latencias.append(time.perf_counter() - inicio)
+            if status[9:12] != b"200":
+                falhas[0] += 1
+            i += 1
+    finally:
+        escritor.close()
+
+
+def cliente(host, porta, conexoes, duracao_s, lote, semente):
+    """Um processo gerador de carga: `conexoes` conexões em paralelo; devolve (latências, falhas)"""
+    random.seed(semente)
+    pedidos = requisicoes(host, porta, lote, semente=semente)
+    latencias, falhas = [], [0]
+
+    async def rodar():
+        fim = time.perf_counter() + duracao_s
+        await asyncio.gather(*(_conexao(host, porta, pedidos, fim, latencias, falhas) for _ in range(conexoes)))
+
+    asyncio.run(rodar())
+    return latencias, falhas[0]
+
+
+def disparar(url, conexoes, clientes, duracao_s, lote):
+    partes = urlsplit(url)
+    por_cliente = [conexoes // clientes + (i < conexoes % clientes) for i in range(clientes)]
+    with ProcessPoolExecutor(clientes) as executor:
+        futuros = [executor.submit(cliente, partes.hostname, partes.port, n, duracao_s, lote, i)
+                   for i, n in enumerate(por_cliente) if n]
+        resultados = [f.result() for f in futuros]
+    latencias = np.concatenate([np.asarray(lat) for lat, _ in resultados]) * 1000
+    return {
+        "requisicoes": len(latencias),
+        "req_por_s": len(latencias) / duracao_s,
+        "itens_por_s": len(latencias) * max(lote, 1) / duracao_s,
+        "p50_ms": float(np.percentile(latencias, 50)) if len(latencias) else None,
+        "p99_ms": float(np.percentile(latencias, 99)) if len(latencias) else None,
+        "falhas": sum(f for _, f in resultados),
+    }
+
+
+def esperar_pronto(url, processo, timeout_s=120):
+    limite = time.monotonic() + timeout_s
+    while time.monotonic() < limite:
+        if processo is not None and processo.poll() is not None:
+            raise RuntimeError(f"servidor saiu com código {processo.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/health/ready", timeout=1) as resposta:
+                if resposta.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} não ficou pronto em {timeout_s} s")
+
+
+def memoria_workers(pid_pai):
+    """RSS somado e PSS somado dos workers (MB), lidos de /proc"""
+    try:
+        with open(f"/proc/{pid_pai}/task/{pid_pai}/children") as f:
+            filhos = [int(p) for p in f.read().split()]
+    except OSError:
+        return None
+    rss = pss = 0.0
+    for pid in filhos:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for linha in f:
+                    if linha.startswith("Rss:"):
+                        rss += int(linha.split()[1]) / 1024
+                    elif linha.startswith("Pss:"):
+                        pss += int(linha.split()[1]) / 1024
+        except OSError:
+            pass
+    return {"workers": len(filhos), "rss_mb": rss, "pss_mb": pss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com vários workers")
+    parser.add_argument("--workers", default="1,2", help="números de workers, separados por vírgula")
+    parser.add_argument("--url", help="usa um servidor já em execução em vez de subir o servir.py")
+    parser.add_argument("--porta", type=int, default=8011)
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de carga por rodada")
+    parser.add_argument("--conexoes", type=int, default=32, help="conexões simultâneas no total")
+    parser.add_argument("--clientes", type=int, default=max(1, len(os.sched_getaffinity(0)) // 4),
+                        help="processos geradores de carga")
+    parser.add_argument("--lote", type=int, default=0, help="itens por requisição em /predict/batch (0: /predict)")
+    parser.add_argument("--afinidade", default="off", help="repassado ao servir.py")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    print("🔥 TESTE DE CARGA")
+    print("=" * 60)
+    print(f"   {args.conexoes} conexões em {args.clientes} processos cliente, {args.duracao:g} s por rodada, "
+          f"{'/predict' if not args.lote else f'/predict/batch com {args.lote} itens'}")
+
+    rodadas = [None] if args.url else [int(n) for n in args.workers.split(",")]
+    resultados = []
+    for workers in rodadas:
+        url, processo = args.url, None
+        if url is None:
+            url = f"http://127.0.0.1:{args.porta}"
+            processo = subprocess.Popen(
+                [sys.executable, "servir.py", "--host", "127.0.0.1", "--port", str(args.porta),
+                 "--workers", str(workers), "--afinidade", args.afinidade],
+                cwd=RAIZ / "producao", env={**os.environ, "REGISTRO_INTERVALO_S": "1"},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        try:
+            esperar_pronto(url, processo)
+            # Um worker pode ficar pronto antes dos outros: meio segundo de folga e um aquecimento curto
+            time.sleep(0.5)
+            disparar(url, args.conexoes, args.clientes, 1.0, args.lote)
+            resultado = {"workers": workers, **disparar(url, args.conexoes, args.clientes, args.duracao, args.lote)}
+            if processo is not None:
+                resultado["memoria"] = memoria_workers(processo.pid)
+        finally:
+            if processo is not None:
+                processo.send_signal(signal.SIGTERM)
+                processo.wait(timeout=30)
+        resultados.append(resultado)
+
+        # Vazão por worker da primeira rodada, projetada linearmente
+        por_worker = resultados[0]["req_por_s"] / (resultados[0]["workers"] or 1)
+        eficiencia = resultado["req_por_s"] / (por_worker * workers) if workers else None
+        memoria = resultado.get("memoria")
+        print(f"\n   workers {workers or '?':>3}: {resultado['req_por_s']:8.0f} req/s "
+              f"({resultado['itens_por_s']:.0f} itens/s) | p50 {resultado['p50_ms']:6.2f} ms | "
+              f"p99 {resultado['p99_ms']:7.2f} ms | falhas {resultado['falhas']}"
+              + (f" | eficiência {eficiencia:.2f}" if eficiencia is not None else ""))
+        if memoria:
+            print(f"               memória dos workers: RSS somado {memoria['rss_mb']:.0f} MB, "
+                  f"PSS somado {memoria['pss_mb']:.0f} MB")
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump({"parametros": vars(args), "resultados": resultados}, f, indent=2)
+        print(f"\n💾 Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
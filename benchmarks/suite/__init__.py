@@ -0,0 +1,13 @@
+"""
+Suíte de benchmarks de ponta a ponta: treino, promoção e serviço.
+
+Cenários repetíveis (dados sintéticos com semente fixa), resultados em
+JSON e um comando que compara duas execuções e aponta regressões.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.suite rodar                          # todos os cenários
+    python -m benchmarks.suite rodar --cenarios treino,inferencia --linhas 1e4,1e5,1e6
+    python -m benchmarks.suite comparar base.json novo.json   # sai com 1 se houver regressão
+
+Cada métrica guarda valor, unidade e direção ("menor" ou "maior" é melhor).
+"""
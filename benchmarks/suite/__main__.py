@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(RAIZ))
+
+CENARIOS = ["treino", "artefato", "inferencia", "api", "partida"]
+RESULTADOS_DIR = RAIZ / "benchmarks" / "resultados"
+# Diferenças absolutas abaixo destas são ruído de medição, não regressão
+RUIDO_MINIMO = {"s": 0.05, "ms": 0.05, "MB": 2.0, "bytes": 1024}
+
+
+def ambiente():
+    from importlib.metadata import PackageNotFoundError, version
+
+    pacotes = {}
+    for pacote in ("numpy", "pandas", "scikit-learn", "xgboost", "fastapi"):
+        try:
+            pacotes[pacote] = version(pacote)
+        except PackageNotFoundError:
+            pacotes[pacote] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pacotes": pacotes,
+    }
+
+
+def rodar(args):
+    from benchmarks.suite import cenarios
+
+    # Os modelos são treinados com DataFrame e pontuados com matrizes NumPy
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    pedidos = args.cenarios.split(",")
+    desconhecidos = set(pedidos) - set(CENARIOS)
+    if desconhecidos:
+        sys.exit(f"Cenários desconhecidos: {sorted(desconhecidos)} (disponíveis: {', '.join(CENARIOS)})")
+    linhas = [int(float(n)) for n in args.linhas.split(",")]
+
+    print("⏱️  SUÍTE DE BENCHMARKS")
+    print("=" * 60)
+    resultados = {}
+    treinados = {}
+    # artefato e inferência usam os modelos treinados no menor tamanho
+    if {"treino", "artefato", "inferencia"} & set(pedidos):
+        print(f"\n🏋️  Treino ({', '.join(str(n) for n in linhas)} linhas)")
+        metricas, treinados = cenarios.treino(linhas if "treino" in pedidos else [min(linhas)], args.modelos)
+        if "treino" in pedidos:
+            resultados.update(metricas)
+    if "artefato" in pedidos:
+        print("\n📦 Artefato")
+        resultados.update(cenarios.artefato(treinados))
+    if "inferencia" in pedidos:
+        print("\n⚡ Inferência")
+        resultados.update(cenarios.inferencia(treinados))
+    if "api" in pedidos:
+        print("\n🌐 API (TestClient)")
+        resultados.update(cenarios.api())
+    if "partida" in pedidos:
+        print("\n🚀 Partida da API")
+        resultados.update(cenarios.partida())
+
+    saida = Path(args.saida) if args.saida else RESULTADOS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    with open(saida, "w") as f:
+        json.dump({"ambiente": ambiente(), "parametros": vars(args) | {"funcao": None},
+                   "resultados": resultados}, f, indent=2)
+    print(f"\n💾 {len(resultados)} métricas salvas em {saida}")
+
+
+def comparar(args):
+    with open(args.base) as f:
+        base = json.load(f)["resultados"]
+    with open(args.novo) as f:
+        novo = json.load(f)["resultados"]
+
+    print(f"📊 COMPARAÇÃO: {args.base} → {args.novo} (tolerância {args.tolerancia:.0%})")
+    print("=" * 60)
+    regressoes = melhorias = 0
+    for nome in sorted(set(base) & set(novo)):
+        antes, depois = base[nome]["valor"], novo[nome]["valor"]
+        if not antes or depois is None:
+            continue
+        variacao = (depois - antes) / antes
+        piora = variacao if novo[nome]["melhor"] == "menor" else -variacao
+        if abs(depois - antes) < RUIDO_MINIMO.get(novo[nome]["unidade"], 0.0):
+            piora = 0.0
+        if piora > args.tolerancia:
+            regressoes += 1
+            marca = "🔴"
+        elif piora < -args.tolerancia:
+            melhorias += 1
+            marca = "🟢"
+        else:
+            if not args.todas:
+                continue
+            marca = "  "
+        print(f"{marca} {nome:<70} {antes:>12.4g} → {depois:<12.4g} {variacao:+7.1%} {novo[nome]['unidade']}")
+
+    so_base, so_novo = sorted(set(base) - set(novo)), sorted(set(novo) - set(base))
+    if so_base or so_novo:
+        print(f"\nℹ️  {len(so_base)} métricas só na base, {len(so_novo)} só na nova execução")
+    print(f"\n{regressoes} regressões, {melhorias} melhorias")
+    sys.exit(1 if regressoes else 0)
+
+
+parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description="Suíte de benchmarks")
+comandos = parser.add_subparsers(dest="comando", required=True)
+
+p_rodar = comandos.add_parser("rodar", help="executa os cenários e grava o JSON")
+p_rodar.add_argument("--cenarios", default=",".join(CENARIOS), help="lista separada por vírgulas")
+p_rodar.add_argument("--linhas", default="1e4,1e5", help="tamanhos do treino sintético (até 1e7)")
+p_rodar.add_argument("--modelos", choices=["familias", "todos"], default="familias",
+                     help="uma configuração por família ou a grade inteira")
+p_rodar.add_argument("--saida", help="arquivo JSON (padrão: benchmarks/resultados/<data>.json)")
+p_rodar.set_defaults(funcao=rodar)
+
+p_comparar = comandos.add_parser("comparar", help="compara duas execuções e aponta regressões")
+p_comparar.add_argument("base")
+p_comparar.add_argument("novo")
+p_comparar.add_argument("--tolerancia", type=float, default=0.10, help="variação relativa aceita (padrão 0.10)")
+p_comparar.add_argument("--todas", action="store_true", help="mostra também as métricas sem variação relevante")
+p_comparar.set_defaults(funcao=comparar)
+
+args = parser.parse_args()
+args.funcao(args)
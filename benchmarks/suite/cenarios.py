@@ -0,0 +1,317 @@
+"""
+Cenários da suíte. Cada um devolve um dict plano {nome da métrica: métrica}.
+
+    treino      tempo de fit e pico de memória por modelo, de 10^4 a 10^7 linhas
+    artefato    tamanho e tempo de carga do pickle e do artefato mapeado
+    inferencia  latência p50/p99 de uma linha e de um lote, por família e motor
+    api         vazão da API em processo (TestClient), unitária e em lote
+    partida     tempo até a API ficar pronta em um processo novo, nos modos completo e rápido
+"""
+import ctypes
+import gc
+import importlib.util
+import io
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from comum.artefato import carregar_artefato, exportar, salvar_artefato, tamanho_artefato
+from comum.dados import carregar_periodo, meses_disponiveis
+from comum.experimentos import grade_padrao
+from comum.features import CATEGORIAS, FEATURES, CodificadorFeatures
+
+RAIZ = Path(__file__).resolve().parent.parent.parent
+SEMENTE = 42
+TAMANHO_LOTE = 1000
+NOMES_CATEGORIAS = {cod: nome for nome, cod in CATEGORIAS.items()}
+
+
+def metrica(valor, unidade, melhor="menor"):
+    return {"valor": None if valor is None else float(valor), "unidade": unidade, "melhor": melhor}
+
+
+def percentis(amostras_s, prefixo):
+    ms = np.asarray(amostras_s) * 1000
+    return {
+        f"{prefixo}_p50_ms": metrica(np.percentile(ms, 50), "ms"),
+        f"{prefixo}_p99_ms": metrica(np.percentile(ms, 99), "ms"),
+    }
+
+
+def _status(campo):
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith(campo + ":"):
+                return int(linha.split()[1]) / 1024
+    return None
+
+
+def medir_pico(funcao):
+    """(resultado, segundos, pico de RSS acima do início em MB).
+
+    No Linux, escrever 5 em /proc/self/clear_refs zera o pico (VmHWM), o que
+    inclui alocações nativas (XGBoost, OpenMP); fora dele o pico fica None.
+    Antes, a memória livre do alocador volta ao sistema para não mascarar o pico.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        rss_inicio = _status("VmRSS")
+    except OSError:
+        rss_inicio = None
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+    pico = _status("VmHWM") - rss_inicio if rss_inicio is not None else None
+    return resultado, segundos, pico
+
+
+def dados_sinteticos(n, semente=SEMENTE):
+    """`n` linhas no esquema de `dados/`, reamostradas dos meses disponíveis com ruído no valor"""
+    base = carregar_periodo(*meses_disponiveis(), colunas=FEATURES + ["is_fraud"])
+    rng = np.random.default_rng(semente)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df["valor"] = (df["valor"] * rng.lognormal(0.0, 0.05, n)).astype(np.float32)
+    return df[FEATURES], df["is_fraud"]
+
+
+def _familia(nome):
+    return nome.split(" ")[0]
+
+
+def configuracoes(modelos="familias"):
+    """Grade de `comum.experimentos`: uma configuração por família, ou todas"""
+    grade = grade_padrao()
+    if modelos == "todos":
+        return grade
+    vistas, primeiras = set(), []
+    for config in grade:
+        if _familia(config["nome"]) not in vistas:
+            vistas.add(_familia(config["nome"]))
+            primeiras.append(config)
+    return primeiras
+
+
+def treino(linhas, modelos="familias"):
+    """Fit de cada configuração em cada tamanho; devolve (métricas, modelos treinados no menor tamanho)"""
+    resultados, treinados = {}, {}
+    for n in sorted(linhas):
+        X, y = dados_sinteticos(n)
+        for config in configuracoes(modelos):
+            modelo = clone(config["model"])
+            _, segundos, pico = medir_pico(lambda: modelo.fit(X, y))
+            chave = f"treino/{config['nome']}/{n}"
+            resultados[f"{chave}/fit_s"] = metrica(segundos, "s")
+            resultados[f"{chave}/pico_mb"] = metrica(pico, "MB")
+            print(f"   {config['nome']:<36} {n:>9} linhas  {segundos:8.2f} s  pico {pico or 0:7.1f} MB")
+            treinados.setdefault(config["nome"], modelo)
+        del X, y
+    return resultados, treinados
+
+
+def _tamanho_e_carga(modelo, nome, repeticoes=20):
+    resultados = {}
+    conteudo = pickle.dumps(modelo)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        pickle.loads(conteudo)
+    resultados[f"artefato/{nome}/pickle_bytes"] = metrica(len(conteudo), "bytes")
+    resultados[f"artefato/{nome}/pickle_carga_ms"] = metrica((time.perf_counter() - inicio) / repeticoes * 1000, "ms")
+
+    exportado = exportar(modelo)
+    if exportado is not None:
+        temporario = Path(tempfile.mkdtemp(prefix="bench_suite."))
+        try:
+            salvar_artefato(exportado, temporario / "artefato")
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                carregar_artefato(temporario / "artefato", mmap=True)
+            resultados[f"artefato/{nome}/arrays_bytes"] = metrica(tamanho_artefato(temporario / "artefato"), "bytes")
+            resultados[f"artefato/{nome}/arrays_carga_ms"] = metrica((time.perf_counter() - inicio) / repeticoes * 1000, "ms")
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    arrays = resultados.get(f"artefato/{nome}/arrays_bytes")
+    print(f"   {nome:<36} pickle {len(conteudo) / 1024:8.1f} KB "
+          f"({resultados[f'artefato/{nome}/pickle_carga_ms']['valor']:6.2f} ms)"
+          + (f" | arrays {arrays['valor'] / 1024:8.1f} KB "
+             f"({resultados[f'artefato/{nome}/arrays_carga_ms']['valor']:5.2f} ms)" if arrays else ""))
+    return resultados
+
+
+def artefato(treinados):
+    """Tamanho e carga do pickle/arrays de cada família e da versão primária de produção"""
+    resultados = {}
+    for nome, modelo in treinados.items():
+        resultados.update(_tamanho_e_carga(modelo, nome))
+
+    from comum.versoes import PONTEIRO, carregar_modelo_ativo
+    if PONTEIRO.exists():
+        modelo, metadata = carregar_modelo_ativo()
+        resultados.update(_tamanho_e_carga(modelo, f"producao ({metadata['versao']})"))
+    return resultados
+
+
+def inferencia(treinados, repeticoes=300):
+    """p50/p99 de uma linha e de um lote, com o estimador original e com o motor de arrays"""
+    resultados = {}
+    X, _ = dados_sinteticos(max(repeticoes, TAMANHO_LOTE), semente=SEMENTE + 1)
+    for nome, modelo in treinados.items():
+        codificador = CodificadorFeatures.do_modelo(modelo)
+        matriz = X[codificador.features].to_numpy(dtype=codificador.dtype)
+        motores = {"estimador": modelo}
+        exportado = exportar(modelo)
+        if exportado is not None:
+            motores["arrays"] = exportado
+
+        for motor, m in motores.items():
+            m.predict_proba(matriz[:1])
+            unitaria = []
+            for i in range(repeticoes):
+                inicio = time.perf_counter()
+                m.predict_proba(matriz[i:i + 1])
+                unitaria.append(time.perf_counter() - inicio)
+            lote = []
+            for _ in range(max(10, repeticoes // 10)):
+                inicio = time.perf_counter()
+                m.predict_proba(matriz[:TAMANHO_LOTE])
+                lote.append(time.perf_counter() - inicio)
+            resultados.update(percentis(unitaria, f"inferencia/{nome}/{motor}/unitaria"))
+            resultados.update(percentis(lote, f"inferencia/{nome}/{motor}/lote_{TAMANHO_LOTE}"))
+            print(f"   {nome:<36} {motor:<10} 1 linha p50 {np.median(unitaria) * 1e3:7.3f} ms | "
+                  f"{TAMANHO_LOTE} linhas p50 {np.median(lote) * 1e3:7.2f} ms")
+    return resultados
+
+
+def _importar_api():
+    """Importa producao/3_iniciar_api.py como módulo (roda a partir de producao/)"""
+    spec = importlib.util.spec_from_file_location("api_producao", RAIZ / "producao" / "3_iniciar_api.py")
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def api(requisicoes=500, lotes=20):
+    """Vazão e latência pelo TestClient do FastAPI, na mesma thread (sem rede)"""
+    from fastapi.testclient import TestClient
+
+    if not (RAIZ / "producao" / "metadata.json").exists():
+        print("   ⚠️  Sem modelo promovido: cenário api ignorado")
+        return {}
+
+    temporario = tempfile.mkdtemp(prefix="bench_suite_logs.")
+    os.environ.setdefault("REGISTRO_DIR", temporario)
+    diretorio_original = os.getcwd()
+    os.chdir(RAIZ / "producao")
+    try:
+        saida = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            modulo = _importar_api()
+        finally:
+            sys.stdout = saida
+
+        X, _ = dados_sinteticos(max(requisicoes, TAMANHO_LOTE), semente=SEMENTE + 2)
+        itens = pd.DataFrame({
+            "valor": X["valor"].astype(float),
+            "hora": X["hora"].astype(int),
+            "categoria": X["categoria_cod"].map(NOMES_CATEGORIAS),
+            "qtd_transacoes_24h": X["qtd_transacoes_24h"].astype(int),
+        }).to_dict("records")
+
+        resultados = {}
+        with TestClient(modulo.app) as cliente:
+            cliente.post("/predict", json=itens[0])
+            unitaria = []
+            inicio_total = time.perf_counter()
+            for item in itens[:requisicoes]:
+                inicio = time.perf_counter()
+                cliente.post("/predict", json=item)
+                unitaria.append(time.perf_counter() - inicio)
+            total = time.perf_counter() - inicio_total
+            resultados.update(percentis(unitaria, "api/predict"))
+            resultados["api/predict/req_por_s"] = metrica(requisicoes / total, "req/s", "maior")
+
+            lote = []
+            for _ in range(lotes):
+                inicio = time.perf_counter()
+                cliente.post("/predict/batch", json=itens[:TAMANHO_LOTE])
+                lote.append(time.perf_counter() - inicio)
+            resultados.update(percentis(lote, f"api/predict_batch_{TAMANHO_LOTE}"))
+            resultados[f"api/predict_batch_{TAMANHO_LOTE}/itens_por_s"] = metrica(
+                TAMANHO_LOTE * lotes / sum(lote), "itens/s", "maior")
+        print(f"   /predict: {requisicoes / total:.0f} req/s (p50 {np.median(unitaria) * 1e3:.2f} ms) | "
+              f"/predict/batch: {TAMANHO_LOTE * lotes / sum(lote):.0f} itens/s")
+        return resultados
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+# Processo filho: importa a API, roda o ciclo de vida até ficar pronta e imprime os tempos
+_FILHO_PARTIDA = """
+import asyncio, importlib.util, json, os, sys, time
+spec = importlib.util.spec_from_file_location("api_producao", "3_iniciar_api.py")
+modulo = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(modulo)
+
+async def main():
+    async with modulo.ciclo_de_vida(modulo.app):
+        while not modulo.partida["pronto"]:
+            await asyncio.sleep(0.001)
+        pronto_em = time.time()
+        carregados = {m: m in sys.modules for m in ("pandas", "sklearn", "xgboost", "mlflow")}
+        sys.__stdout__.write(json.dumps({"pronto_em": pronto_em, "partida": modulo.partida, "modulos": carregados}) + "\\n")
+        sys.__stdout__.flush()
+        os._exit(0)
+
+sys.stdout = open(os.devnull, "w")
+asyncio.run(main())
+"""
+
+
+def partida(repeticoes=3):
+    """Do exec do Python até /health/ready, em processos novos (mediana de `repeticoes`)"""
+    if not (RAIZ / "producao" / "metadata.json").exists():
+        print("   ⚠️  Sem modelo promovido: cenário partida ignorado")
+        return {}
+
+    resultados = {}
+    for modo, rapido in (("completo", "0"), ("rapido", "1")):
+        ambiente = {**os.environ, "INICIO_RAPIDO": rapido, "RECARGA_INTERVALO_S": "0", "DRIFT_INTERVALO_S": "0",
+                    "REGISTRO_INTERVALO_S": "0", "REGISTRO_DIR": tempfile.mkdtemp(prefix="bench_suite_logs.")}
+        processo, importacao, pronto = [], [], []
+        try:
+            for _ in range(repeticoes):
+                inicio = time.time()
+                saida = subprocess.run([sys.executable, "-c", _FILHO_PARTIDA], cwd=RAIZ / "producao", env=ambiente,
+                                       capture_output=True, text=True, check=True).stdout
+                medicao = json.loads(saida.strip().splitlines()[-1])
+                processo.append((medicao["pronto_em"] - inicio) * 1000)
+                importacao.append(medicao["partida"]["importacao_ms"])
+                pronto.append(medicao["partida"]["pronto_ms"])
+        finally:
+            shutil.rmtree(ambiente["REGISTRO_DIR"], ignore_errors=True)
+
+        resultados[f"partida/{modo}/processo_ms"] = metrica(np.median(processo), "ms")
+        resultados[f"partida/{modo}/importacao_ms"] = metrica(np.median(importacao), "ms")
+        resultados[f"partida/{modo}/pronto_ms"] = metrica(np.median(pronto), "ms")
+        pesados = [m for m, carregado in medicao["modulos"].items() if carregado]
+        print(f"   {modo:<9} pronta em {np.median(processo):6.0f} ms desde o exec "
+              f"(importações {np.median(importacao):4.0f} ms) | carregados: {', '.join(pesados) or 'nenhum pesado'}")
+    return resultados
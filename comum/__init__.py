@@ -0,0 +1,6 @@
+"""
+Código compartilhado entre as fases do ciclo de vida.
+
+Os scripts numerados adicionam a raiz do projeto ao `sys.path`
+para importar este pacote.
+"""
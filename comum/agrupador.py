@@ -0,0 +1,118 @@
+"""
+Agrupador de requisições (micro-batching).
+
+Junta chamadas concorrentes de `/predict` em um único lote, até
+`max_itens` itens ou `max_espera_ms` milissegundos, roda uma chamada
+vetorizada do modelo em uma thread e devolve cada resultado ao handler
+que está aguardando.
+"""
+import asyncio
+import time
+
+
+class AgrupadorRequisicoes:
+    def __init__(self, funcao_lote, max_itens=64, max_espera_ms=2.0, observar_espera=None):
+        """`funcao_lote` recebe uma lista de itens e devolve uma lista de resultados na mesma ordem.
+
+        `observar_espera`, se dado, recebe o tempo de fila (s) de cada item.
+        """
+        self.funcao_lote = funcao_lote
+        self.observar_espera = observar_espera
+        self.max_itens = max(1, int(max_itens))
+        self.max_espera = max(0.0, float(max_espera_ms)) / 1000
+
+        self._pendentes = []
+        self._tem_itens = None
+        self._cheio = None
+        self._tarefa = None
+
+        # Métricas
+        self.n_lotes = 0
+        self.n_itens = 0
+        self.soma_espera = 0.0
+        self.max_espera_obs = 0.0
+
+    async def iniciar(self):
+        self._tem_itens = asyncio.Event()
+        self._cheio = asyncio.Event()
+        self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self):
+        if self._tarefa is None:
+            return
+        self._tarefa.cancel()
+        try:
+            await self._tarefa
+        except asyncio.CancelledError:
+            pass
+        self._tarefa = None
+        for _, futuro, _ in self._pendentes:
+            if not futuro.done():
+                futuro.cancel()
+        self._pendentes.clear()
+
+    async def submeter(self, item):
+        """Enfileira um item e aguarda o resultado do lote em que ele entrar"""
+        if self._tarefa is None:
+            raise RuntimeError("Agrupador não iniciado")
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendentes.append((item, futuro, time.perf_counter()))
+        self._tem_itens.set()
+        if len(self._pendentes) >= self.max_itens:
+            self._cheio.set()
+        return await futuro
+
+    async def _loop(self):
+        while True:
+            await self._tem_itens.wait()
+
+            # Espera encher o lote ou vencer o prazo do primeiro item
+            if len(self._pendentes) < self.max_itens and self.max_espera > 0:
+                try:
+                    await asyncio.wait_for(self._cheio.wait(), self.max_espera)
+                except asyncio.TimeoutError:
+                    pass
+
+            lote = self._pendentes[:self.max_itens]
+            del self._pendentes[:self.max_itens]
+            if len(self._pendentes) < self.max_itens:
+                self._cheio.clear()
+            if not self._pendentes:
+                self._tem_itens.clear()
+
+            inicio = time.perf_counter()
+            for _, _, chegada in lote:
+                espera = inicio - chegada
+                self.soma_espera += espera
+                self.max_espera_obs = max(self.max_espera_obs, espera)
+                if self.observar_espera is not None:
+                    self.observar_espera(espera)
+            self.n_lotes += 1
+            self.n_itens += len(lote)
+
+            try:
+                resultados = await asyncio.to_thread(self.funcao_lote, [item for item, _, _ in lote])
+            except Exception as e:
+                for _, futuro, _ in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            for (_, futuro, _), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+    def estatisticas(self):
+        """Ocupação média dos lotes e tempo de espera na fila"""
+        return {
+            "max_itens": self.max_itens,
+            "max_espera_ms": self.max_espera * 1000,
+            "lotes": self.n_lotes,
+            "itens": self.n_itens,
+            "itens_por_lote": self.n_itens / self.n_lotes if self.n_lotes else 0.0,
+            "ocupacao_media": self.n_itens / (self.n_lotes * self.max_itens) if self.n_lotes else 0.0,
+            "espera_media_ms": self.soma_espera / self.n_itens * 1000 if self.n_itens else 0.0,
+            "espera_max_ms": self.max_espera_obs * 1000,
+            "na_fila": len(self._pendentes),
+        }
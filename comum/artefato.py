@@ -0,0 +1,177 @@
+"""
+Artefato de modelo em arrays mapeáveis em memória.
+
+Cada versão promovida vira um diretório com um `.npy` por array e um
+`manifesto.json`. Carregado com `np.load(mmap_mode="r")`, os workers da
+API compartilham as mesmas páginas do cache do sistema operacional em
+vez de cada um manter sua cópia do pickle.
+
+Formato do diretório:
+    manifesto.json   tipo ("arvores" ou "linear"), features, parâmetros e arrays
+    <nome>.npy       um arquivo por array (feature, limiar, filhos, ...)
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from comum.arvores import FlorestaCompilada, compilar
+
+VERSAO_FORMATO = 1
+MANIFESTO = "manifesto.json"
+
+# mkstemp/mkdtemp criam 0600/0700; o que é publicado fica com o modo que open()/mkdir() dariam
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+MODO_ARQUIVO = 0o666 & ~_UMASK
+MODO_DIRETORIO = 0o777 & ~_UMASK
+
+
+class ModeloLinear:
+    """Regressão logística binária: sigmoid(X @ coef + intercepto)"""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, coef, intercepto, features=None, origem=""):
+        self.coef_ = coef
+        self.intercepto = intercepto
+        self.feature_names_in_ = np.array(features) if features is not None else None
+        self.origem = origem
+
+    def predict_proba(self, X):
+        margem = np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercepto[0]
+        p1 = 1.0 / (1.0 + np.exp(-margem))
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+    def arrays(self):
+        return {"coef": self.coef_, "intercepto": self.intercepto}
+
+    def parametros(self):
+        return {"origem": self.origem}
+
+
+def exportar(modelo):
+    """Converte o estimador em um modelo só de arrays, ou devolve None se não for suportado"""
+    try:
+        motor = compilar(modelo)
+    except ValueError:
+        # Variante que o motor não reproduz (loss, init, multiclasse): fica só o pickle
+        return None
+    if motor is not None:
+        return motor
+
+    if type(modelo).__name__ == "LogisticRegression" and modelo.coef_.shape[0] == 1:
+        features = getattr(modelo, "feature_names_in_", None)
+        return ModeloLinear(
+            np.ascontiguousarray(modelo.coef_[0], dtype=np.float64),
+            np.asarray(modelo.intercept_, dtype=np.float64),
+            features=None if features is None else list(features),
+            origem="LogisticRegression"
+        )
+    return None
+
+
+def escrever_atomico(caminho, conteudo):
+    """Grava `conteudo` (bytes) em um temporário e troca com os.replace"""
+    caminho = Path(caminho)
+    fd, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=f".{caminho.name}.")
+    try:
+        os.fchmod(fd, MODO_ARQUIVO)
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+
+
+def vincular_atomico(origem, caminho):
+    """Hardlink de `origem` em `caminho` (cópia, se o link não for possível), trocado com os.replace"""
+    caminho = Path(caminho)
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}")
+    temporario.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(origem, temporario)
+        except OSError:
+            shutil.copyfile(origem, temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
+
+def salvar_artefato(modelo_exportado, diretorio):
+    """Grava o artefato em um diretório temporário e o move para `diretorio`.
+
+    Se o diretório já existir, a versão antiga é renomeada antes e apagada
+    depois; processos que ainda a mapeiam continuam lendo os arquivos antigos.
+    """
+    diretorio = Path(diretorio)
+    diretorio.parent.mkdir(parents=True, exist_ok=True)
+    temporario = Path(tempfile.mkdtemp(dir=diretorio.parent, prefix=f".{diretorio.name}."))
+    os.chmod(temporario, MODO_DIRETORIO)
+
+    arrays = {}
+    for nome, array in modelo_exportado.arrays().items():
+        array = np.ascontiguousarray(array)
+        np.save(temporario / f"{nome}.npy", array)
+        arrays[nome] = {"arquivo": f"{nome}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+
+    features = modelo_exportado.feature_names_in_
+    manifesto = {
+        "formato": VERSAO_FORMATO,
+        "tipo": "arvores" if isinstance(modelo_exportado, FlorestaCompilada) else "linear",
+        "features": None if features is None else list(features),
+        "parametros": modelo_exportado.parametros(),
+        "arrays": arrays,
+    }
+    with open(temporario / MANIFESTO, "w") as f:
+        json.dump(manifesto, f, indent=2)
+
+    antigo = None
+    if diretorio.exists():
+        antigo = diretorio.with_name(f".{diretorio.name}.antigo")
+        shutil.rmtree(antigo, ignore_errors=True)
+        os.replace(diretorio, antigo)
+    os.replace(temporario, diretorio)
+    if antigo is not None:
+        shutil.rmtree(antigo, ignore_errors=True)
+
+    return manifesto
+
+
+def carregar_artefato(diretorio, mmap=True):
+    """Carrega o artefato; com `mmap=True` nenhum array é copiado para a memória do processo"""
+    diretorio = Path(diretorio)
+    with open(diretorio / MANIFESTO) as f:
+        manifesto = json.load(f)
+
+    if manifesto["formato"] != VERSAO_FORMATO:
+        raise ValueError(f"Formato de artefato não suportado: {manifesto['formato']}")
+
+    arrays = {
+        nome: np.load(diretorio / info["arquivo"], mmap_mode="r" if mmap else None)
+        for nome, info in manifesto["arrays"].items()
+    }
+    parametros = manifesto["parametros"]
+
+    if manifesto["tipo"] == "arvores":
+        return FlorestaCompilada(features=manifesto["features"], **arrays, **parametros)
+    if manifesto["tipo"] == "linear":
+        return ModeloLinear(arrays["coef"], arrays["intercepto"],
+                            features=manifesto["features"], origem=parametros["origem"])
+    raise ValueError(f"Tipo de artefato desconhecido: {manifesto['tipo']}")
+
+
+def tamanho_artefato(diretorio):
+    """Bytes ocupados pelos arquivos do artefato"""
+    return sum(p.stat().st_size for p in Path(diretorio).iterdir() if p.is_file())
@@ -0,0 +1,264 @@
+"""
+Motor de inferência para ensembles de árvores.
+
+Exporta RandomForest, GradientBoosting (binário) e XGBoost para tabelas
+de nós planas (feature, limiar, esquerda, direita, valor) e avalia todas
+as árvores de uma vez com uma travessia vetorizada em NumPy: o laço em
+Python é por nível de profundidade, não por árvore.
+"""
+import json
+import numpy as np
+
+# Limita o tamanho da matriz (linhas x árvores) percorrida de uma vez
+MAX_CELULAS_BLOCO = 1 << 20
+
+
+class FlorestaCompilada:
+    """Ensemble compilado, com a mesma interface de `predict_proba` do sklearn.
+
+    Folhas apontam para si mesmas, então a travessia roda `profundidade`
+    passos para todas as árvores sem precisar de máscara.
+
+    `agregacao`:
+        "media" - probabilidade média das folhas (RandomForest)
+        "logit" - sigmoid(base + soma das folhas) (GradientBoosting, XGBoost)
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, feature, limiar, filhos, valor, raizes,
+                 profundidade, agregacao, base=0.0, features=None, origem=""):
+        self.feature = feature
+        self.limiar = limiar
+        # filhos[:, 0] = esquerda, filhos[:, 1] = direita
+        self.filhos = filhos
+        self.valor = valor
+        self.raizes = raizes
+        self.profundidade = int(profundidade)
+        self.agregacao = agregacao
+        self.base = float(base)
+        self.feature_names_in_ = np.array(features) if features is not None else None
+        self.origem = origem
+
+    @property
+    def esquerda(self):
+        return self.filhos[:, 0]
+
+    @property
+    def direita(self):
+        return self.filhos[:, 1]
+
+    @property
+    def n_arvores(self):
+        return len(self.raizes)
+
+    @property
+    def n_nos(self):
+        return len(self.feature)
+
+    def _folhas(self, X):
+        """Índice da folha alcançada em cada árvore: matriz (n, n_arvores)"""
+        n, n_features = X.shape
+        valores_x = X.ravel()
+        # Posição de cada par (linha, árvore) na matriz achatada
+        linha = np.repeat(np.arange(n, dtype=np.intp) * n_features, self.n_arvores)
+        nos = np.tile(self.raizes.astype(np.intp), n)
+
+        filhos = self.filhos.reshape(-1)
+        posicao = np.empty_like(nos)
+        x = np.empty(len(nos), dtype=X.dtype)
+        limiar = np.empty(len(nos), dtype=self.limiar.dtype)
+        direita = np.empty(len(nos), dtype=bool)
+        for _ in range(self.profundidade):
+            np.take(self.feature, nos, out=posicao)
+            posicao += linha
+            np.take(valores_x, posicao, out=x)
+            np.take(self.limiar, nos, out=limiar)
+            np.greater(x, limiar, out=direita)
+            # filhos achatados: [esq0, dir0, esq1, dir1, ...]
+            nos *= 2
+            nos += direita
+            np.take(filhos, nos, out=nos)
+        return nos.reshape(n, self.n_arvores)
+
+    def predict_proba(self, X):
+        # Árvores do sklearn e do XGBoost comparam em float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n = X.shape[0]
+        bloco = max(1, MAX_CELULAS_BLOCO // max(1, self.n_arvores))
+
+        p1 = np.empty(n, dtype=np.float64)
+        for inicio in range(0, n, bloco):
+            fim = min(n, inicio + bloco)
+            folhas = self.valor[self._folhas(X[inicio:fim])]
+            if self.agregacao == "media":
+                p1[inicio:fim] = folhas.mean(axis=1)
+            else:
+                margem = self.base + folhas.sum(axis=1)
+                p1[inicio:fim] = 1.0 / (1.0 + np.exp(-margem))
+
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+    def arrays(self):
+        """Tabelas de nós, para gravação no artefato"""
+        return {
+            "feature": self.feature, "limiar": self.limiar, "filhos": self.filhos,
+            "valor": self.valor, "raizes": self.raizes,
+        }
+
+    def parametros(self):
+        return {
+            "profundidade": self.profundidade,
+            "agregacao": self.agregacao,
+            "base": self.base,
+            "origem": self.origem,
+        }
+
+
+def _empilhar(tabelas):
+    """Concatena tabelas por árvore em arrays globais com índices deslocados"""
+    feature, limiar, esquerda, direita, valor, raizes = [], [], [], [], [], []
+    profundidade = 0
+    deslocamento = 0
+    for t_feature, t_limiar, t_esq, t_dir, t_valor, t_prof in tabelas:
+        n = len(t_feature)
+        folha = t_esq < 0
+        proprio = np.arange(n) + deslocamento
+
+        feature.append(np.where(folha, 0, t_feature))
+        limiar.append(t_limiar)
+        esquerda.append(np.where(folha, proprio, t_esq + deslocamento))
+        direita.append(np.where(folha, proprio, t_dir + deslocamento))
+        valor.append(t_valor)
+        raizes.append(deslocamento)
+
+        profundidade = max(profundidade, t_prof)
+        deslocamento += n
+
+    return dict(
+        feature=np.concatenate(feature).astype(np.intp),
+        limiar=np.concatenate(limiar).astype(np.float64),
+        filhos=np.column_stack([np.concatenate(esquerda), np.concatenate(direita)]).astype(np.intp),
+        valor=np.concatenate(valor).astype(np.float64),
+        raizes=np.array(raizes, dtype=np.int32),
+        profundidade=profundidade,
+    )
+
+
+def _tabela_sklearn(tree, valor):
+    return (tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            valor, tree.max_depth)
+
+
+def _compilar_random_forest(modelo):
+    tabelas = []
+    for arvore in modelo.estimators_:
+        tree = arvore.tree_
+        contagens = tree.value[:, 0, :]
+        tabelas.append(_tabela_sklearn(tree, contagens[:, 1] / contagens.sum(axis=1)))
+    return dict(_empilhar(tabelas), agregacao="media")
+
+
+def _compilar_gradient_boosting(modelo):
+    if modelo.estimators_.shape[1] != 1:
+        raise ValueError("GradientBoosting multiclasse não é suportado")
+
+    # predict_proba = sigmoid(escala * margem): log_loss usa a margem, exponential o dobro dela.
+    # O init do exponential já é meio logit da prior, então a base dobrada volta a ser o logit
+    if modelo.loss == "log_loss":
+        escala = 1.0
+    elif modelo.loss == "exponential":
+        escala = 2.0
+    else:
+        raise ValueError(f"GradientBoosting com loss={modelo.loss!r} não é suportado")
+
+    if modelo.init_ == "zero":
+        base = 0.0
+    elif hasattr(modelo.init_, "class_prior_"):
+        p = modelo.init_.class_prior_[1]
+        base = np.log(p / (1 - p))
+    else:
+        raise ValueError("GradientBoosting com init personalizado não é suportado")
+
+    tabelas = []
+    for arvore in modelo.estimators_[:, 0]:
+        tree = arvore.tree_
+        tabelas.append(_tabela_sklearn(tree, escala * modelo.learning_rate * tree.value[:, 0, 0]))
+    return dict(_empilhar(tabelas), agregacao="logit", base=base)
+
+
+def _compilar_xgboost(modelo):
+    booster = modelo.get_booster()
+    config = json.loads(booster.save_config())
+    if config["learner"]["objective"]["name"] != "binary:logistic":
+        raise ValueError("Apenas XGBoost binary:logistic é suportado")
+
+    base_score = float(config["learner"]["learner_model_param"]["base_score"].strip("[]"))
+    nomes = booster.feature_names or []
+    indice_feature = {nome: i for i, nome in enumerate(nomes)}
+
+    dumps = booster.get_dump(dump_format="json")
+    try:
+        dumps = dumps[:modelo.best_iteration + 1]
+    except AttributeError:
+        pass
+
+    tabelas = []
+    for dump in dumps:
+        nos = {}
+        pilha = [(json.loads(dump), 0)]
+        profundidade = 0
+        while pilha:
+            no, nivel = pilha.pop()
+            nos[no["nodeid"]] = no
+            profundidade = max(profundidade, nivel)
+            pilha.extend((filho, nivel + 1) for filho in no.get("children", []))
+
+        n = max(nos) + 1
+        t_feature = np.zeros(n, dtype=np.intp)
+        t_limiar = np.zeros(n, dtype=np.float64)
+        t_esq = np.full(n, -1, dtype=np.int32)
+        t_dir = np.full(n, -1, dtype=np.int32)
+        t_valor = np.zeros(n, dtype=np.float64)
+        for i, no in nos.items():
+            if "leaf" in no:
+                t_valor[i] = no["leaf"]
+                continue
+            split = no["split"]
+            t_feature[i] = indice_feature[split] if split in indice_feature else int(split.lstrip("f"))
+            # XGBoost vai para "yes" quando x < limiar (float32); x <= anterior(limiar) é equivalente
+            t_limiar[i] = np.nextafter(np.float32(no["split_condition"]), np.float32(-np.inf))
+            t_esq[i] = no["yes"]
+            t_dir[i] = no["no"]
+        tabelas.append((t_feature, t_limiar, t_esq, t_dir, t_valor, profundidade))
+
+    base = np.log(base_score / (1 - base_score))
+    return dict(_empilhar(tabelas), agregacao="logit", base=base)
+
+
+def compilar(modelo):
+    """Compila o modelo para `FlorestaCompilada`, ou devolve None se não for um ensemble suportado"""
+    nome = type(modelo).__name__
+    if nome == "RandomForestClassifier":
+        tabelas = _compilar_random_forest(modelo)
+    elif nome == "GradientBoostingClassifier":
+        tabelas = _compilar_gradient_boosting(modelo)
+    elif nome == "XGBClassifier":
+        tabelas = _compilar_xgboost(modelo)
+    else:
+        return None
+
+    if len(getattr(modelo, "classes_", [0, 1])) != 2:
+        raise ValueError("Apenas classificação binária é suportada")
+
+    features = getattr(modelo, "feature_names_in_", None)
+    if features is None and nome == "XGBClassifier":
+        features = modelo.get_booster().feature_names
+    return FlorestaCompilada(
+        features=None if features is None else list(features),
+        origem=nome,
+        **tabelas
+    )
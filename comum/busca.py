@@ -0,0 +1,228 @@
+"""
+Busca de hiperparâmetros por successive halving.
+
+Em vez de pagar o treino completo de cada configuração da grade, a busca
+começa um espaço maior com poucas árvores, avalia o F1 em um holdout e
+mantém só o melhor terço (`eta`) para o próximo degrau, com o triplo de
+árvores. Ensembles crescem com warm start (só as árvores novas são
+treinadas) e boosting para de crescer quando o F1 deixa de melhorar.
+
+Os finalistas são retreinados no treino completo e registrados no MLflow
+como na grade, então a promoção continua funcionando igual.
+"""
+import time
+import uuid
+from concurrent.futures import as_completed
+
+import mlflow
+from mlflow.tracking import MlflowClient
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+from comum import experimentos as exp
+from comum.experimentos import HAS_XGBOOST
+
+if HAS_XGBOOST:
+    from xgboost import XGBClassifier
+
+MIN_ARVORES = 25
+MAX_ARVORES = 500
+ETA = 3
+
+BOOSTING = ("GradientBoostingClassifier", "XGBClassifier")
+
+
+def espaco_busca():
+    """Espaço de configurações (mais amplo que a grade); o nº de árvores é o recurso da busca"""
+    candidatos = []
+    for depth in (8, 12, 16, None):
+        for features in ("sqrt", None):
+            candidatos.append({
+                "nome": f"RandomForest (depth={depth}, feat={features})",
+                "model": RandomForestClassifier(max_depth=depth, max_features=features, random_state=42)
+            })
+
+    for lr in (0.05, 0.1, 0.2):
+        for depth in (2, 3, 4):
+            candidatos.append({
+                "nome": f"GradientBoosting (lr={lr}, depth={depth})",
+                "model": GradientBoostingClassifier(learning_rate=lr, max_depth=depth, random_state=42)
+            })
+
+    if HAS_XGBOOST:
+        for lr in (0.05, 0.1, 0.2):
+            for depth in (3, 6):
+                candidatos.append({
+                    "nome": f"XGBoost (lr={lr}, depth={depth})",
+                    "model": XGBClassifier(learning_rate=lr, max_depth=depth, random_state=42, eval_metric='logloss')
+                })
+
+    for c in (0.1, 1.0, 10.0):
+        candidatos.append({
+            "nome": f"LogisticRegression (C={c})",
+            "model": LogisticRegression(C=c, max_iter=1000, random_state=42)
+        })
+    return candidatos
+
+
+def usa_arvores(modelo):
+    return "n_estimators" in modelo.get_params()
+
+
+def crescer(modelo, arvores, arvores_atuais, X, y):
+    """Leva o modelo até `arvores` árvores treinando só as que faltam"""
+    nome = type(modelo).__name__
+    if nome == "XGBClassifier":
+        # Continua o boosting a partir do booster atual
+        modelo.set_params(n_estimators=arvores - arvores_atuais)
+        modelo.fit(X, y, xgb_model=modelo.get_booster() if arvores_atuais else None)
+        modelo.set_params(n_estimators=arvores)
+    elif usa_arvores(modelo):
+        modelo.set_params(warm_start=True, n_estimators=arvores)
+        modelo.fit(X, y)
+    else:
+        modelo.fit(X, y)
+    return modelo
+
+
+def _degrau_no_worker(indice, modelo, arvores, arvores_atuais):
+    from threadpoolctl import threadpool_limits
+
+    X_fit, y_fit, X_val, y_val = exp._dados
+    with threadpool_limits(limits=exp._threads):
+        exp._limitar_threads(modelo, exp._threads)
+        inicio_cpu = time.process_time()
+        crescer(modelo, arvores, arvores_atuais, X_fit, y_fit)
+        cpu = time.process_time() - inicio_cpu
+        f1 = f1_score(y_val, modelo.predict(X_val))
+    return indice, modelo, f1, cpu
+
+
+def custo_grade(experiment_id):
+    """CPU de treino e melhor F1 da última execução da grade neste experimento"""
+    runs = mlflow.search_runs(
+        experiment_ids=[experiment_id],
+        filter_string="tags.modo = 'grade'",
+        order_by=["attributes.start_time DESC"]
+    )
+    if len(runs) == 0 or "metrics.cpu_treino_s" not in runs:
+        return None
+    ultima = runs[runs["tags.execucao"] == runs["tags.execucao"].iloc[0]]
+    return {
+        "cpu": float(ultima["metrics.cpu_treino_s"].sum()),
+        "f1": float(ultima["metrics.f1_score"].max()),
+        "n": len(ultima),
+    }
+
+
+def busca_sucessiva(experiment_id, X_train, X_test, y_train, y_test, candidatos=None, n_finalistas=ETA, n_jobs=None):
+    """Successive halving sobre `candidatos` (padrão: `espaco_busca()`).
+
+    Cada degrau é registrado no MLflow em runs filhos de um run "Busca sucessiva"
+    (métricas por passo, sem `f1_score`, para não concorrer na promoção).
+    Devolve os resultados dos finalistas no mesmo formato de `rodar_experimentos`.
+    """
+    candidatos = candidatos or espaco_busca()
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+    )
+
+    cliente = MlflowClient()
+    execucao = uuid.uuid4().hex[:12]
+    pai = cliente.create_run(experiment_id, run_name="Busca sucessiva",
+                             tags={"modo": "busca", "execucao": execucao}).info.run_id
+    filhos = [
+        cliente.create_run(experiment_id, run_name=c["nome"], tags={
+            "mlflow.parentRunId": pai, "modo": "busca-degrau", "execucao": execucao
+        }).info.run_id
+        for c in candidatos
+    ]
+
+    estado = [
+        {"modelo": c["model"], "arvores": 0, "treinado": False, "f1": -1.0, "cpu": 0.0, "convergido": False}
+        for c in candidatos
+    ]
+    vivos = list(range(len(candidatos)))
+    workers, threads = exp.dividir_nucleos(len(candidatos), n_jobs)
+    arvores = MIN_ARVORES
+    degrau = 0
+    inicio = time.perf_counter()
+
+    print(f"🔎 Busca sucessiva: {len(candidatos)} candidatos, eta={ETA}, {MIN_ARVORES}→{MAX_ARVORES} árvores\n")
+    with exp.criar_pool((X_fit, y_fit, X_val, y_val), workers, threads) as pool:
+        while True:
+            # Boosting que parou de melhorar não recebe mais árvores
+            tarefas = [i for i in vivos if not estado[i]["convergido"]
+                       and (not estado[i]["treinado"] or usa_arvores(estado[i]["modelo"]))]
+            futuros = [
+                pool.submit(_degrau_no_worker, i, estado[i]["modelo"], arvores, estado[i]["arvores"])
+                for i in tarefas
+            ]
+            for futuro in as_completed(futuros):
+                i, modelo, f1, cpu = futuro.result()
+                e = estado[i]
+                if type(modelo).__name__ in BOOSTING and e["arvores"] and f1 <= e["f1"]:
+                    e["convergido"] = True
+                e.update(modelo=modelo, f1=f1, cpu=e["cpu"] + cpu, treinado=True,
+                         arvores=arvores if usa_arvores(modelo) else 0)
+
+                cliente.log_metric(filhos[i], "f1_validacao", f1, step=degrau)
+                cliente.log_metric(filhos[i], "n_estimators", e["arvores"], step=degrau)
+                cliente.log_metric(filhos[i], "cpu_treino_s", e["cpu"], step=degrau)
+
+            vivos.sort(key=lambda i: -estado[i]["f1"])
+            melhor = estado[vivos[0]]
+            print(f"   Degrau {degrau}: {len(vivos):2d} vivos, {len(tarefas):2d} treinados até {arvores:3d} árvores"
+                  f" | melhor F1 (holdout): {melhor['f1']:.3f} {candidatos[vivos[0]]['nome']}")
+
+            if len(vivos) <= n_finalistas or arvores >= MAX_ARVORES:
+                break
+
+            manter = max(n_finalistas, len(vivos) // ETA)
+            for i in vivos[manter:]:
+                cliente.set_tag(filhos[i], "eliminado_no_degrau", degrau)
+            vivos = vivos[:manter]
+            arvores = min(MAX_ARVORES, arvores * ETA)
+            degrau += 1
+
+    for run_id in filhos:
+        cliente.set_terminated(run_id)
+
+    cpu_busca = sum(e["cpu"] for e in estado)
+    print(f"\n   CPU da busca: {cpu_busca:.1f}s em {time.perf_counter() - inicio:.1f}s de parede\n")
+
+    # Finalistas: retreinados do zero no treino completo com o nº de árvores alcançado
+    finalistas = []
+    for i in vivos[:n_finalistas]:
+        modelo = clone(candidatos[i]["model"])
+        nome = candidatos[i]["nome"]
+        if usa_arvores(modelo):
+            modelo.set_params(n_estimators=estado[i]["arvores"], warm_start=False)
+            nome = nome.replace("(", f"(n={estado[i]['arvores']}, ", 1)
+        finalistas.append({"nome": nome, "model": modelo})
+
+    print("🏁 Finalistas (treino completo):\n")
+    resultados = exp.rodar_experimentos(finalistas, X_train, X_test, y_train, y_test, n_jobs=n_jobs, modo="busca")
+    cpu_total = cpu_busca + sum(r["cpu_treino"] for r in resultados)
+    f1_final = max(r["f1"] for r in resultados)
+
+    cliente.log_metric(pai, "cpu_busca_s", cpu_total)
+    cliente.log_metric(pai, "f1_finalista", f1_final)
+    cliente.log_metric(pai, "n_candidatos", len(candidatos))
+    cliente.log_metric(pai, "n_degraus", degrau + 1)
+
+    grade = custo_grade(experiment_id)
+    print(f"\n💰 CUSTO DE TREINO (CPU-segundos)")
+    print(f"   Busca sucessiva: {cpu_total:7.1f}s  ({len(candidatos)} candidatos) | F1 final: {f1_final:.3f}")
+    if grade is not None:
+        cliente.log_metric(pai, "cpu_grade_s", grade["cpu"])
+        print(f"   Grade completa:  {grade['cpu']:7.1f}s  ({grade['n']} modelos)    | F1 final: {grade['f1']:.3f}")
+        print(f"   Economia: {(1 - cpu_total / grade['cpu']) * 100:.0f}% de CPU")
+    else:
+        print(f"   Grade completa: sem execução registrada neste experimento (rode sem --busca para comparar)")
+
+    cliente.set_terminated(pai)
+    return resultados
@@ -0,0 +1,118 @@
+"""
+Cache de resultados da API: LRU com TTL, por versão de modelo e vetor codificado.
+
+Transações repetidas (retentativas de pagamento, reenvios do front-end)
+chegam ao mesmo vetor de features. A chave é a versão carregada mais os
+bytes da linha já codificada, e o valor é a probabilidade calibrada. A
+decisão continua saindo do limiar da versão a cada chamada.
+
+Um único lock por lote protege o OrderedDict: a busca e a gravação de um
+lote inteiro acontecem em uma seção crítica cada, então uma falta custa
+uma consulta de dict por linha.
+"""
+import collections
+import itertools
+import threading
+import time
+
+import numpy as np
+
+
+class CacheResultados:
+    def __init__(self, capacidade=10_000, ttl_s=300.0):
+        self.capacidade = capacidade
+        self.ttl_s = ttl_s
+        self._itens = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.expulsoes = 0
+        self.expirados = 0
+        self.invalidados = 0
+
+    @staticmethod
+    def chaves(matriz):
+        """Bytes de cada linha da matriz codificada (cópias, seguras após o buffer ser reutilizado)"""
+        matriz = np.ascontiguousarray(matriz)
+        if len(matriz) == 1:
+            # Requisição unitária (o caso comum do /predict): evita montar o dtype void
+            return [matriz.tobytes()]
+        return matriz.view(np.dtype((np.void, matriz.shape[1] * matriz.itemsize))).ravel().tolist()
+
+    def obter(self, modelo, matriz, calcular):
+        """Probabilidades de `matriz` para a versão `modelo`, chamando `calcular` só nas linhas fora do cache"""
+        chaves = list(zip(itertools.repeat(modelo), self.chaves(matriz)))
+        agora = time.monotonic()
+        with self._lock:
+            itens = self._itens
+            encontrados = list(map(itens.get, chaves))
+            if encontrados.count(None) == len(chaves):
+                # Caminho comum de uma falta: nenhuma linha em cache, sem laço em Python
+                self.faltas += len(chaves)
+                faltando = None
+            else:
+                valores, faltando = [], []
+                for i, item in enumerate(encontrados):
+                    if item is not None and item[1] > agora:
+                        itens.move_to_end(chaves[i])
+                        valores.append(item[0])
+                        continue
+                    if item is not None:
+                        del itens[chaves[i]]
+                        self.expirados += 1
+                    faltando.append(i)
+                    valores.append(0.0)
+                self.acertos += len(chaves) - len(faltando)
+                self.faltas += len(faltando)
+
+        if faltando is None:
+            probabilidades = np.asarray(calcular(matriz), dtype=np.float64)
+            self.guardar(chaves, probabilidades.tolist())
+            return probabilidades
+        probabilidades = np.array(valores)
+        if faltando:
+            probabilidades[faltando] = calcular(matriz[faltando])
+            self.guardar([chaves[i] for i in faltando], probabilidades[faltando].tolist())
+        return probabilidades
+
+    def guardar(self, chaves, valores):
+        """Grava pares ((modelo, bytes da linha), probabilidade) como os mais recentes"""
+        expira = time.monotonic() + self.ttl_s
+        with self._lock:
+            itens = self._itens
+            for chave, valor in zip(chaves, valores):
+                # update não move chaves que já existem: uma entrada regravada vira a mais recente
+                itens[chave] = (valor, expira)
+                itens.move_to_end(chave)
+            excesso = len(itens) - self.capacidade
+            for _ in range(max(excesso, 0)):
+                itens.popitem(last=False)
+            self.expulsoes += max(excesso, 0)
+
+    def invalidar(self, manter=()):
+        """Descarta as entradas das versões fora de `manter` (todas, por padrão)"""
+        manter = set(manter)
+        with self._lock:
+            antes = len(self._itens)
+            if manter:
+                self._itens = collections.OrderedDict((k, v) for k, v in self._itens.items() if k[0] in manter)
+            else:
+                self._itens = collections.OrderedDict()
+            self.invalidados += antes - len(self._itens)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            "itens": len(self._itens),
+            "capacidade": self.capacidade,
+            "ttl_s": self.ttl_s,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / consultas if consultas else None,
+            "expulsoes": self.expulsoes,
+            "expirados": self.expirados,
+            "invalidados": self.invalidados,
+        }
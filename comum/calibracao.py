@@ -0,0 +1,135 @@
+"""
+Calibração de probabilidades e escolha do limiar de decisão.
+
+Na promoção, o holdout é dividido ao meio: um calibrador (Platt ou
+isotônico) é ajustado sobre as probabilidades do modelo na primeira
+metade e, na segunda, o Brier decide se ele fica e todos os limiares
+possíveis são avaliados em uma única passada pelos scores ordenados. O
+calibrador vira dois arrays (x, y) aplicados com `np.interp`; o limiar
+escolhido vai para o metadata da versão.
+
+Configuração (variáveis de ambiente):
+    CALIBRACAO       platt (padrão), isotonica ou nenhuma
+    LIMIAR_CRITERIO  f1 (padrão) ou custo
+    CUSTO_FN         custo de uma fraude não detectada (padrão 10)
+    CUSTO_FP         custo de bloquear uma transação legítima (padrão 1)
+"""
+import os
+
+import numpy as np
+
+CALIBRACAO = os.environ.get("CALIBRACAO", "platt")
+LIMIAR_CRITERIO = os.environ.get("LIMIAR_CRITERIO", "f1")
+CUSTO_FN = float(os.environ.get("CUSTO_FN", 10.0))
+CUSTO_FP = float(os.environ.get("CUSTO_FP", 1.0))
+
+# Pontos da curva de Platt (uniformes no espaço logit)
+PONTOS_PLATT = 257
+EPS = 1e-7
+
+
+def _sigmoide(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class Calibrador:
+    """Mapa monótono probabilidade → probabilidade calibrada, em dois arrays"""
+
+    def __init__(self, x, y, metodo):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.metodo = metodo
+
+    def aplicar(self, probabilidades):
+        return np.interp(probabilidades, self.x, self.y)
+
+    def para_array(self):
+        return np.vstack([self.x, self.y])
+
+    @classmethod
+    def de_array(cls, array, metodo):
+        return cls(array[0], array[1], metodo)
+
+
+def ajustar_calibrador(probabilidades, y, metodo=CALIBRACAO):
+    """Ajusta o calibrador na metade de calibração do holdout; devolve None com `metodo="nenhuma"`"""
+    probabilidades = np.asarray(probabilidades, dtype=np.float64)
+    y = np.asarray(y)
+    if metodo == "nenhuma":
+        return None
+
+    if metodo == "isotonica":
+        from sklearn.isotonic import IsotonicRegression
+
+        isotonica = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(probabilidades, y)
+        return Calibrador(isotonica.X_thresholds_, isotonica.y_thresholds_, metodo)
+
+    if metodo == "platt":
+        from sklearn.linear_model import LogisticRegression
+
+        p = np.clip(probabilidades, EPS, 1 - EPS)
+        logit = np.log(p / (1 - p)).reshape(-1, 1)
+        regressao = LogisticRegression(C=1e6).fit(logit, y)
+        a, b = regressao.coef_[0, 0], regressao.intercept_[0]
+        grade = np.linspace(np.log(EPS / (1 - EPS)), -np.log(EPS / (1 - EPS)), PONTOS_PLATT)
+        return Calibrador(_sigmoide(grade), _sigmoide(a * grade + b), metodo)
+
+    raise ValueError(f"Método de calibração desconhecido: {metodo}")
+
+
+def brier(y, probabilidades):
+    return float(np.mean((np.asarray(probabilidades, dtype=np.float64) - np.asarray(y)) ** 2))
+
+
+def metricas_no_limiar(y, probabilidades, limiar):
+    y = np.asarray(y).astype(bool)
+    preditas = np.asarray(probabilidades) >= limiar
+    tp = int(np.count_nonzero(preditas & y))
+    fp = int(np.count_nonzero(preditas & ~y))
+    fn = int(np.count_nonzero(~preditas & y))
+    return {
+        "limiar": float(limiar),
+        "f1": 2 * tp / max(2 * tp + fp + fn, 1),
+        "precision": tp / max(tp + fp, 1),
+        "recall": tp / max(tp + fn, 1),
+        "custo": CUSTO_FN * fn + CUSTO_FP * fp,
+    }
+
+
+def varrer_limiares(y, probabilidades, criterio=LIMIAR_CRITERIO, custo_fn=CUSTO_FN, custo_fp=CUSTO_FP):
+    """Melhor limiar por F1 ou por custo, avaliando todos os cortes em uma passada.
+
+    Com os scores em ordem decrescente, TP e FP de cada corte são somas
+    acumuladas. Empates ficam sempre do mesmo lado, e o limiar devolvido é
+    o ponto médio entre o score do corte e o próximo score distinto.
+    """
+    probabilidades = np.asarray(probabilidades, dtype=np.float64)
+    ordem = np.argsort(-probabilidades, kind="stable")
+    scores = probabilidades[ordem]
+    positivos_ordenados = np.asarray(y)[ordem].astype(bool)
+
+    tp = np.cumsum(positivos_ordenados)
+    fp = np.cumsum(~positivos_ordenados)
+    cortes = np.flatnonzero(np.append(scores[1:] != scores[:-1], True))
+    tp, fp = tp[cortes], fp[cortes]
+    fn = tp[-1] - tp
+
+    f1 = 2 * tp / np.maximum(2 * tp + fp + fn, 1)
+    custo = custo_fn * fn + custo_fp * fp
+    if criterio == "f1":
+        melhor = int(np.argmax(f1))
+    elif criterio == "custo":
+        melhor = int(np.argmin(custo))
+    else:
+        raise ValueError(f"Critério de limiar desconhecido: {criterio}")
+
+    proximo = scores[cortes[melhor] + 1] if cortes[melhor] + 1 < len(scores) else 0.0
+    return {
+        "criterio": criterio,
+        "limiar": float((scores[cortes[melhor]] + proximo) / 2),
+        "f1": float(f1[melhor]),
+        "precision": float(tp[melhor] / max(tp[melhor] + fp[melhor], 1)),
+        "recall": float(tp[melhor] / max(tp[-1], 1)),
+        "custo": float(custo[melhor]),
+        "cortes_avaliados": len(cortes),
+    }
@@ -0,0 +1,286 @@
+"""
+Acesso aos dados de transações.
+
+Os CSVs mensais são lidos em blocos com tipos compactos (float32/int8)
+e convertidos uma única vez para um cache colunar: um `.npy` por coluna,
+particionado por mês (coluna `data`) e identificado pelo hash do CSV.
+As execuções seguintes leem do cache (com mmap) sem passar pelo parser
+de CSV, e o índice de meses permite abrir só o período pedido.
+
+Layout do cache (`dados/.cache`, ou DADOS_CACHE_DIR):
+    indice.json                      arquivos (tamanho, mtime, hash) e meses -> partições
+    <hash>/manifesto.json            colunas, dtypes e linhas/fraudes por mês
+    <hash>/<mes>/<coluna>.npy        uma coluna de um mês
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from comum.artefato import MODO_DIRETORIO, escrever_atomico
+from comum.features import CATEGORIAS, FEATURES
+
+DADOS_DIR = Path(__file__).resolve().parent.parent / "dados"
+CACHE_DIR = Path(os.environ.get("DADOS_CACHE_DIR", DADOS_DIR / ".cache"))
+LINHAS_POR_BLOCO = int(os.environ.get("DADOS_LINHAS_POR_BLOCO", 1_000_000))
+
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+         "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+VERSAO_CACHE = 1
+INDICE = "indice.json"
+MANIFESTO = "manifesto.json"
+
+# Esquema dos CSVs mensais com tipos compactos
+TIPO_CATEGORIA = pd.CategoricalDtype(list(CATEGORIAS))
+DTYPES = {
+    "transaction_id": "object",
+    "data": "object",
+    "valor": np.float32,
+    "hora": np.int8,
+    "categoria": TIPO_CATEGORIA,
+    "categoria_cod": np.int8,
+    "qtd_transacoes_24h": np.int16,
+    "is_fraud": np.int8,
+}
+COLUNAS = list(DTYPES)
+
+
+def ler_csv_em_blocos(caminho, linhas_por_bloco=LINHAS_POR_BLOCO, colunas=None):
+    """Gera DataFrames de até `linhas_por_bloco` linhas com os tipos de `DTYPES`"""
+    colunas = colunas or COLUNAS
+    with pd.read_csv(caminho, usecols=colunas, dtype={c: DTYPES[c] for c in colunas},
+                     chunksize=linhas_por_bloco) as leitor:
+        for bloco in leitor:
+            yield bloco[colunas]
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo, lido em blocos de 1 MB"""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        while bloco := f.read(1 << 20):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _ler_json(caminho, padrao):
+    try:
+        with open(caminho) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return padrao
+
+
+def _colunas_numpy(bloco):
+    """Colunas do bloco como arrays NumPy (texto em bytes UTF-8 de largura fixa, categoria em códigos)"""
+    arrays = {}
+    for coluna in bloco.columns:
+        serie = bloco[coluna]
+        if coluna == "categoria":
+            arrays[coluna] = serie.cat.codes.to_numpy()
+        elif serie.dtype == object:
+            # astype("S") codifica em ASCII e falha em ids com acento
+            arrays[coluna] = np.char.encode(serie.to_numpy().astype(str), "utf-8")
+        else:
+            arrays[coluna] = serie.to_numpy()
+    return arrays
+
+
+def _juntar_partes(partes, destino):
+    """Concatena as partes de uma coluna em um único .npy sem carregá-las juntas"""
+    arrays = [np.load(p, mmap_mode="r") for p in partes]
+    total = sum(len(a) for a in arrays)
+    saida = np.lib.format.open_memmap(destino, mode="w+", dtype=np.result_type(*arrays), shape=(total,))
+    posicao = 0
+    for a in arrays:
+        saida[posicao:posicao + len(a)] = a
+        posicao += len(a)
+    saida.flush()
+    del saida
+    for p in partes:
+        os.remove(p)
+
+
+def construir_cache(caminho, hash_csv, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Converte o CSV para o cache colunar particionado por mês; devolve o manifesto.
+
+    Cada bloco é gravado como partes por (mês, coluna) e as partes são
+    concatenadas no final, então a memória usada é a de um bloco.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    destino = CACHE_DIR / hash_csv[:16]
+    temporario = Path(tempfile.mkdtemp(dir=CACHE_DIR, prefix=f".{destino.name}."))
+    os.chmod(temporario, MODO_DIRETORIO)
+
+    try:
+        partes = {}
+        meses = {}
+        for n_bloco, bloco in enumerate(ler_csv_em_blocos(caminho, linhas_por_bloco)):
+            for mes, grupo in bloco.groupby("data", sort=False):
+                (temporario / mes).mkdir(exist_ok=True)
+                for coluna, array in _colunas_numpy(grupo.drop(columns="data")).items():
+                    parte = temporario / mes / f"{coluna}.{n_bloco}.parte.npy"
+                    np.save(parte, array)
+                    partes.setdefault((mes, coluna), []).append(parte)
+                info = meses.setdefault(mes, {"linhas": 0, "fraudes": 0})
+                info["linhas"] += len(grupo)
+                info["fraudes"] += int(grupo["is_fraud"].sum())
+
+        for (mes, coluna), lista in partes.items():
+            _juntar_partes(lista, temporario / mes / f"{coluna}.npy")
+
+        manifesto = {
+            "formato": VERSAO_CACHE,
+            "arquivo": Path(caminho).name,
+            "hash": hash_csv,
+            "colunas": [c for c in COLUNAS if c != "data"],
+            "categorias": list(TIPO_CATEGORIA.categories),
+            "meses": meses,
+        }
+        with open(temporario / MANIFESTO, "w") as f:
+            json.dump(manifesto, f, indent=2)
+
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(temporario, destino)
+    except BaseException:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+    return manifesto
+
+
+def atualizar_indice(diretorio=DADOS_DIR):
+    """Garante o cache de todos os CSVs de `diretorio` e devolve o índice de meses.
+
+    Arquivos com tamanho e mtime iguais aos do índice não são relidos; os
+    demais têm o hash recalculado e só são convertidos se o conteúdo mudou.
+    """
+    indice = _ler_json(CACHE_DIR / INDICE, {"formato": VERSAO_CACHE, "arquivos": {}, "meses": {}})
+    if indice.get("formato") != VERSAO_CACHE:
+        indice = {"formato": VERSAO_CACHE, "arquivos": {}, "meses": {}}
+
+    arquivos = {}
+    for caminho in sorted(Path(diretorio).glob("*.csv")):
+        stat = caminho.stat()
+        anterior = indice["arquivos"].get(caminho.name)
+        if (anterior and anterior["tamanho"] == stat.st_size and anterior["mtime_ns"] == stat.st_mtime_ns
+                and (CACHE_DIR / anterior["hash"][:16] / MANIFESTO).exists()):
+            arquivos[caminho.name] = anterior
+            continue
+
+        hash_csv = hash_arquivo(caminho)
+        manifesto = _ler_json(CACHE_DIR / hash_csv[:16] / MANIFESTO, None)
+        if manifesto is None or manifesto.get("formato") != VERSAO_CACHE:
+            print(f"🗂️  Convertendo {caminho.name} para o cache colunar...")
+            manifesto = construir_cache(caminho, hash_csv)
+        arquivos[caminho.name] = {
+            "tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "hash": hash_csv, "meses": manifesto["meses"],
+        }
+
+    meses = {}
+    for nome, info in arquivos.items():
+        for mes, contagem in info["meses"].items():
+            meses.setdefault(mes, []).append({"arquivo": nome, "particao": f"{info['hash'][:16]}/{mes}", **contagem})
+
+    novo = {"formato": VERSAO_CACHE, "arquivos": arquivos, "meses": dict(sorted(meses.items()))}
+    if novo != indice:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        escrever_atomico(CACHE_DIR / INDICE, json.dumps(novo, indent=2).encode())
+    return novo["meses"]
+
+
+def meses_disponiveis(diretorio=DADOS_DIR):
+    """Meses presentes nos dados, com linhas e fraudes de cada um"""
+    return {
+        mes: {"linhas": sum(p["linhas"] for p in particoes), "fraudes": sum(p["fraudes"] for p in particoes)}
+        for mes, particoes in atualizar_indice(diretorio).items()
+    }
+
+
+def nome_mes(mes):
+    """Mês por extenso: 2025-10 -> Outubro 2025"""
+    ano, numero = mes.split("-")
+    return f"{MESES[int(numero) - 1]} {ano}"
+
+
+def _particoes(meses, diretorio):
+    indice = atualizar_indice(diretorio)
+    faltando = [m for m in meses if m not in indice]
+    if faltando:
+        raise KeyError(f"Mês sem dados em {diretorio}: {', '.join(faltando)} (disponíveis: {', '.join(indice)})")
+    return [(mes, CACHE_DIR / p["particao"]) for mes in meses for p in indice[mes]]
+
+
+def _montar(arrays, colunas, mes, inicio, fim):
+    dados = {}
+    for coluna in colunas:
+        if coluna == "data":
+            dados[coluna] = mes
+            continue
+        fatia = arrays[coluna][inicio:fim]
+        if coluna == "categoria":
+            dados[coluna] = pd.Categorical.from_codes(fatia, dtype=TIPO_CATEGORIA)
+        elif fatia.dtype.kind == "S":
+            dados[coluna] = np.char.decode(fatia, "utf-8").astype(object)
+        else:
+            dados[coluna] = np.array(fatia)
+    return pd.DataFrame(dados, index=pd.RangeIndex(fim - inicio))
+
+
+def iterar_periodo(*meses, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO, diretorio=DADOS_DIR):
+    """Gera DataFrames de até `linhas_por_bloco` linhas dos meses pedidos (ex.: "2025-11").
+
+    As colunas são mapeadas do cache, então só o bloco corrente fica em memória.
+    """
+    colunas = list(colunas or COLUNAS)
+    for mes, particao in _particoes(meses, diretorio):
+        arrays = {c: np.load(particao / f"{c}.npy", mmap_mode="r") for c in colunas if c != "data"}
+        n = len(np.load(particao / "is_fraud.npy", mmap_mode="r"))
+        for inicio in range(0, n, linhas_por_bloco):
+            yield _montar(arrays, colunas, mes, inicio, min(n, inicio + linhas_por_bloco))
+
+
+def carregar_periodo(*meses, colunas=None, diretorio=DADOS_DIR):
+    """DataFrame com todas as linhas dos meses pedidos (para quem precisa do período inteiro)"""
+    blocos = list(iterar_periodo(*meses, colunas=colunas, linhas_por_bloco=1 << 62, diretorio=diretorio))
+    return blocos[0] if len(blocos) == 1 else pd.concat(blocos, ignore_index=True)
+
+
+# Holdout fixo (30%, estratificado): o mesmo corte nos experimentos, no retreino e na calibração da promoção
+FRACAO_HOLDOUT = 0.3
+SEMENTE_HOLDOUT = 42
+
+
+def dividir_holdout(df):
+    """(X_train, X_test, y_train, y_test) com as FEATURES do modelo"""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(df[FEATURES], df["is_fraud"], test_size=FRACAO_HOLDOUT,
+                            random_state=SEMENTE_HOLDOUT, stratify=df["is_fraud"])
+
+
+def partes_holdout(meses, poda=False):
+    """Holdout dos `meses` em duas metades estratificadas para a promoção: {"calibracao": (X, y), "avaliacao": (X, y)}.
+
+    O calibrador é ajustado na primeira; Brier, limiar e F1 saem da segunda,
+    que não participou do ajuste. Com `poda`, metade da parte de calibração
+    vira a parte `poda`, onde se escolhe quantas árvores o ensemble mantém.
+    """
+    from sklearn.model_selection import train_test_split
+
+    _, X, _, y = dividir_holdout(carregar_periodo(*meses))
+    X_calibracao, X_avaliacao, y_calibracao, y_avaliacao = train_test_split(
+        X, y, test_size=0.5, random_state=SEMENTE_HOLDOUT, stratify=y)
+    partes = {"avaliacao": (X_avaliacao, y_avaliacao)}
+    if poda:
+        X_calibracao, X_poda, y_calibracao, y_poda = train_test_split(
+            X_calibracao, y_calibracao, test_size=0.5, random_state=SEMENTE_HOLDOUT, stratify=y_calibracao)
+        partes["poda"] = (X_poda, y_poda)
+    partes["calibracao"] = (X_calibracao, y_calibracao)
+    return partes
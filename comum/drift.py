@@ -0,0 +1,242 @@
+"""
+Monitor de drift online.
+
+Cada lote pontuado pela API é colocado em um anel (`collections.deque`
+com `maxlen`: append e popleft são atômicos, então o caminho da
+requisição não usa lock). Uma tarefa em segundo plano esvazia o anel,
+soma histogramas de bordas fixas por feature e pela probabilidade em uma
+janela deslizante e compara a janela com o esboço de referência salvo na
+promoção (PSI e KS).
+"""
+import asyncio
+import collections
+import time
+from datetime import datetime
+
+import numpy as np
+
+from comum.features import CATEGORIAS, CodificadorFeatures
+
+# Bordas fixas dos histogramas (o bin i é [bordas[i-1], bordas[i])), iguais
+# na referência e na API, então os esboços podem ser somados e comparados
+ESQUEMA = {
+    "valor": np.geomspace(1.0, 100_000.0, 21),
+    "hora": np.arange(1, 24, dtype=np.float64),
+    "categoria_cod": np.arange(1, max(CATEGORIAS.values()) + 1, dtype=np.float64),
+    "qtd_transacoes_24h": np.arange(1, 31, dtype=np.float64),
+    "probabilidade": np.linspace(0.05, 0.95, 19),
+}
+# Features sem ordem: o KS não se aplica
+CATEGORICAS = {"categoria_cod"}
+NOMES_CATEGORIAS = {cod: nome for nome, cod in CATEGORIAS.items()}
+
+PSI_MODERADO = 0.10
+PSI_SIGNIFICATIVO = 0.25
+PROPORCAO_MINIMA = 1e-4
+
+
+class EsbocoFeatures:
+    """Histogramas de contagem por feature, com as bordas de `ESQUEMA`"""
+
+    def __init__(self, contagens=None):
+        self.contagens = contagens or {f: np.zeros(len(b) + 1, dtype=np.int64) for f, b in ESQUEMA.items()}
+
+    @property
+    def n(self):
+        return max((int(c.sum()) for c in self.contagens.values()), default=0)
+
+    def atualizar(self, X, features, probabilidades):
+        """Soma as linhas de X (colunas na ordem de `features`) e as probabilidades"""
+        for j, f in enumerate(features):
+            if f in self.contagens:
+                self._somar(f, X[:, j])
+        self._somar("probabilidade", probabilidades)
+        return self
+
+    def _somar(self, feature, valores):
+        bordas = ESQUEMA[feature]
+        self.contagens[feature] += np.bincount(np.searchsorted(bordas, valores, side="right"), minlength=len(bordas) + 1)
+
+    def somar(self, outro, sinal=1):
+        for f, c in outro.contagens.items():
+            self.contagens[f] += sinal * c
+        return self
+
+    @classmethod
+    def de_blocos(cls, modelo, blocos, codificador=None):
+        """Esboço das features e das probabilidades do modelo sobre blocos de DataFrame"""
+        codificador = codificador or CodificadorFeatures.do_modelo(modelo)
+        esboco = cls()
+        for bloco in blocos:
+            X = codificador.codificar_dataframe(bloco)
+            esboco.atualizar(X, codificador.features, modelo.predict_proba(X)[:, 1])
+        return esboco
+
+    def para_dict(self):
+        return {
+            "bordas": {f: ESQUEMA[f].tolist() for f in self.contagens},
+            "contagens": {f: c.tolist() for f, c in self.contagens.items()},
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Carrega um esboço salvo; features cujas bordas mudaram desde então ficam de fora"""
+        esboco = cls()
+        for f, contagem in dados["contagens"].items():
+            if f in ESQUEMA and np.allclose(dados["bordas"][f], ESQUEMA[f]):
+                esboco.contagens[f] = np.asarray(contagem, dtype=np.int64)
+            else:
+                esboco.contagens.pop(f, None)
+        return esboco
+
+
+def _proporcoes(contagem):
+    p = contagem / max(contagem.sum(), 1)
+    return np.maximum(p, PROPORCAO_MINIMA)
+
+
+def psi(referencia, atual):
+    """Population Stability Index entre duas contagens com as mesmas bordas"""
+    p, q = _proporcoes(referencia), _proporcoes(atual)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks(referencia, atual):
+    """Maior distância entre as distribuições acumuladas (resolução dos bins)"""
+    p = np.cumsum(referencia) / max(referencia.sum(), 1)
+    q = np.cumsum(atual) / max(atual.sum(), 1)
+    return float(np.max(np.abs(p - q)))
+
+
+def classificar(valor_psi):
+    if valor_psi >= PSI_SIGNIFICATIVO:
+        return "significativo"
+    if valor_psi >= PSI_MODERADO:
+        return "moderado"
+    return "estavel"
+
+
+def comparar(referencia, atual):
+    """PSI/KS por feature e categorias que não existiam na referência"""
+    features = {}
+    for f, ref in referencia.contagens.items():
+        if f not in atual.contagens:
+            continue
+        valor_psi = psi(ref, atual.contagens[f])
+        features[f] = {
+            "psi": round(valor_psi, 4),
+            "ks": None if f in CATEGORICAS else round(ks(ref, atual.contagens[f]), 4),
+            "status": classificar(valor_psi),
+        }
+
+    novas = []
+    if "categoria_cod" in referencia.contagens:
+        ref, cat = referencia.contagens["categoria_cod"], atual.contagens["categoria_cod"]
+        novas = [NOMES_CATEGORIAS.get(c, str(c)) for c in np.flatnonzero((ref == 0) & (cat > 0))]
+    return features, novas
+
+
+class MonitorDrift:
+    """Janela deslizante de esboços do tráfego comparada com a referência do modelo ativo.
+
+    `obter_modelo` devolve o modelo ativo, com `referencia` (EsbocoFeatures
+    ou None), `versao` e `codificador`. Quando o modelo muda, a janela recomeça.
+    """
+
+    def __init__(self, obter_modelo, intervalo_s=5.0, janela_s=3600.0, capacidade=4096, min_amostras=200):
+        self.obter_modelo = obter_modelo
+        self.intervalo_s = intervalo_s
+        self.min_amostras = min_amostras
+        self._anel = collections.deque(maxlen=capacidade)
+        self._fatias = collections.deque(maxlen=max(1, int(janela_s / intervalo_s)))
+        self._tarefa = None
+
+        self.modelo = None
+        self.janela = EsbocoFeatures()
+        self.n_total = 0
+        self.lotes_descartados = 0
+        self.atualizado_em = None
+        self.processamento_ms = 0.0
+
+    def registrar(self, modelo, X, probabilidades):
+        """Caminho da requisição: só copia o lote para o anel"""
+        if self._tarefa is None:
+            return
+        if len(self._anel) == self._anel.maxlen:
+            self.lotes_descartados += 1
+        self._anel.append((modelo, X.copy(), probabilidades))
+
+    async def iniciar(self):
+        self._tarefa = asyncio.create_task(self._loop())
+
+    async def parar(self):
+        if self._tarefa is None:
+            return
+        self._tarefa.cancel()
+        try:
+            await self._tarefa
+        except asyncio.CancelledError:
+            pass
+        self._tarefa = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.intervalo_s)
+            self.processar()
+
+    def processar(self):
+        """Esvazia o anel em uma fatia nova da janela (descartando a mais antiga)"""
+        inicio = time.perf_counter()
+        modelo = self.obter_modelo()
+        if modelo is not self.modelo:
+            self.modelo = modelo
+            self.janela = EsbocoFeatures()
+            self._fatias.clear()
+
+        lotes = []
+        while self._anel:
+            lote = self._anel.popleft()
+            # Lotes pontuados por uma versão anterior do modelo não entram na janela nova
+            if lote[0] is modelo:
+                lotes.append(lote)
+
+        fatia = EsbocoFeatures()
+        if lotes:
+            fatia.atualizar(np.concatenate([l[1] for l in lotes]), modelo.codificador.features,
+                            np.concatenate([l[2] for l in lotes]))
+        if len(self._fatias) == self._fatias.maxlen:
+            self.janela.somar(self._fatias[0], sinal=-1)
+        self._fatias.append(fatia)
+        self.janela.somar(fatia)
+
+        self.n_total += fatia.n
+        self.atualizado_em = datetime.now().isoformat(timespec="seconds")
+        self.processamento_ms = (time.perf_counter() - inicio) * 1000
+
+    def relatorio(self):
+        modelo = self.modelo if self.modelo is not None else self.obter_modelo()
+        base = {
+            "versao_referencia": getattr(modelo, "versao", None),
+            "janela_s": self.intervalo_s * self._fatias.maxlen,
+            "n_janela": self.janela.n,
+            "n_total": self.n_total,
+            "lotes_descartados": self.lotes_descartados,
+            "atualizado_em": self.atualizado_em,
+            "processamento_ms": round(self.processamento_ms, 3),
+        }
+        if self._tarefa is None:
+            return {"status": "desligado", **base}
+        referencia = getattr(modelo, "referencia", None)
+        if referencia is None:
+            return {"status": "sem_referencia", **base}
+        if self.janela.n < self.min_amostras:
+            return {"status": "aguardando_amostras", "min_amostras": self.min_amostras, **base}
+
+        features, novas = comparar(referencia, self.janela)
+        pior = max((f["psi"] for f in features.values()), default=0.0)
+        return {
+            "status": "significativo" if novas else classificar(pior),
+            **base,
+            "features": features,
+            "categorias_novas": novas,
+        }
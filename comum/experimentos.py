@@ -0,0 +1,314 @@
+"""
+Execução de experimentos em paralelo.
+
+Treina as configurações em um pool de processos e registra cada resultado
+no MLflow a partir do processo principal (um único escritor no file store
+de `../mlruns`). Com validação cruzada (comum.validacao), os folds de todos
+os candidatos entram no mesmo pool, e o `f1_score` registrado é a média
+dos folds. As threads internas de cada modelo (n_jobs do sklearn,
+threads do XGBoost, BLAS/OpenMP) são limitadas para que
+`workers x threads` não passe do número de núcleos.
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+
+import mlflow
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score, precision_score, recall_score
+
+try:
+    from xgboost import XGBClassifier
+    HAS_XGBOOST = True
+except ImportError:
+    HAS_XGBOOST = False
+
+from comum.orcamento import medir_servico
+from comum.placar import adicionar_run
+from comum.validacao import K_FOLDS, FoldsCompartilhados
+
+
+def grade_padrao():
+    """Configurações testadas em Outubro e no retreino"""
+    experimentos = [
+        # RandomForest
+        {"nome": "RandomForest (n=100, depth=10)", "model": RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)},
+        {"nome": "RandomForest (n=200, depth=15)", "model": RandomForestClassifier(n_estimators=200, max_depth=15, random_state=42)},
+        {"nome": "RandomForest (n=500, depth=20)", "model": RandomForestClassifier(n_estimators=500, max_depth=20, random_state=42)},
+
+        # GradientBoosting
+        {"nome": "GradientBoosting (n=100, lr=0.1)", "model": GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, random_state=42)},
+        {"nome": "GradientBoosting (n=200, lr=0.05)", "model": GradientBoostingClassifier(n_estimators=200, learning_rate=0.05, random_state=42)},
+        {"nome": "GradientBoosting (n=300, lr=0.1)", "model": GradientBoostingClassifier(n_estimators=300, learning_rate=0.1, random_state=42)},
+
+        # LogisticRegression
+        {"nome": "LogisticRegression (C=1.0)", "model": LogisticRegression(C=1.0, max_iter=1000, random_state=42)},
+        {"nome": "LogisticRegression (C=0.1)", "model": LogisticRegression(C=0.1, max_iter=1000, random_state=42)},
+        {"nome": "LogisticRegression (C=10.0)", "model": LogisticRegression(C=10.0, max_iter=1000, random_state=42)},
+    ]
+
+    # Adicionar XGBoost se disponível
+    if HAS_XGBOOST:
+        experimentos.insert(3, {"nome": "XGBoost (n=100, lr=0.1)", "model": XGBClassifier(n_estimators=100, learning_rate=0.1, random_state=42, eval_metric='logloss')})
+        experimentos.insert(4, {"nome": "XGBoost (n=200, lr=0.05)", "model": XGBClassifier(n_estimators=200, learning_rate=0.05, random_state=42, eval_metric='logloss')})
+        experimentos.insert(5, {"nome": "XGBoost (n=300, lr=0.1)", "model": XGBClassifier(n_estimators=300, learning_rate=0.1, random_state=42, eval_metric='logloss')})
+
+    return experimentos
+
+
+def custo_estimado(modelo):
+    """Custo relativo de treino, usado para agendar os modelos mais caros primeiro"""
+    params = modelo.get_params()
+    arvores = params.get("n_estimators") or 1
+    profundidade = params.get("max_depth") or 6
+    return arvores * profundidade
+
+
+def _limitar_threads(modelo, threads):
+    """Ajusta o paralelismo interno do estimador, quando ele tiver"""
+    params = modelo.get_params()
+    if "n_jobs" in params:
+        modelo.set_params(n_jobs=threads)
+    if "nthread" in params:
+        modelo.set_params(nthread=threads)
+    return modelo
+
+
+# Estado de cada processo do pool (definido uma vez no inicializador)
+_dados = None
+_threads = 1
+_folds = None
+
+
+def _inicializar_worker(dados, threads, folds=None):
+    global _dados, _threads, _folds
+    _dados = dados
+    _threads = threads
+    _folds = FoldsCompartilhados.abrir(folds) if folds is not None else None
+    for variavel in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variavel] = str(threads)
+
+
+def avaliar(modelo, X_train, y_train, X_test, y_test):
+    """Treina e avalia um modelo; devolve métricas e tempos"""
+    inicio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    modelo.fit(X_train, y_train)
+    tempo_treino = time.perf_counter() - inicio
+    cpu_treino = time.process_time() - inicio_cpu
+
+    inicio = time.perf_counter()
+    y_pred = modelo.predict(X_test)
+    tempo_predicao = time.perf_counter() - inicio
+
+    return {
+        "f1": f1_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "tempo_treino": tempo_treino,
+        "cpu_treino": cpu_treino,
+        "tempo_predicao": tempo_predicao,
+    }
+
+
+def _rodar_no_worker(indice, modelo):
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(limits=_threads):
+        metricas = avaliar(_limitar_threads(modelo, _threads), *_dados)
+    return indice, modelo, metricas
+
+
+def _fold_no_worker(indice, modelo, fold):
+    """Treina uma cópia do modelo no fold (views da memória compartilhada) e avalia no fold de teste"""
+    from threadpoolctl import threadpool_limits
+
+    X_treino, y_treino, X_teste, y_teste = _folds.fold(fold)
+    with threadpool_limits(limits=_threads):
+        metricas = avaliar(_limitar_threads(clone(modelo), _threads), X_treino, y_treino, X_teste, y_teste)
+    return indice, fold, metricas
+
+
+def resumir_folds(metricas_folds):
+    """Média e desvio das métricas dos folds, no formato das métricas extras do MLflow"""
+    f1 = np.array([m["f1"] for m in metricas_folds])
+    return {
+        "f1": float(f1.mean()),
+        "f1_cv_std": float(f1.std()),
+        "precision": float(np.mean([m["precision"] for m in metricas_folds])),
+        "recall": float(np.mean([m["recall"] for m in metricas_folds])),
+        "cpu_cv_s": sum(m["cpu_treino"] for m in metricas_folds),
+        "tempo_cv_s": sum(m["tempo_treino"] + m["tempo_predicao"] for m in metricas_folds),
+    }
+
+
+@lru_cache(maxsize=None)
+def requisitos_pip(xgboost=False):
+    """Requisitos do ambiente do modelo.
+
+    Passados explicitamente ao `log_model`, evitam que o MLflow abra um
+    subprocesso por run só para inferi-los (a maior parte do tempo de log).
+    """
+    pacotes = ["scikit-learn", "numpy", "pandas", "cloudpickle"] + (["xgboost"] if xgboost else [])
+    requisitos = []
+    for pacote in pacotes:
+        try:
+            requisitos.append(f"{pacote}=={version(pacote)}")
+        except PackageNotFoundError:
+            pass
+    return requisitos
+
+
+def resumo_treino(y_train):
+    """Parâmetros do run com as linhas que o modelo de fato viu (a promoção os leva para a metadata)"""
+    return {"n_transacoes_treino": len(y_train), "taxa_fraude_treino": round(float(y_train.mean()), 6)}
+
+
+def registrar_no_mlflow(nome, modelo, metricas, extras=None, tags=None, params=None):
+    """Cria o run no MLflow com parâmetros (os do modelo e `params`), métricas e o modelo; devolve o run_id"""
+    params = {**modelo.get_params(), **(params or {})}
+    valores = {
+        "f1_score": metricas["f1"],
+        "precision": metricas["precision"],
+        "recall": metricas["recall"],
+        "tempo_treino_s": metricas["tempo_treino"],
+        "cpu_treino_s": metricas["cpu_treino"],
+        "tempo_predicao_s": metricas["tempo_predicao"],
+        **(extras or {}),
+    }
+    with mlflow.start_run(run_name=nome, tags=tags) as run:
+        mlflow.log_params(params)
+        mlflow.log_metrics(valores)
+        info = mlflow.sklearn.log_model(
+            modelo, "model",
+            pip_requirements=requisitos_pip(type(modelo).__name__ == "XGBClassifier")
+        )
+    # Placar do experimento: a promoção lê o topo dele em vez de varrer todos os runs
+    adicionar_run(run.info, nome, valores, params, info)
+    return run.info.run_id
+
+
+def dividir_nucleos(n_tarefas, n_jobs=None):
+    """Divide os núcleos em (processos, threads por processo)"""
+    nucleos = n_jobs or int(os.environ.get("EXPERIMENTOS_N_JOBS", 0)) or os.cpu_count() or 1
+    workers = max(1, min(nucleos, n_tarefas))
+    return workers, max(1, nucleos // workers)
+
+
+def criar_pool(dados, workers, threads, folds=None):
+    """Pool de processos com os dados de treino/avaliação carregados uma vez por worker.
+
+    `folds` é o descritor de um `FoldsCompartilhados`; cada worker abre o bloco uma vez.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_inicializar_worker,
+        initargs=(dados, threads, folds)
+    )
+
+
+def rodar_experimentos(experimentos, X_train, X_test, y_train, y_test, n_jobs=None, modo="grade", folds=K_FOLDS):
+    """Treina todas as configurações em paralelo e registra no MLflow.
+
+    `n_jobs` é o total de núcleos a usar (padrão: EXPERIMENTOS_N_JOBS ou todos).
+    Com `folds` > 1 (padrão: EXPERIMENTOS_CV_FOLDS ou 5), cada configuração
+    também passa por validação cruzada no treino, e o F1 que a promoção
+    ordena é a média dos folds; o F1 no `X_test` vai para `f1_holdout`.
+    O modelo registrado continua treinado no `X_train` inteiro.
+    Cada run recebe as tags `modo` e `execucao` (id desta chamada).
+    Devolve a lista de resultados na ordem de `experimentos`.
+    """
+    folds = folds if folds > 1 else 0
+    workers, threads = dividir_nucleos(len(experimentos) * (1 + folds), n_jobs)
+    tags = {"modo": modo, "execucao": uuid.uuid4().hex[:12]}
+
+    # Mais caros primeiro: evita que o último modelo longo fique sozinho no fim
+    ordem = sorted(range(len(experimentos)), key=lambda i: -custo_estimado(experimentos[i]["model"]))
+
+    resultados = [None] * len(experimentos)
+    finais = [None] * len(experimentos)
+    metricas_folds = [[] for _ in experimentos]
+    prontos = []
+    inicio = time.perf_counter()
+
+    cv = FoldsCompartilhados.criar(X_train, y_train, folds) if folds else None
+    try:
+        with criar_pool((X_train, y_train, X_test, y_test), workers, threads,
+                        cv.descritor if cv is not None else None) as pool:
+            futuros = []
+            for i in ordem:
+                futuros.append(pool.submit(_rodar_no_worker, i, experimentos[i]["model"]))
+                futuros.extend(pool.submit(_fold_no_worker, i, experimentos[i]["model"], f) for f in range(folds))
+
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                indice = resultado[0]
+                if isinstance(resultado[1], int):
+                    metricas_folds[indice].append(resultado[2])
+                else:
+                    finais[indice] = resultado[1:]
+                # Pronto quando o modelo final e todos os folds da configuração terminaram
+                if finais[indice] is not None and len(metricas_folds[indice]) == folds:
+                    prontos.append(indice)
+    finally:
+        if cv is not None:
+            cv.fechar()
+
+    # Latência e tamanho medidos com o pool fechado: com os workers treinando
+    # ao lado, o p99 mede a disputa por CPU, não o modelo (comum.orcamento)
+    from threadpoolctl import threadpool_limits
+
+    melhor_f1 = -1.0
+    for indice in prontos:
+        modelo, metricas = finais[indice]
+        nome = experimentos[indice]["nome"]
+        inicio_servico = time.perf_counter()
+        with threadpool_limits(limits=1):
+            metricas["servico"] = medir_servico(modelo, X_test)
+        metricas["tempo_servico"] = time.perf_counter() - inicio_servico
+        extras = dict(metricas["servico"])
+        if folds:
+            metricas["f1_holdout"] = metricas["f1"]
+            metricas.update(resumir_folds(metricas_folds[indice]))
+            extras.update({chave: metricas[chave] for chave in ("f1_holdout", "f1_cv_std", "cpu_cv_s")})
+            extras["cv_folds"] = folds
+
+        inicio_log = time.perf_counter()
+        run_id = registrar_no_mlflow(nome, modelo, metricas, extras=extras, tags=tags, params=resumo_treino(y_train))
+        metricas["tempo_log"] = time.perf_counter() - inicio_log
+
+        resultados[indice] = {"nome": nome, "model": modelo, "run_id": run_id, **metricas}
+
+        # Mostrar resultado
+        destaque = " ⭐" if metricas["f1"] >= melhor_f1 else ""
+        melhor_f1 = max(melhor_f1, metricas["f1"])
+        servico = metricas["servico"]
+        custo = f" | p99 {servico['latencia_lote1_p99_ms']:.2f} ms, {servico['tamanho_mb']:.1f} MB"
+        if folds:
+            print(f"✅ {nome:40} | F1 ({folds} folds): {metricas['f1']:.3f} ± {metricas['f1_cv_std']:.3f} "
+                  f"| holdout: {metricas['f1_holdout']:.3f}{custo}{destaque}")
+        else:
+            print(f"✅ {nome:40} | F1: {metricas['f1']:.3f}{custo}{destaque}")
+
+    imprimir_tempos(resultados, time.perf_counter() - inicio, workers, threads)
+    return resultados
+
+
+def imprimir_tempos(resultados, tempo_total, workers, threads):
+    print(f"\n⏱️  TEMPOS ({workers} processos x {threads} threads)\n")
+    print(f"   {'Modelo':40} | {'treino':>8} | {'CPU':>8} | {'predição':>8} | {'folds':>8} | {'serviço':>8} | {'MLflow':>8}")
+    print(f"   {'─' * 107}")
+    for r in resultados:
+        print(f"   {r['nome']:40} | {r['tempo_treino']:7.2f}s | {r['cpu_treino']:7.2f}s | {r['tempo_predicao']:7.3f}s | "
+              f"{r.get('tempo_cv_s', 0.0):7.2f}s | {r.get('tempo_servico', 0.0):7.2f}s | {r['tempo_log']:7.2f}s")
+
+    soma = sum(r["tempo_treino"] + r["tempo_predicao"] + r.get("tempo_cv_s", 0.0) + r.get("tempo_servico", 0.0)
+               + r["tempo_log"] for r in resultados)
+    print(f"   {'─' * 107}")
+    print(f"   Tempo total (parede): {tempo_total:.1f}s | soma sequencial: {soma:.1f}s | ganho: {soma / tempo_total:.1f}x")
@@ -0,0 +1,91 @@
+"""
+Codificação de features.
+
+Esquema único de features usado no treino, na API (predição única,
+micro-lote e lote) e na pontuação offline, para que os caminhos
+não divirjam.
+"""
+import operator
+import threading
+import numpy as np
+
+FEATURES = ["valor", "hora", "categoria_cod", "qtd_transacoes_24h"]
+
+CATEGORIAS = {
+    "alimentacao": 1, "farmacia": 2, "transporte": 3,
+    "vestuario": 4, "restaurante": 5, "lazer": 6,
+    "eletronicos": 7, "livros": 8, "assinatura": 9,
+    "supermercado": 10, "joias": 11, "viagem": 12,
+    "pix": 13, "transferencia": 14
+}
+
+
+class CodificadorFeatures:
+    """Escreve transações direto em um buffer NumPy pré-alocado.
+
+    O buffer é reutilizado entre chamadas (um por thread), então a matriz
+    devolvida por `codificar` só é válida até a próxima chamada na mesma thread.
+    """
+
+    def __init__(self, features=FEATURES, dtype=np.float64, capacidade=256):
+        features = list(features)
+        desconhecidas = set(features) - set(FEATURES)
+        if desconhecidas:
+            raise ValueError(f"Features não suportadas: {sorted(desconhecidas)}")
+
+        self.features = features
+        self.dtype = np.dtype(dtype)
+        self.capacidade = capacidade
+
+        # Atributos lidos de cada transação, na ordem do modelo
+        atributos = ["categoria" if f == "categoria_cod" else f for f in features]
+        ler = operator.attrgetter(*atributos)
+        self._ler = ler if len(atributos) > 1 else (lambda t: (ler(t),))
+        self._pos_categoria = features.index("categoria_cod") if "categoria_cod" in features else None
+        self._local = threading.local()
+
+    @classmethod
+    def do_modelo(cls, modelo, **kwargs):
+        """Monta o codificador a partir do esquema salvo no modelo.
+
+        Árvores (sklearn e XGBoost) comparam em float32 internamente, então
+        usar float32 evita uma conversão por chamada; modelos lineares ficam em float64.
+        """
+        features = getattr(modelo, "feature_names_in_", None)
+        features = list(features) if features is not None else FEATURES
+        kwargs.setdefault("dtype", np.float64 if hasattr(modelo, "coef_") else np.float32)
+        return cls(features, **kwargs)
+
+    def _buffer(self, n):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < n:
+            buffer = np.empty((max(n, self.capacidade), len(self.features)), dtype=self.dtype)
+            self._local.buffer = buffer
+        return buffer
+
+    def codificar(self, transacoes):
+        """Codifica uma sequência de transações (objetos com os atributos do `TransacaoInput`)"""
+        n = len(transacoes)
+        buffer = self._buffer(n)
+        ler = self._ler
+        pos = self._pos_categoria
+
+        for i, t in enumerate(transacoes):
+            linha = list(ler(t))
+            if pos is not None:
+                linha[pos] = CATEGORIAS[linha[pos]]
+            buffer[i] = linha
+        return buffer[:n]
+
+    def codificar_dataframe(self, df, saida=None):
+        """Caminho offline: copia as colunas de um DataFrame para uma matriz nova (ou `saida`)"""
+        n = len(df)
+        if saida is None:
+            saida = np.empty((n, len(self.features)), dtype=self.dtype)
+
+        for j, f in enumerate(self.features):
+            if f == "categoria_cod" and f not in df.columns:
+                saida[:n, j] = df["categoria"].map(CATEGORIAS).to_numpy()
+            else:
+                saida[:n, j] = df[f].to_numpy()
+        return saida[:n]
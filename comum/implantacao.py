@@ -0,0 +1,156 @@
+"""
+Estatísticas por versão em implantações canário/sombra.
+
+A versão canário é pontuada no caminho da requisição (responde por uma
+fração do tráfego); cada versão servida acumula contadores em
+`EstatisticasVersao`, indexados pelo diretório da versão no registro (o
+rótulo, como "v2.0", pode se repetir entre builds). A versão sombra nunca responde: o caminho da
+requisição só coloca a matriz já codificada e as decisões da versão
+servida em um anel (deque, append atômico) e uma thread pontua a sombra
+depois, medindo discordância e latência.
+"""
+import asyncio
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class EstatisticasVersao:
+    """Contadores de uma versão: lotes, itens, fraudes e tempo de modelo"""
+
+    def __init__(self, versao=None):
+        self.versao = versao
+        self.lotes = 0
+        self.itens = 0
+        self.fraudes = 0
+        self.soma_ms = 0.0
+        self.max_ms = 0.0
+
+    def registrar(self, itens, fraudes, ms):
+        self.lotes += 1
+        self.itens += itens
+        self.fraudes += fraudes
+        self.soma_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def para_dict(self):
+        return {
+            "versao": self.versao,
+            "lotes": self.lotes,
+            "itens": self.itens,
+            "taxa_fraude": round(self.fraudes / self.itens, 4) if self.itens else None,
+            "latencia_media_ms": round(self.soma_ms / self.lotes, 3) if self.lotes else None,
+            "latencia_max_ms": round(self.max_ms, 3),
+        }
+
+
+class EstatisticasSombra(EstatisticasVersao):
+    """Além dos contadores, compara a sombra com a versão que respondeu"""
+
+    def __init__(self, versao=None):
+        super().__init__(versao)
+        self.discordancias = 0
+        self.soma_diferenca = 0.0
+        self.max_diferenca = 0.0
+
+    def comparar(self, probabilidades, fraudes, probabilidades_servidas, fraudes_servidas):
+        diferenca = np.abs(probabilidades - probabilidades_servidas)
+        self.discordancias += int(np.count_nonzero(fraudes != fraudes_servidas))
+        self.soma_diferenca += float(diferenca.sum())
+        self.max_diferenca = max(self.max_diferenca, float(diferenca.max(initial=0.0)))
+
+    def para_dict(self):
+        return {
+            **super().para_dict(),
+            "discordancias": self.discordancias,
+            "taxa_discordancia": round(self.discordancias / self.itens, 4) if self.itens else None,
+            "diferenca_media_prob": round(self.soma_diferenca / self.itens, 4) if self.itens else None,
+            "diferenca_max_prob": round(self.max_diferenca, 4),
+        }
+
+
+class AvaliadorSombra:
+    """Pontua a versão sombra em uma thread, fora da latência da resposta.
+
+    A sombra precisa de `identificador` (chave das estatísticas), `versao`,
+    `codificador`, `limiar` e `predict_proba`.
+    Quando o esquema de features da sombra é o mesmo da versão servida, a
+    matriz já codificada é reaproveitada; senão, as transações são
+    recodificadas na thread.
+    """
+
+    def __init__(self, intervalo_s=0.05, capacidade=1024):
+        self.intervalo_s = intervalo_s
+        self._anel = collections.deque(maxlen=capacidade)
+        self._parar = threading.Event()
+        self._thread = None
+
+        self.por_versao = {}
+        self.lotes_descartados = 0
+        self.erros = 0
+        self.ultimo_erro = None
+
+    def registrar(self, sombra, codificador, transacoes, matriz, probabilidades, fraudes):
+        """Caminho da requisição: só copia o lote para o anel"""
+        if self._thread is None:
+            return
+        if len(self._anel) == self._anel.maxlen:
+            self.lotes_descartados += 1
+        self._anel.append((sombra, codificador, transacoes, matriz.copy(), probabilidades, fraudes))
+
+    async def iniciar(self):
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="avaliador-sombra", daemon=True)
+        self._thread.start()
+
+    async def parar(self):
+        if self._thread is None:
+            return
+        self._parar.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo_s):
+            self.processar()
+
+    def processar(self):
+        while self._anel:
+            lote = self._anel.popleft()
+            try:
+                self._avaliar(*lote)
+            except Exception as e:
+                # Um lote que a sombra não consegue pontuar não derruba a thread
+                self.erros += 1
+                erro = f"{type(e).__name__}: {e}"
+                if erro != self.ultimo_erro:
+                    print(f"⚠️  Avaliador sombra: lote descartado ({erro})")
+                self.ultimo_erro = erro
+
+    def _avaliar(self, sombra, codificador, transacoes, matriz, probabilidades_servidas, fraudes_servidas):
+        mesmo_esquema = (sombra.codificador.features == codificador.features
+                         and sombra.codificador.dtype == codificador.dtype)
+        inicio = time.perf_counter()
+        X = matriz if mesmo_esquema else sombra.codificador.codificar(transacoes)
+        probabilidades = sombra.predict_proba(X)[:, 1]
+        ms = (time.perf_counter() - inicio) * 1000
+        fraudes = probabilidades >= sombra.limiar
+
+        estatisticas = self.por_versao.get(sombra.identificador)
+        if estatisticas is None:
+            estatisticas = self.por_versao[sombra.identificador] = EstatisticasSombra(sombra.versao)
+        estatisticas.registrar(len(X), int(fraudes.sum()), ms)
+        estatisticas.comparar(probabilidades, fraudes, probabilidades_servidas, fraudes_servidas)
+
+    def estatisticas(self):
+        return {
+            "ativo": self._thread is not None,
+            "na_fila": len(self._anel),
+            "lotes_descartados": self.lotes_descartados,
+            "erros": self.erros,
+            "ultimo_erro": self.ultimo_erro,
+            "versoes": {v: e.para_dict() for v, e in self.por_versao.items()},
+        }
@@ -0,0 +1,136 @@
+"""
+Retreino incremental a partir do modelo de produção.
+
+Em vez de refazer o treino com todo o histórico, carrega o modelo em
+produção e adiciona capacidade usando só os dados do mês novo:
+  - RandomForest / GradientBoosting: warm start com árvores extras
+  - XGBoost: continua o boosting a partir do booster atual
+Outros modelos (ex.: LogisticRegression) não têm o que acrescentar: o warm
+start deles é só um refit com o mês novo, e o retreino recusa.
+
+O resultado é comparado (F1 e tempo) com um refit completo da mesma
+configuração em histórico + mês novo, e os dois vão para o MLflow.
+"""
+import copy
+import time
+
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import f1_score, precision_score, recall_score
+
+from comum.dados import dividir_holdout
+from comum.experimentos import registrar_no_mlflow, resumo_treino
+from comum.features import FEATURES
+from comum.orcamento import medir_servico
+
+# Fração de árvores adicionadas ao modelo atual a cada mês
+FRACAO_ARVORES_NOVAS = 0.5
+MIN_ARVORES_NOVAS = 25
+
+
+def incrementar(modelo, X, y, fracao=FRACAO_ARVORES_NOVAS):
+    """Devolve uma cópia do modelo atualizada só com (X, y) e o nº de árvores adicionadas"""
+    modelo = copy.deepcopy(modelo)
+    nome = type(modelo).__name__
+
+    if nome == "XGBClassifier":
+        atuais = modelo.get_booster().num_boosted_rounds()
+        novas = max(MIN_ARVORES_NOVAS, int(atuais * fracao))
+        modelo.set_params(n_estimators=novas)
+        modelo.fit(X, y, xgb_model=modelo.get_booster())
+        modelo.set_params(n_estimators=atuais + novas)
+        return modelo, novas
+
+    if nome in ("RandomForestClassifier", "GradientBoostingClassifier"):
+        atuais = modelo.n_estimators
+        novas = max(MIN_ARVORES_NOVAS, int(atuais * fracao))
+        modelo.set_params(warm_start=True, n_estimators=atuais + novas)
+        modelo.fit(X, y)
+        return modelo, novas
+
+    raise ValueError(f"Retreino incremental só para ensembles de árvores; {nome} seria um refit só com o mês novo")
+
+
+def _medir(treinar, X_test, y_test):
+    inicio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    modelo = treinar()
+    tempo_treino = time.perf_counter() - inicio
+    cpu_treino = time.process_time() - inicio_cpu
+
+    inicio = time.perf_counter()
+    y_pred = modelo.predict(X_test)
+    tempo_predicao = time.perf_counter() - inicio
+
+    return modelo, {
+        "f1": f1_score(y_test, y_pred),
+        "precision": precision_score(y_test, y_pred),
+        "recall": recall_score(y_test, y_pred),
+        "tempo_treino": tempo_treino,
+        "cpu_treino": cpu_treino,
+        "tempo_predicao": tempo_predicao,
+    }
+
+
+def comparar_incremental(modelo_producao, metadata, df_historico, df_novo):
+    """Treina o modelo incremental e o refit completo e registra os dois no MLflow.
+
+    Ambos são avaliados no holdout do mês novo (`dividir_holdout`), que
+    nenhum deles viu e que a promoção usa para calibrar e escolher o limiar.
+    Devolve os resultados no formato de `rodar_experimentos`.
+    """
+    X_novo, X_test, y_novo, y_test = dividir_holdout(df_novo)
+    X_completo = pd.concat([df_historico[FEATURES], X_novo], ignore_index=True)
+    y_completo = pd.concat([df_historico["is_fraud"], y_novo], ignore_index=True)
+
+    algoritmo = metadata.get("algoritmo", type(modelo_producao).__name__)
+    print(f"   Modelo base: {metadata['versao']} - {algoritmo} (run {metadata['run_id'][:12]})")
+    print(f"   Incremental: {len(X_novo)} transações novas")
+    print(f"   Refit:       {len(X_completo)} transações (histórico + novas)\n")
+
+    arvores = {}
+
+    def treinar_incremental():
+        modelo, arvores["novas"] = incrementar(modelo_producao, X_novo, y_novo)
+        return modelo
+
+    def treinar_refit():
+        modelo = clone(modelo_producao)
+        if "warm_start" in modelo.get_params():
+            modelo.set_params(warm_start=False)
+        return modelo.fit(X_completo, y_completo)
+
+    modelo_inc, metricas_inc = _medir(treinar_incremental, X_test, y_test)
+    modelo_ref, metricas_ref = _medir(treinar_refit, X_test, y_test)
+
+    # O incremental continua o modelo base: viu as linhas do treino dele mais as novas
+    n_base = metadata.get("n_transacoes_treino", len(df_historico))
+    taxa_base = metadata.get("taxa_fraude_treino", float(df_historico["is_fraud"].mean()))
+    n_acumulado = n_base + len(y_novo)
+    treino_incremental = {
+        "n_transacoes_treino": n_acumulado,
+        "taxa_fraude_treino": round((n_base * taxa_base + float(y_novo.sum())) / n_acumulado, 6),
+    }
+
+    tags = {"modelo_base": metadata["run_id"], "versao_base": metadata["versao"]}
+    resultados = []
+    for nome, modo, modelo, metricas, extras, treino in (
+        (f"{algoritmo} + incremental", "incremental", modelo_inc, metricas_inc,
+         {"arvores_novas": arvores["novas"]}, treino_incremental),
+        (f"{algoritmo} (refit completo)", "refit-completo", modelo_ref, metricas_ref, {}, resumo_treino(y_completo)),
+    ):
+        extras.update(medir_servico(modelo, X_test))
+        inicio_log = time.perf_counter()
+        run_id = registrar_no_mlflow(nome, modelo, metricas, extras=extras, tags={**tags, "modo": modo},
+                                     params=treino)
+        metricas["tempo_log"] = time.perf_counter() - inicio_log
+        resultados.append({"nome": nome, "model": modelo, "run_id": run_id, **metricas})
+
+    print(f"   {'':48} | {'F1':>5} | {'treino':>8} | {'CPU':>8}")
+    print(f"   {'─' * 77}")
+    for r in resultados:
+        print(f"   {r['nome']:48} | {r['f1']:.3f} | {r['tempo_treino']:7.2f}s | {r['cpu_treino']:7.2f}s")
+    print(f"   {'─' * 77}")
+    print(f"   Diferença de F1: {metricas_inc['f1'] - metricas_ref['f1']:+.3f} | "
+          f"tempo de treino: {metricas_inc['tempo_treino'] / metricas_ref['tempo_treino'] * 100:.0f}% do refit")
+    return resultados
@@ -0,0 +1,154 @@
+"""
+Métricas de classificação acumuladas em blocos.
+
+`MatrizConfusao` soma a matriz de confusão (total e por categoria) e
+algumas somas das fraudes a cada bloco, então F1, precision, recall,
+taxa de fraude e os agregados por categoria saem de uma única passada
+pelos dados com memória constante, sem guardar os vetores de predição.
+"""
+import numpy as np
+
+from comum.features import CATEGORIAS, CodificadorFeatures
+
+# Código 0 reservado para categoria desconhecida
+N_CODIGOS = max(CATEGORIAS.values()) + 1
+NOMES_CATEGORIAS = {cod: nome for nome, cod in CATEGORIAS.items()}
+
+
+def _razao(a, b):
+    """a / b, com 0.0 quando b == 0 (mesmo padrão do `zero_division` do sklearn)"""
+    return float(a) / b if b else 0.0
+
+
+class MatrizConfusao:
+    """Acumulador de matriz de confusão binária, total e por `categoria_cod`.
+
+    `por_codigo[c, real, predito]` conta as transações da categoria `c`;
+    a matriz total é a soma sobre as categorias.
+    """
+
+    def __init__(self):
+        self.por_codigo = np.zeros((N_CODIGOS, 2, 2), dtype=np.int64)
+        self.soma_valor_fraudes = 0.0
+        self.soma_hora_fraudes = 0.0
+
+    def atualizar(self, y_real, y_predito, categoria_cod=None, valor=None, hora=None):
+        """Soma um bloco; `valor` e `hora` (opcionais) alimentam as médias das fraudes"""
+        y_real = np.asarray(y_real, dtype=np.int64)
+        y_predito = np.asarray(y_predito, dtype=np.int64)
+        codigos = 0
+        if categoria_cod is not None:
+            codigos = np.asarray(categoria_cod, dtype=np.int64)
+            codigos = np.where((codigos > 0) & (codigos < N_CODIGOS), codigos, 0)
+
+        chave = (codigos * 2 + y_real) * 2 + y_predito
+        self.por_codigo += np.bincount(chave, minlength=N_CODIGOS * 4).reshape(N_CODIGOS, 2, 2)
+
+        fraude = y_real == 1
+        if valor is not None:
+            self.soma_valor_fraudes += float(np.asarray(valor, dtype=np.float64)[fraude].sum())
+        if hora is not None:
+            self.soma_hora_fraudes += float(np.asarray(hora, dtype=np.float64)[fraude].sum())
+        return self
+
+    @property
+    def matriz(self):
+        """[[tn, fp], [fn, tp]]"""
+        return self.por_codigo.sum(axis=0)
+
+    @property
+    def n(self):
+        return int(self.por_codigo.sum())
+
+    @property
+    def fraudes(self):
+        return int(self.matriz[1].sum())
+
+    @property
+    def precision(self):
+        (_, fp), (_, tp) = self.matriz
+        return _razao(tp, tp + fp)
+
+    @property
+    def recall(self):
+        (_, _), (fn, tp) = self.matriz
+        return _razao(tp, tp + fn)
+
+    @property
+    def f1(self):
+        (_, fp), (fn, tp) = self.matriz
+        return _razao(2 * tp, 2 * tp + fp + fn)
+
+    @property
+    def taxa_fraude(self):
+        return _razao(self.fraudes, self.n)
+
+    @property
+    def valor_medio_fraudes(self):
+        return _razao(self.soma_valor_fraudes, self.fraudes)
+
+    @property
+    def hora_media_fraudes(self):
+        return _razao(self.soma_hora_fraudes, self.fraudes)
+
+    def para_dict(self):
+        return {
+            "por_codigo": self.por_codigo.tolist(),
+            "soma_valor_fraudes": self.soma_valor_fraudes,
+            "soma_hora_fraudes": self.soma_hora_fraudes,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        matriz = cls()
+        matriz.por_codigo = np.asarray(dados["por_codigo"], dtype=np.int64).reshape(N_CODIGOS, 2, 2)
+        matriz.soma_valor_fraudes = dados["soma_valor_fraudes"]
+        matriz.soma_hora_fraudes = dados["soma_hora_fraudes"]
+        return matriz
+
+    def categorias(self):
+        """Nomes das categorias com pelo menos uma transação"""
+        return [NOMES_CATEGORIAS.get(c, "desconhecida") for c in np.flatnonzero(self.por_codigo.sum(axis=(1, 2)))]
+
+    def por_categoria(self):
+        """{categoria: {n, fraudes, taxa_fraude, precision, recall, f1}} das categorias presentes"""
+        resultado = {}
+        for c in np.flatnonzero(self.por_codigo.sum(axis=(1, 2))):
+            (tn, fp), (fn, tp) = self.por_codigo[c]
+            n = int(tn + fp + fn + tp)
+            resultado[NOMES_CATEGORIAS.get(c, "desconhecida")] = {
+                "n": n,
+                "fraudes": int(fn + tp),
+                "taxa_fraude": _razao(fn + tp, n),
+                "precision": _razao(tp, tp + fp),
+                "recall": _razao(tp, tp + fn),
+                "f1": _razao(2 * tp, 2 * tp + fp + fn),
+            }
+        return resultado
+
+
+def avaliar_em_blocos(modelo, blocos, codificador=None, limiar=0.5, calibrador=None):
+    """Passa os blocos (DataFrames) pelo modelo e devolve a `MatrizConfusao` acumulada.
+
+    A decisão é `probabilidade >= limiar`, com a probabilidade calibrada
+    quando há `calibrador` (a mesma regra da API). A matriz de features de
+    cada bloco é escrita sempre no mesmo buffer.
+    """
+    codificador = codificador or CodificadorFeatures.do_modelo(modelo)
+    acumulador = MatrizConfusao()
+    buffer = None
+    for bloco in blocos:
+        if buffer is None or buffer.shape[0] < len(bloco):
+            buffer = np.empty((len(bloco), len(codificador.features)), dtype=codificador.dtype)
+        X = codificador.codificar_dataframe(bloco, saida=buffer)
+        probabilidades = modelo.predict_proba(X)[:, 1]
+        if calibrador is not None:
+            probabilidades = calibrador.aplicar(probabilidades)
+        acumulador.atualizar(
+            bloco["is_fraud"].to_numpy(),
+            probabilidades >= limiar,
+            categoria_cod=bloco["categoria_cod"].to_numpy() if "categoria_cod" in bloco else None,
+            valor=bloco["valor"].to_numpy() if "valor" in bloco else None,
+            hora=bloco["hora"].to_numpy() if "hora" in bloco else None,
+        )
+    return acumulador
@@ -0,0 +1,222 @@
+"""
+Custo de servir cada candidato e escolha da promoção sob orçamento.
+
+`medir_servico` mede o modelo pelo mesmo caminho da API: motor de arrays
+até `MOTOR_ARVORES_MAX_LOTE` linhas e estimador original acima disso. As
+medidas vão para o MLflow como métricas de cada run:
+    latencia_lote1_p50_ms, latencia_lote1_p99_ms       uma transação
+    latencia_lote256_p50_ms, latencia_lote256_p99_ms   lote de 256
+    pickle_mb, tamanho_mb                              pickle e pickle + arrays
+    carga_ms                                           pickle.loads
+
+Na promoção, vence o melhor F1 que cabe no orçamento (ORCAMENTO_P99_MS,
+ORCAMENTO_LOTE_P99_MS, ORCAMENTO_MB; 0 = sem limite). A fronteira de Pareto
+(F1 x latência x tamanho) é mostrada para deixar a troca visível. Com
+PODA_TOLERANCIA_F1 > 0, o ensemble vencedor perde as últimas árvores
+enquanto o F1 na parte de poda do holdout (`partes_holdout`, separada da
+calibração e da avaliação) não cair mais que a tolerância.
+"""
+import copy
+import os
+import pickle
+import time
+
+import numpy as np
+
+from comum.artefato import exportar
+from comum.features import CodificadorFeatures
+
+MOTOR_ARVORES_MAX_LOTE = int(os.environ.get("MOTOR_ARVORES_MAX_LOTE", 64))
+LOTES = (1, 256)
+
+# Orçamento da promoção: p99 de uma transação, p99 do lote de 256 e pickle + arrays
+ORCAMENTO = {
+    "latencia_lote1_p99_ms": float(os.environ.get("ORCAMENTO_P99_MS", 0)),
+    "latencia_lote256_p99_ms": float(os.environ.get("ORCAMENTO_LOTE_P99_MS", 0)),
+    "tamanho_mb": float(os.environ.get("ORCAMENTO_MB", 0)),
+}
+PODA_TOLERANCIA_F1 = float(os.environ.get("PODA_TOLERANCIA_F1", 0))
+# Número de prefixos de árvores avaliados na poda
+PODA_PASSOS = 50
+
+
+def _latencias(servir, matriz, lote, repeticoes, limite_s):
+    """Tempos (s) de `servir` em lotes de `lote` linhas, até `repeticoes` ou `limite_s` segundos"""
+    if len(matriz) < lote:
+        matriz = np.resize(matriz, (lote, matriz.shape[1]))
+    servir(matriz[:lote])
+    tempos = []
+    fim = time.perf_counter() + limite_s
+    for i in range(repeticoes):
+        inicio = (i * lote) % (len(matriz) - lote + 1)
+        t0 = time.perf_counter()
+        servir(matriz[inicio:inicio + lote])
+        tempos.append(time.perf_counter() - t0)
+        if t0 > fim:
+            break
+    return np.asarray(tempos) * 1000
+
+
+def medir_servico(modelo, X, repeticoes=200, limite_s=0.5):
+    """Latência p50/p99 (lotes de 1 e 256), tamanho e carga do modelo, como a API o serviria"""
+    codificador = CodificadorFeatures.do_modelo(modelo)
+    matriz = np.ascontiguousarray(X[codificador.features] if hasattr(X, "columns") else X, dtype=codificador.dtype)
+    exportado = exportar(modelo)
+
+    def servir(lote):
+        motor = exportado if exportado is not None and len(lote) <= MOTOR_ARVORES_MAX_LOTE else modelo
+        return motor.predict_proba(lote)
+
+    medidas = {}
+    for lote in LOTES:
+        tempos = _latencias(servir, matriz, lote, repeticoes, limite_s)
+        medidas[f"latencia_lote{lote}_p50_ms"] = float(np.percentile(tempos, 50))
+        medidas[f"latencia_lote{lote}_p99_ms"] = float(np.percentile(tempos, 99))
+
+    conteudo = pickle.dumps(modelo)
+    cargas = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        pickle.loads(conteudo)
+        cargas.append(time.perf_counter() - inicio)
+    arrays = sum(a.nbytes for a in exportado.arrays().values()) if exportado is not None else 0
+    medidas["pickle_mb"] = len(conteudo) / 2**20
+    medidas["tamanho_mb"] = (len(conteudo) + arrays) / 2**20
+    medidas["carga_ms"] = min(cargas) * 1000
+    return medidas
+
+
+def excessos(entrada, orcamento=ORCAMENTO):
+    """Limites do orçamento que o run estoura (medida sem registro conta como estouro)"""
+    metricas = entrada["metricas"]
+    return [chave for chave, limite in orcamento.items()
+            if limite > 0 and not metricas.get(chave, float("inf")) <= limite]
+
+
+def fronteira_pareto(runs, eixos=("latencia_lote1_p99_ms", "tamanho_mb")):
+    """Runs não dominados: nenhum outro tem F1 maior ou igual e custos menores ou iguais (com uma melhora estrita)"""
+    medidos = [r for r in runs if all(e in r["metricas"] for e in eixos)]
+    pontos = np.array([[-r["metricas"]["f1_score"], *(r["metricas"][e] for e in eixos)] for r in medidos])
+    fronteira = []
+    for i, ponto in enumerate(pontos):
+        dominado = np.any(np.all(pontos <= ponto, axis=1) & np.any(pontos < ponto, axis=1))
+        if not dominado:
+            fronteira.append(medidos[i])
+    return sorted(fronteira, key=lambda r: -r["metricas"]["f1_score"])
+
+
+def selecionar(runs, orcamento=ORCAMENTO):
+    """Primeiro run (a lista vem ordenada por F1) que cabe no orçamento, ou None"""
+    return next((r for r in runs if not excessos(r, orcamento)), None)
+
+
+def imprimir_selecao(runs, vencedor, orcamento=ORCAMENTO):
+    limites = {chave: limite for chave, limite in orcamento.items() if limite > 0}
+    print(f"\n💸 Orçamento: " + (", ".join(f"{chave} <= {limite:g}" for chave, limite in limites.items())
+                                  if limites else "sem limites (ORCAMENTO_P99_MS, ORCAMENTO_LOTE_P99_MS, ORCAMENTO_MB)"))
+    fronteira = fronteira_pareto(runs)
+    if fronteira:
+        print(f"   Fronteira de Pareto ({len(fronteira)} de {len(runs)} runs):")
+        print(f"   {'':2} {'Modelo':40} | {'F1':>5} | {'p99 1':>8} | {'p99 256':>8} | {'tamanho':>9} | {'carga':>8}")
+        for r in fronteira:
+            m = r["metricas"]
+            marca = "👉" if vencedor is not None and r["run_id"] == vencedor["run_id"] else "  "
+            print(f"   {marca} {r['nome'][:40]:40} | {m['f1_score']:.3f} | {m['latencia_lote1_p99_ms']:6.2f}ms | "
+                  f"{m.get('latencia_lote256_p99_ms', float('nan')):6.2f}ms | {m['tamanho_mb']:7.2f}MB | "
+                  f"{m.get('carga_ms', float('nan')):6.1f}ms")
+    else:
+        print("   Nenhum run com latência e tamanho medidos")
+
+    descartados = runs[:runs.index(vencedor)] if vencedor is not None else runs
+    if descartados:
+        melhor = descartados[0]
+        quantos = f"{len(descartados)} run(s) com F1 maior" if vencedor is not None else f"todos os {len(runs)} runs"
+        print(f"   Acima do orçamento: {quantos}; o melhor, {melhor['nome']} "
+              f"(F1 {melhor['metricas']['f1_score']:.3f}), estoura {', '.join(excessos(melhor, orcamento))}")
+
+
+def _prefixos(modelo, matriz, passos=PODA_PASSOS):
+    """(nº de árvores, score) para prefixos crescentes do ensemble; None se o modelo não for suportado"""
+    nome = type(modelo).__name__
+    if nome == "RandomForestClassifier":
+        total = len(modelo.estimators_)
+        acumulado = np.cumsum([arvore.predict_proba(matriz)[:, 1] for arvore in modelo.estimators_], axis=0)
+        pontuar = lambda n: acumulado[n - 1] / n
+    elif nome == "GradientBoostingClassifier":
+        total = len(modelo.estimators_)
+        estagios = list(modelo.staged_decision_function(matriz))
+        pontuar = lambda n: np.ravel(estagios[n - 1])
+    elif nome == "XGBClassifier":
+        import xgboost
+
+        booster = modelo.get_booster()
+        total = booster.num_boosted_rounds()
+        dados = xgboost.DMatrix(matriz, feature_names=booster.feature_names)
+        pontuar = lambda n: booster.predict(dados, iteration_range=(0, n), output_margin=True)
+    else:
+        return None
+    tamanhos = sorted(set(np.linspace(1, total, min(passos, total)).round().astype(int).tolist()))
+    return [(n, pontuar(n)) for n in tamanhos]
+
+
+def truncar(modelo, n):
+    """Cópia do ensemble só com as `n` primeiras árvores (estágios, no boosting)"""
+    podado = copy.copy(modelo)
+    nome = type(modelo).__name__
+    if nome == "XGBClassifier":
+        podado._Booster = modelo.get_booster()[:n]
+        podado.set_params(n_estimators=n)
+        return podado
+    podado.estimators_ = modelo.estimators_[:n]
+    podado.n_estimators = n
+    if nome == "GradientBoostingClassifier":
+        podado.n_estimators_ = n
+        podado.train_score_ = modelo.train_score_[:n]
+    return podado
+
+
+def podar(modelo, X, y, tolerancia=PODA_TOLERANCIA_F1):
+    """(modelo, resumo): menor prefixo de árvores com F1 (no melhor limiar) até `tolerancia` abaixo do original.
+
+    O F1 no melhor limiar não muda com a calibração (monótona), então a poda
+    pode ser decidida antes dela. Devolve (modelo, None) quando o modelo não
+    é um ensemble suportado ou nada pode ser removido.
+    """
+    from comum.calibracao import varrer_limiares
+
+    codificador = CodificadorFeatures.do_modelo(modelo)
+    matriz = np.ascontiguousarray(X[codificador.features] if hasattr(X, "columns") else X, dtype=codificador.dtype)
+    prefixos = _prefixos(modelo, matriz)
+    if prefixos is None:
+        return modelo, None
+
+    y = np.asarray(y)
+    f1 = [(n, varrer_limiares(y, scores, criterio="f1")["f1"]) for n, scores in prefixos]
+    total, f1_total = f1[-1]
+    n, f1_podado = next((n, valor) for n, valor in f1 if valor >= f1_total - tolerancia)
+    if n == total:
+        return modelo, None
+    return truncar(modelo, n), {"arvores": n, "arvores_originais": total, "f1_poda": f1_podado,
+                                "f1_poda_original": f1_total, "tolerancia": tolerancia}
+
+
+def servico_do_run(entrada):
+    """Medidas de serviço registradas no run (as chaves de `medir_servico` presentes)"""
+    chaves = [f"latencia_lote{lote}_{p}_ms" for lote in LOTES for p in ("p50", "p99")] + ["pickle_mb", "tamanho_mb", "carga_ms"]
+    return {chave: entrada["metricas"][chave] for chave in chaves if chave in entrada["metricas"]}
+
+
+def podar_no_holdout(modelo, meses_holdout, tolerancia=PODA_TOLERANCIA_F1):
+    """`podar` na parte de poda do holdout dos `meses_holdout`; o resumo traz o serviço re-medido.
+
+    A calibração e o F1 registrado usam as outras partes (`registrar_versao`
+    com a `poda` no metadata), então a escolha do número de árvores não
+    infla o F1 reportado.
+    """
+    from comum.dados import partes_holdout
+
+    X_poda, y_poda = partes_holdout(meses_holdout, poda=True)["poda"]
+    podado, resumo = podar(modelo, X_poda, y_poda, tolerancia)
+    if resumo is not None:
+        resumo["servico"] = medir_servico(podado, X_poda)
+    return podado, resumo
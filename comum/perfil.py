@@ -0,0 +1,120 @@
+"""
+Perfil dos dados de treino, gerado na promoção.
+
+Uma passada pelos meses de treino (em blocos) produz um JSON de poucos KB
+salvo no registro de versões em `producao/models/<versao>-<run>/perfil.json`:
+  - volume e taxa de fraude (preenchem o metadata.json)
+  - quantis e médias de cada feature numérica
+  - contagens, taxa de fraude e recall por categoria
+  - métricas do modelo no treino e a matriz de confusão que as gera
+  - o esboço de referência do monitor de drift da API
+
+O monitoramento e a API carregam o perfil em vez de repontuar o treino.
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+
+from comum.artefato import escrever_atomico
+from comum.drift import EsbocoFeatures
+from comum.features import CodificadorFeatures
+from comum.metricas import MatrizConfusao
+
+QUANTIS = (0.01, 0.05, 0.25, 0.50, 0.75, 0.95, 0.99)
+
+# Histogramas finos para os quantis: valor em bins log (~1% de erro relativo),
+# as features inteiras em bins unitários (exatos até 1000)
+BORDAS_QUANTIS = {
+    "valor": np.geomspace(0.01, 1e7, 2001),
+    "hora": np.arange(1, 24, dtype=np.float64),
+    "qtd_transacoes_24h": np.arange(1, 1001, dtype=np.float64),
+}
+INTEIRAS = {"hora", "qtd_transacoes_24h"}
+
+
+class EsbocoQuantis:
+    """Quantis aproximados, média, mínimo e máximo de uma feature, em uma passada"""
+
+    def __init__(self, bordas, inteira=False):
+        self.bordas = bordas
+        self.inteira = inteira
+        self.contagens = np.zeros(len(bordas) + 1, dtype=np.int64)
+        self.soma = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    def atualizar(self, valores):
+        if len(valores) == 0:
+            return
+        self.contagens += np.bincount(np.searchsorted(self.bordas, valores, side="right"),
+                                      minlength=len(self.bordas) + 1)
+        self.soma += float(np.sum(valores, dtype=np.float64))
+        self.minimo = min(self.minimo, float(np.min(valores)))
+        self.maximo = max(self.maximo, float(np.max(valores)))
+
+    def resumo(self):
+        n = int(self.contagens.sum())
+        if n == 0:
+            return {"n": 0}
+        # Limites inferior/superior de cada bin, presos ao mínimo e ao máximo observados
+        inferiores = np.clip(np.concatenate([[self.minimo], self.bordas]), self.minimo, self.maximo)
+        superiores = np.clip(np.concatenate([self.bordas, [self.maximo]]), self.minimo, self.maximo)
+        acumulado = np.cumsum(self.contagens)
+        quantis = {}
+        for q in QUANTIS:
+            i = int(np.searchsorted(acumulado, q * n, side="left"))
+            if self.inteira:
+                quantis[f"p{round(q * 100):02d}"] = float(inferiores[i])
+            else:
+                # Centro geométrico do bin (bins log)
+                quantis[f"p{round(q * 100):02d}"] = float(np.sqrt(max(inferiores[i], 1e-9) * superiores[i]))
+        return {"n": n, "media": self.soma / n, "min": self.minimo, "max": self.maximo, **quantis}
+
+
+def gerar_perfil(modelo, blocos, versao, run_id, meses, limiar=0.5, calibrador=None):
+    """Passa os dados de treino (blocos de DataFrame) pelo modelo e monta o perfil.
+
+    Métricas e esboço usam a mesma regra de decisão da API (calibrador + limiar).
+    """
+    codificador = CodificadorFeatures.do_modelo(modelo)
+    esboco = EsbocoFeatures()
+    matriz = MatrizConfusao()
+    quantis = {f: EsbocoQuantis(b, inteira=f in INTEIRAS) for f, b in BORDAS_QUANTIS.items()}
+
+    for bloco in blocos:
+        X = codificador.codificar_dataframe(bloco)
+        probabilidades = modelo.predict_proba(X)[:, 1]
+        if calibrador is not None:
+            probabilidades = calibrador.aplicar(probabilidades)
+        esboco.atualizar(X, codificador.features, probabilidades)
+        matriz.atualizar(bloco["is_fraud"].to_numpy(), probabilidades >= limiar,
+                         categoria_cod=bloco["categoria_cod"].to_numpy(),
+                         valor=bloco["valor"].to_numpy(), hora=bloco["hora"].to_numpy())
+        for f, q in quantis.items():
+            q.atualizar(bloco[f].to_numpy())
+
+    return {
+        "versao": versao,
+        "run_id": run_id,
+        "meses": list(meses),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "n_transacoes": matriz.n,
+        "n_fraudes": matriz.fraudes,
+        "taxa_fraude": matriz.taxa_fraude,
+        "metricas": {"limiar": limiar, "f1": matriz.f1, "precision": matriz.precision, "recall": matriz.recall},
+        "fraudes": {"valor_medio": matriz.valor_medio_fraudes, "hora_media": matriz.hora_media_fraudes},
+        "features": {f: q.resumo() for f, q in quantis.items()},
+        "categorias": matriz.por_categoria(),
+        "matriz": matriz.para_dict(),
+        "esboco": esboco.para_dict(),
+    }
+
+
+def salvar_perfil(perfil, caminho):
+    escrever_atomico(caminho, json.dumps(perfil).encode())
+
+
+def carregar_perfil(caminho):
+    with open(caminho) as f:
+        return json.load(f)
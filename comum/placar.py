@@ -0,0 +1,202 @@
+"""
+Placar dos runs de um experimento do MLflow, mantido a cada run registrado.
+
+No file store, `mlflow.search_runs` lê o diretório e os arquivos de
+métrica de todos os runs a cada consulta. O placar fica ao lado, em
+`mlruns/<experimento>/placar.json`, com os `TOP_K` melhores runs por F1 já
+ordenados. Cada entrada guarda:
+    run_id, nome, inicio   identificação do run (início em ms)
+    metricas               as métricas registradas (f1_score, precision, ...)
+    params_hash            hash dos parâmetros (configurações repetidas)
+    modelo                 pickle do modelo, relativo ao diretório do experimento
+
+`comum.experimentos.registrar_no_mlflow` insere cada run novo e regrava o
+arquivo de forma atômica, sob flock do diretório. Ler o topo custa o mesmo
+com 10 ou 10 mil runs. Se o placar não existe (runs de antes dele), a
+primeira leitura ou inserção o reconstrói com uma única busca no MLflow.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from comum.artefato import escrever_atomico
+
+PLACAR = "placar.json"
+TOP_K = 100
+# Formatos de pickle do flavor sklearn que o `pickle.load` lê sem o MLflow
+SERIALIZACOES_PICKLE = ("cloudpickle", "pickle")
+
+
+def _caminho_local(uri):
+    """Caminho de uma URI `file:` (absoluta ou relativa), ou None se não for local"""
+    partes = urlparse(str(uri))
+    if partes.scheme not in ("", "file"):
+        return None
+    return Path(url2pathname(partes.path))
+
+
+def diretorio_experimento(experiment_id):
+    """Diretório do experimento no file store do tracking URI atual, ou None"""
+    import mlflow
+
+    raiz = _caminho_local(mlflow.get_tracking_uri())
+    return None if raiz is None else raiz / str(experiment_id)
+
+
+def hash_parametros(params):
+    """Hash estável dos parâmetros como o MLflow os guarda (valores em texto)"""
+    texto = json.dumps({k: str(v) for k, v in params.items()}, sort_keys=True)
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+
+def _ordem(entrada):
+    # Mesma ordem do `search_runs(order_by=["metrics.f1_score DESC"])`: empate vai para o run mais novo
+    return -entrada["metricas"].get("f1_score", float("-inf")), -entrada["inicio"], entrada["run_id"]
+
+
+def _pickle_modelo(diretorio, artefatos, flavors):
+    """Pickle do flavor sklearn, relativo a `diretorio`; None se não for pickle ou não for local"""
+    sklearn = (flavors or {}).get("sklearn", {})
+    if artefatos is None or sklearn.get("serialization_format") not in SERIALIZACOES_PICKLE:
+        return None
+    caminho = Path(artefatos) / sklearn.get("pickled_model", "model.pkl")
+    try:
+        return str(caminho.resolve().relative_to(Path(diretorio).resolve()))
+    except ValueError:
+        return str(caminho.resolve())
+
+
+def _modelo_no_file_store(diretorio, run_id):
+    """Pickle do modelo de um run antigo, pelos diretórios do file store (MLflow 3 e 2)"""
+    saidas = Path(diretorio) / run_id / "outputs"
+    candidatos = [Path(diretorio) / "models" / p.name / "artifacts" for p in saidas.glob("m-*")]
+    candidatos.append(Path(diretorio) / run_id / "artifacts" / "model")
+    for artefatos in candidatos:
+        mlmodel = artefatos / "MLmodel"
+        if mlmodel.exists():
+            import yaml
+
+            with open(mlmodel) as f:
+                flavors = yaml.safe_load(f).get("flavors")
+            return _pickle_modelo(diretorio, artefatos, flavors)
+    return None
+
+
+def _travar(diretorio):
+    fd = os.open(diretorio, os.O_RDONLY)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+
+def _ler(diretorio):
+    try:
+        with open(Path(diretorio) / PLACAR) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _gravar(diretorio, placar):
+    escrever_atomico(Path(diretorio) / PLACAR, json.dumps(placar, indent=1).encode())
+
+
+def reconstruir_placar(experiment_id, diretorio=None):
+    """Monta o placar do zero com uma busca no MLflow (runs com `f1_score`) e o grava"""
+    import mlflow
+
+    diretorio = diretorio or diretorio_experimento(experiment_id)
+    runs = mlflow.search_runs(experiment_ids=[str(experiment_id)], filter_string="metrics.f1_score > -1",
+                              order_by=["metrics.f1_score DESC"], max_results=TOP_K, output_format="list")
+    entradas = [{
+        "run_id": run.info.run_id,
+        "nome": run.info.run_name,
+        "inicio": run.info.start_time,
+        "metricas": dict(run.data.metrics),
+        "params_hash": hash_parametros(run.data.params),
+        "modelo": _modelo_no_file_store(diretorio, run.info.run_id) if diretorio is not None else None,
+    } for run in runs]
+    placar = {"experiment_id": str(experiment_id), "top_k": TOP_K, "runs": sorted(entradas, key=_ordem)}
+    if diretorio is not None:
+        _gravar(diretorio, placar)
+    return placar
+
+
+def adicionar_run(info, nome, metricas, params, modelo_info=None):
+    """Insere o run no placar do seu experimento (só no file store local)"""
+    artefatos = _caminho_local(info.artifact_uri)
+    if artefatos is None:
+        return None
+    diretorio = artefatos.parent.parent
+    entrada = {
+        "run_id": info.run_id,
+        "nome": nome,
+        "inicio": info.start_time,
+        "metricas": dict(metricas),
+        "params_hash": hash_parametros(params),
+        "modelo": None if modelo_info is None else _pickle_modelo(
+            diretorio, _caminho_local(modelo_info.artifact_path), modelo_info.flavors),
+    }
+
+    fd = _travar(diretorio)
+    try:
+        placar = _ler(diretorio) or reconstruir_placar(info.experiment_id, diretorio)
+        runs = [r for r in placar["runs"] if r["run_id"] != info.run_id]
+        runs.append(entrada)
+        runs.sort(key=_ordem)
+        placar["runs"] = runs[:TOP_K]
+        _gravar(diretorio, placar)
+    finally:
+        os.close(fd)
+    return entrada
+
+
+def melhores_runs(experiment_id, k=1):
+    """Os `k` melhores runs por F1 (entradas do placar), sem varrer o experimento"""
+    diretorio = diretorio_experimento(experiment_id)
+    if diretorio is None:
+        return reconstruir_placar(experiment_id)["runs"][:k]
+    placar = _ler(diretorio)
+    if placar is None:
+        fd = _travar(diretorio)
+        try:
+            placar = _ler(diretorio) or reconstruir_placar(experiment_id, diretorio)
+        finally:
+            os.close(fd)
+    melhores = []
+    for entrada in placar["runs"]:
+        # Run apagado pelo `mlflow gc` sai do topo sem precisar reconstruir
+        if (diretorio / entrada["run_id"]).exists():
+            melhores.append({**entrada, "diretorio": str(diretorio)})
+            if len(melhores) == k:
+                break
+    return melhores
+
+
+def treino_do_run(entrada):
+    """{n_transacoes_treino, taxa_fraude_treino, modo} do run; os números são None em runs sem esses parâmetros"""
+    import mlflow
+
+    run = mlflow.get_run(entrada["run_id"])
+    params = run.data.params
+    return {
+        "n_transacoes_treino": int(params["n_transacoes_treino"]) if "n_transacoes_treino" in params else None,
+        "taxa_fraude_treino": float(params["taxa_fraude_treino"]) if "taxa_fraude_treino" in params else None,
+        "modo": run.data.tags.get("modo"),
+    }
+
+
+def carregar_modelo_run(entrada):
+    """(modelo, caminho do pickle ou None); sem pickle no placar, cai no `mlflow.sklearn.load_model`"""
+    if entrada.get("modelo"):
+        caminho = Path(entrada["diretorio"]) / entrada["modelo"]
+        with open(caminho, "rb") as f:
+            return pickle.load(f), caminho
+
+    import mlflow
+
+    return mlflow.sklearn.load_model(f"runs:/{entrada['run_id']}/model"), None
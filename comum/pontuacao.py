@@ -0,0 +1,254 @@
+"""
+Pontuação em lote de arquivos de transações, em paralelo.
+
+O processo principal carrega a versão uma vez (estimador, calibrador e
+limiar) e só então cria o pool com fork: os workers herdam o modelo por
+copy-on-write, sem desserializar nada. Cada CSV é dividido em faixas de
+bytes terminadas em fim de linha; cada worker lê e interpreta só a sua
+faixa, pontua e grava um Parquet. Nada passa pelo processo principal além
+dos offsets e de um resumo por faixa.
+
+Saída (um diretório, legível com `pd.read_parquet(saida)`):
+    _manifesto.json             versão, arquivos de entrada e faixas
+    <arquivo>-<nnnnn>.parquet   transaction_id, probabilidade, fraude, versao
+
+Cada parte é gravada em um temporário e renomeada, então parte existente
+é faixa concluída. Rodar de novo com a mesma saída retoma do que falta;
+versão ou arquivos de entrada diferentes dos do manifesto são recusados.
+"""
+import csv
+import gc
+import io
+import json
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from comum.artefato import escrever_atomico
+from comum.features import FEATURES, CodificadorFeatures
+
+BLOCO_MB = float(os.environ.get("PONTUACAO_BLOCO_MB", 8))
+MANIFESTO = "_manifesto.json"
+VERSAO_FORMATO = 1
+# prctl(2), Linux
+PR_SET_PDEATHSIG = 1
+
+
+class ModeloLote:
+    """Versão pronta para pontuar: estimador, calibrador e limiar (a mesma regra da API)"""
+
+    def __init__(self, modelo, versao, limiar=0.5, calibrador=None, diretorio=None, run_id=None):
+        self.modelo = modelo
+        self.versao = versao
+        self.limiar = limiar
+        self.calibrador = calibrador
+        self.diretorio = diretorio
+        self.run_id = run_id
+        self.codificador = CodificadorFeatures.do_modelo(modelo)
+
+    @classmethod
+    def da_versao(cls, metadata, models_dir=None):
+        """Carrega a versão descrita por `metadata` (do ponteiro ou do registro)"""
+        from comum.versoes import MODELS_DIR, carregar_calibrador, carregar_modelo
+
+        models_dir = models_dir or MODELS_DIR
+        return cls(carregar_modelo(metadata, models_dir), metadata["versao"],
+                   limiar=float(os.environ.get("LIMIAR_FRAUDE", metadata.get("limiar", 0.5))),
+                   calibrador=carregar_calibrador(metadata, models_dir),
+                   diretorio=metadata.get("diretorio"), run_id=metadata.get("run_id"))
+
+    def pontuar(self, X):
+        """(probabilidades, fraudes) de uma matriz já codificada"""
+        probabilidades = self.modelo.predict_proba(X)[:, 1]
+        if self.calibrador is not None:
+            probabilidades = self.calibrador.aplicar(probabilidades)
+        return probabilidades, probabilidades >= self.limiar
+
+    def identificacao(self):
+        return {"versao": self.versao, "diretorio": self.diretorio, "run_id": self.run_id, "limiar": self.limiar}
+
+
+def colunas_necessarias(cabecalho, features=FEATURES):
+    """Colunas do CSV lidas para pontuar: id e features (`categoria` quando falta `categoria_cod`)"""
+    colunas = ["transaction_id"]
+    for f in features:
+        colunas.append("categoria" if f == "categoria_cod" and f not in cabecalho else f)
+    faltando = [c for c in colunas if c not in cabecalho]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no arquivo: {', '.join(faltando)}")
+    return colunas
+
+
+def dividir_em_faixas(caminho, bloco_bytes):
+    """(cabeçalho, [(inicio, fim), ...]): faixas de ~`bloco_bytes` que começam e terminam em fim de linha"""
+    faixas = []
+    with open(caminho, "rb") as f:
+        cabecalho = next(csv.reader([f.readline().decode()]))
+        inicio = f.tell()
+        tamanho = os.fstat(f.fileno()).st_size
+        while inicio < tamanho:
+            f.seek(min(inicio + bloco_bytes, tamanho))
+            # Completa a linha cortada pelo offset
+            f.readline()
+            fim = min(f.tell(), tamanho)
+            faixas.append((inicio, fim))
+            inicio = fim
+    return cabecalho, faixas
+
+
+def _ler_faixa(caminho, cabecalho, colunas, inicio, fim):
+    import pandas as pd
+
+    from comum.dados import DTYPES
+
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        conteudo = f.read(fim - inicio)
+    return pd.read_csv(io.BytesIO(conteudo), header=None, names=cabecalho, usecols=colunas,
+                       dtype={c: DTYPES[c] for c in colunas if c in DTYPES})
+
+
+def _gravar_parte(caminho, ids, probabilidades, fraudes, versao):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tabela = pa.table({
+        "transaction_id": pa.array(ids, type=pa.string()),
+        "probabilidade": pa.array(probabilidades, type=pa.float64()),
+        "fraude": pa.array(fraudes, type=pa.bool_()),
+        "versao": pa.DictionaryArray.from_arrays(np.zeros(len(ids), dtype=np.int32), [versao]),
+    })
+    buffer = pa.BufferOutputStream()
+    pq.write_table(tabela, buffer)
+    escrever_atomico(caminho, buffer.getvalue().to_pybytes())
+
+
+# Estado do pool: definido no processo principal antes do fork e herdado pelos workers
+_modelo = None
+
+
+def _inicializar_worker(threads):
+    # Ctrl+C e SIGTERM chegam ao grupo todo; quem decide parar é o processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # Se o processo principal morrer (kill -9), o worker vai junto em vez de ficar órfão
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+    except (OSError, AttributeError):
+        pass
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass
+
+
+def _pontuar_faixa(caminho, cabecalho, colunas, inicio, fim, destino):
+    """Lê, codifica, pontua e grava uma faixa; devolve (linhas, fraudes, segundos)"""
+    t0 = time.perf_counter()
+    bloco = _ler_faixa(caminho, cabecalho, colunas, inicio, fim)
+    X = _modelo.codificador.codificar_dataframe(bloco)
+    probabilidades, fraudes = _modelo.pontuar(X)
+    _gravar_parte(destino, bloco["transaction_id"].to_numpy(), probabilidades, fraudes, _modelo.versao)
+    return len(bloco), int(fraudes.sum()), time.perf_counter() - t0
+
+
+def planejar(arquivos, saida, modelo, bloco_mb=BLOCO_MB, recomecar=False):
+    """Manifesto da saída: novo, ou o existente se versão e arquivos forem os mesmos (retomada)"""
+    saida = Path(saida)
+    entradas = []
+    for caminho in map(Path, arquivos):
+        stat = caminho.stat()
+        entradas.append({"caminho": str(caminho.resolve()), "tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    nomes = [Path(e["caminho"]).stem for e in entradas]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Arquivos de entrada com o mesmo nome: as partes da saída colidiriam")
+
+    caminho_manifesto = saida / MANIFESTO
+    if caminho_manifesto.exists():
+        with open(caminho_manifesto) as f:
+            manifesto = json.load(f)
+        if recomecar:
+            # Só as partes que o manifesto anterior criou
+            for anterior in manifesto["arquivos"]:
+                for parte in anterior["partes"]:
+                    (saida / parte).unlink(missing_ok=True)
+        else:
+            anteriores = [{k: e[k] for k in ("caminho", "tamanho", "mtime_ns")} for e in manifesto["arquivos"]]
+            if manifesto["modelo"] != modelo.identificacao():
+                raise ValueError(f"{saida} foi pontuada com outra versão ({manifesto['modelo']['versao']}, "
+                                 f"{manifesto['modelo']['diretorio']}); use outra saída ou recomece")
+            if anteriores != entradas:
+                raise ValueError(f"{saida} foi pontuada com outros arquivos (ou eles mudaram); use outra saída ou recomece")
+            return manifesto
+    elif any(saida.glob("*.parquet")):
+        raise ValueError(f"{saida} já tem arquivos Parquet que não são de uma pontuação; use outra saída")
+
+    saida.mkdir(parents=True, exist_ok=True)
+    for entrada, nome in zip(entradas, nomes):
+        entrada["cabecalho"], entrada["faixas"] = dividir_em_faixas(entrada["caminho"], int(bloco_mb * 2**20))
+        entrada["partes"] = [f"{nome}-{i:05d}.parquet" for i in range(len(entrada["faixas"]))]
+    manifesto = {"formato": VERSAO_FORMATO, "modelo": modelo.identificacao(), "bloco_mb": bloco_mb, "arquivos": entradas}
+    escrever_atomico(caminho_manifesto, json.dumps(manifesto, indent=2).encode())
+    return manifesto
+
+
+def pontuar_arquivos(arquivos, saida, modelo, workers=None, threads=1, bloco_mb=BLOCO_MB, recomecar=False,
+                     progresso=None):
+    """Pontua os CSVs em `saida` com um pool de `workers` processos (padrão: um por CPU).
+
+    `progresso(feitas, total)` é chamado a cada parte concluída. Devolve um
+    resumo com linhas, fraudes, partes feitas e já prontas, e tempos.
+    """
+    global _modelo
+
+    saida = Path(saida)
+    manifesto = planejar(arquivos, saida, modelo, bloco_mb, recomecar)
+    # Temporários de uma execução interrompida no meio de uma gravação
+    for resto in saida.glob(".*.parquet.*"):
+        resto.unlink()
+
+    tarefas = []
+    prontas = 0
+    for entrada in manifesto["arquivos"]:
+        colunas = colunas_necessarias(entrada["cabecalho"], modelo.codificador.features)
+        for (inicio, fim), parte in zip(entrada["faixas"], entrada["partes"]):
+            if (saida / parte).exists():
+                prontas += 1
+            else:
+                tarefas.append((entrada["caminho"], entrada["cabecalho"], colunas, inicio, fim, str(saida / parte)))
+
+    workers = max(1, min(workers or len(os.sched_getaffinity(0)), len(tarefas) or 1))
+    resumo = {"linhas": 0, "fraudes": 0, "partes": len(tarefas), "partes_prontas": prontas,
+              "workers": workers, "segundos_worker": 0.0}
+    inicio = time.perf_counter()
+    if tarefas:
+        _modelo = modelo
+        # O modelo já está no heap: congelado, a coleta dos filhos não reescreve suas páginas
+        gc.collect()
+        gc.freeze()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                   initializer=_inicializar_worker, initargs=(threads,))
+        try:
+            futuros = [pool.submit(_pontuar_faixa, *tarefa) for tarefa in tarefas]
+            for feitas, futuro in enumerate(as_completed(futuros), start=1):
+                linhas, fraudes, segundos = futuro.result()
+                resumo["linhas"] += linhas
+                resumo["fraudes"] += fraudes
+                resumo["segundos_worker"] += segundos
+                if progresso is not None:
+                    progresso(prontas + feitas, prontas + len(tarefas))
+        finally:
+            # Interrompido: as faixas em andamento terminam e gravam; as demais ficam para a retomada
+            pool.shutdown(wait=True, cancel_futures=True)
+            gc.unfreeze()
+            _modelo = None
+    resumo["segundos"] = time.perf_counter() - inicio
+    resumo["linhas_s"] = resumo["linhas"] / resumo["segundos"] if resumo["linhas"] else 0.0
+    return resumo
@@ -0,0 +1,234 @@
+"""
+Registro das predições da API (append-only) e junção de rótulos.
+
+O caminho da requisição só coloca o lote em uma fila (deque, append
+atômico). Uma thread de escrita esvazia a fila a cada `intervalo_s`,
+serializa as linhas em NDJSON, grava tudo com um único write + fsync e
+troca de arquivo quando o atual passa de `max_bytes`. Uma gravação que
+falha (ex.: disco cheio) descarta as linhas daquela vez, conta o erro e
+fecha o arquivo (a próxima começa em outro); a thread continua.
+
+Arquivos (um por período, nunca reescritos):
+    <diretorio>/predicoes-AAAAMMDD-HHMMSS-<pid>-<seq>.jsonl
+    <diretorio>/rotulados/<mesmo nome>.jsonl     (gerado por `juntar_rotulos`)
+"""
+import asyncio
+import collections
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from comum.artefato import MODO_ARQUIVO
+
+PREFIXO = "predicoes-"
+ROTULADOS = "rotulados"
+
+
+class RegistroPredicoes:
+    def __init__(self, diretorio, intervalo_s=1.0, max_bytes=64 << 20, capacidade=100_000):
+        self.diretorio = Path(diretorio)
+        self.intervalo_s = intervalo_s
+        self.max_bytes = max_bytes
+        self._fila = collections.deque(maxlen=capacidade)
+        self._parar = threading.Event()
+        self._thread = None
+        self._arquivo = None
+        self._caminho = None
+
+        # Métricas
+        self.registros = 0
+        self.lotes_descartados = 0
+        self.bytes_gravados = 0
+        self.arquivos = 0
+        self.ultima_gravacao_ms = 0.0
+        self.erros_gravacao = 0
+        self.registros_perdidos = 0
+        self.ultimo_erro = None
+
+    def registrar(self, versao, latencia_ms, transacoes, ids, probabilidades, fraudes):
+        """Caminho da requisição: guarda referências ao lote, sem serializar nem tocar no disco.
+
+        `versao` é uma string (lote todo da mesma versão) ou uma por transação (canário).
+        """
+        if self._thread is None:
+            return
+        if len(self._fila) == self._fila.maxlen:
+            self.lotes_descartados += 1
+        self._fila.append((time.time(), versao, latencia_ms, transacoes, ids, probabilidades, fraudes))
+
+    async def iniciar(self):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="registro-predicoes", daemon=True)
+        self._thread.start()
+
+    async def parar(self):
+        """Grava o que estiver na fila e fecha o arquivo"""
+        if self._thread is None:
+            return
+        self._parar.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo_s):
+            self._gravar()
+        self._gravar()
+        self._fechar()
+
+    def _fechar(self):
+        if self._arquivo is not None:
+            try:
+                self._arquivo.close()
+            except OSError:
+                pass
+            self._arquivo = None
+
+    def _linhas(self, lote):
+        ts, versao, latencia_ms, transacoes, ids, probabilidades, fraudes = lote
+        versoes = itertools.repeat(versao) if isinstance(versao, str) else versao
+        for t, id_, versao, p, f in zip(transacoes, ids, versoes, list(probabilidades), list(fraudes)):
+            yield json.dumps({
+                "ts": ts, "transaction_id": id_,
+                "valor": t.valor, "hora": t.hora, "categoria": t.categoria,
+                "qtd_transacoes_24h": t.qtd_transacoes_24h,
+                "probabilidade": float(p), "fraude": bool(f),
+                "versao": versao, "latencia_ms": latencia_ms,
+            })
+
+    def _gravar(self):
+        if not self._fila:
+            return
+        inicio = time.perf_counter()
+        linhas = []
+        try:
+            while self._fila:
+                linhas.extend(self._linhas(self._fila.popleft()))
+            conteudo = ("\n".join(linhas) + "\n").encode()
+
+            if self._arquivo is None or self._arquivo.tell() >= self.max_bytes:
+                self._rotacionar()
+            self._arquivo.write(conteudo)
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        except Exception as e:
+            # O arquivo pode ter ficado com uma linha pela metade: a próxima gravação abre outro
+            self._fechar()
+            self.erros_gravacao += 1
+            self.registros_perdidos += len(linhas)
+            erro = f"{type(e).__name__}: {e}"
+            if erro != self.ultimo_erro:
+                print(f"⚠️  Registro de predições: gravação falhou ({erro}); {len(linhas)} linha(s) descartada(s)")
+            self.ultimo_erro = erro
+            return
+
+        self.registros += len(linhas)
+        self.bytes_gravados += len(conteudo)
+        self.ultima_gravacao_ms = (time.perf_counter() - inicio) * 1000
+
+    def _rotacionar(self):
+        self._fechar()
+        self.arquivos += 1
+        nome = f"{PREFIXO}{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{self.arquivos:04d}.jsonl"
+        self._caminho = self.diretorio / nome
+        self._arquivo = open(self._caminho, "ab")
+
+    def estatisticas(self):
+        return {
+            "ativo": self._thread is not None,
+            "arquivo": self._caminho.name if self._caminho else None,
+            "registros": self.registros,
+            "na_fila": len(self._fila),
+            "lotes_descartados": self.lotes_descartados,
+            "bytes_gravados": self.bytes_gravados,
+            "arquivos": self.arquivos,
+            "ultima_gravacao_ms": round(self.ultima_gravacao_ms, 3),
+            "erros_gravacao": self.erros_gravacao,
+            "registros_perdidos": self.registros_perdidos,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+def arquivos_registro(diretorio, rotulados=False):
+    diretorio = Path(diretorio) / ROTULADOS if rotulados else Path(diretorio)
+    return sorted(diretorio.glob(f"{PREFIXO}*.jsonl"))
+
+
+def ler_registros(diretorio, rotulados=False, linhas_por_bloco=100_000):
+    """Gera DataFrames com os registros (ou só os já rotulados), em blocos"""
+    import pandas as pd
+
+    for caminho in arquivos_registro(diretorio, rotulados):
+        if caminho.stat().st_size == 0:
+            continue
+        with pd.read_json(caminho, lines=True, chunksize=linhas_por_bloco,
+                          dtype={"transaction_id": str}) as leitor:
+            yield from leitor
+
+
+def juntar_rotulos(diretorio, rotulos, linhas_por_bloco=100_000):
+    """Acrescenta `is_fraud` aos registros cujo transaction_id tem rótulo.
+
+    `rotulos` é uma Series indexada por transaction_id ou um iterável delas
+    (partições, ex.: uma por mês): só uma partição fica em memória. Cada
+    partição percorre os registros e marca, por linha, o rótulo encontrado
+    (um int8 por predição; em id repetido vale o último). Depois, cada
+    arquivo de predições gera (ou substitui, atomicamente) o arquivo
+    correspondente em `rotulados/`, só com as linhas que têm rótulo.
+    Devolve (registros lidos, registros rotulados).
+    """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(rotulos, pd.Series):
+        rotulos = [rotulos]
+    saida_dir = Path(diretorio) / ROTULADOS
+    saida_dir.mkdir(parents=True, exist_ok=True)
+    arquivos = [c for c in arquivos_registro(diretorio) if c.stat().st_size]
+
+    def blocos(caminho):
+        with pd.read_json(caminho, lines=True, chunksize=linhas_por_bloco, dtype={"transaction_id": str}) as leitor:
+            yield from leitor
+
+    # Rótulo por linha de cada arquivo (-1 = sem rótulo), preenchido partição a partição
+    marcados = {}
+    for particao in rotulos:
+        particao = particao[~particao.index.duplicated(keep="last")]
+        for caminho in arquivos:
+            partes = []
+            for bloco in blocos(caminho):
+                partes.append(bloco["transaction_id"].map(particao).fillna(-1).to_numpy(np.int8))
+            atual = np.concatenate(partes) if partes else np.zeros(0, dtype=np.int8)
+            anterior = marcados.get(caminho)
+            marcados[caminho] = atual if anterior is None else np.where(atual >= 0, atual, anterior)
+
+    lidos = rotulados = 0
+    for caminho in arquivos_registro(diretorio):
+        fd, temporario = tempfile.mkstemp(dir=saida_dir, prefix=f".{caminho.name}.")
+        try:
+            os.fchmod(fd, MODO_ARQUIVO)
+            with os.fdopen(fd, "w") as saida:
+                if caminho in marcados:
+                    inicio = 0
+                    for bloco in blocos(caminho):
+                        # Linhas gravadas pela API depois das partições ficam para a próxima junção
+                        bloco = bloco.iloc[:max(len(marcados[caminho]) - inicio, 0)]
+                        marcas = marcados[caminho][inicio:inicio + len(bloco)]
+                        inicio += len(bloco)
+                        lidos += len(bloco)
+                        bloco = bloco[marcas >= 0].assign(is_fraud=marcas[marcas >= 0])
+                        if len(bloco):
+                            rotulados += len(bloco)
+                            saida.write(bloco.to_json(orient="records", lines=True))
+                saida.flush()
+                os.fsync(saida.fileno())
+            os.replace(temporario, saida_dir / caminho.name)
+        except BaseException:
+            Path(temporario).unlink(missing_ok=True)
+            raise
+    return lidos, rotulados
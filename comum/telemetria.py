@@ -0,0 +1,236 @@
+"""
+Telemetria da API: histogramas por estágio, contadores e perfil por amostragem.
+
+O caminho da requisição não usa lock: cada thread escreve no seu próprio
+fragmento (threading.local) e o `/metrics` soma os fragmentos na hora da
+coleta. Cada worker (processo) tem a sua telemetria; o Prometheus agrega
+os workers pelo rótulo de instância.
+
+Exposição no formato texto do Prometheus (version 0.0.4), sem dependências.
+"""
+import bisect
+import collections
+import sys
+import threading
+import time
+
+# Limites dos histogramas de latência, em segundos
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Telemetria:
+    def __init__(self, prefixo="fraude", buckets=BUCKETS):
+        self.prefixo = prefixo
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._fragmentos = []
+        self._lock = threading.Lock()
+        self._ajuda = {}
+        self.medidores = {}
+
+    def _fragmento(self):
+        fragmento = getattr(self._local, "fragmento", None)
+        if fragmento is None:
+            fragmento = self._local.fragmento = ({}, {})
+            # Só na primeira observação de cada thread
+            with self._lock:
+                self._fragmentos.append(fragmento)
+        return fragmento
+
+    def descrever(self, nome, tipo, ajuda):
+        self._ajuda[nome] = (tipo, ajuda)
+
+    def observar(self, nome, segundos, rotulos=()):
+        """Soma uma observação ao histograma `nome` com os `rotulos` ((chave, valor), ...)"""
+        histogramas = self._fragmento()[0]
+        chave = (nome, rotulos)
+        h = histogramas.get(chave)
+        if h is None:
+            h = histogramas[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+        h[0][bisect.bisect_left(self.buckets, segundos)] += 1
+        h[1] += segundos
+
+    def incrementar(self, nome, valor=1, rotulos=()):
+        contadores = self._fragmento()[1]
+        chave = (nome, rotulos)
+        contadores[chave] = contadores.get(chave, 0) + valor
+
+    def medir(self, nome, funcao, ajuda="", tipo="gauge"):
+        """Valor lido na coleta: `funcao()` devolve o valor atual (gauge, ou counter mantido fora daqui)"""
+        self.medidores[nome] = funcao
+        self._ajuda[nome] = (tipo, ajuda)
+
+    def _somar(self):
+        histogramas, contadores = {}, collections.Counter()
+        with self._lock:
+            fragmentos = list(self._fragmentos)
+        for h_fragmento, c_fragmento in fragmentos:
+            for chave, (contagens, soma) in list(h_fragmento.items()):
+                total = histogramas.setdefault(chave, [[0] * (len(self.buckets) + 1), 0.0])
+                total[0] = [a + b for a, b in zip(total[0], contagens)]
+                total[1] += soma
+            for chave, valor in list(c_fragmento.items()):
+                contadores[chave] += valor
+        return histogramas, contadores
+
+    def _cabecalho(self, linhas, nome, tipo_padrao):
+        tipo, ajuda = self._ajuda.get(nome, (tipo_padrao, ""))
+        if ajuda:
+            linhas.append(f"# HELP {self.prefixo}_{nome} {ajuda}")
+        linhas.append(f"# TYPE {self.prefixo}_{nome} {tipo}")
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus"""
+        histogramas, contadores = self._somar()
+        linhas = []
+
+        for nome in sorted({n for n, _ in contadores}):
+            self._cabecalho(linhas, nome, "counter")
+            for (n, rotulos), valor in sorted(contadores.items()):
+                if n == nome:
+                    linhas.append(f"{self.prefixo}_{nome}{_rotulos(rotulos)} {valor}")
+
+        for nome in sorted({n for n, _ in histogramas}):
+            self._cabecalho(linhas, nome, "histogram")
+            for (n, rotulos), (contagens, soma) in sorted(histogramas.items()):
+                if n != nome:
+                    continue
+                acumulado = 0
+                for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                    acumulado += contagem
+                    le = "+Inf" if limite == float("inf") else repr(limite)
+                    linhas.append(f"{self.prefixo}_{nome}_bucket{_rotulos(rotulos + (('le', le),))} {acumulado}")
+                linhas.append(f"{self.prefixo}_{nome}_sum{_rotulos(rotulos)} {soma!r}")
+                linhas.append(f"{self.prefixo}_{nome}_count{_rotulos(rotulos)} {acumulado}")
+
+        for nome, funcao in sorted(self.medidores.items()):
+            self._cabecalho(linhas, nome, "gauge")
+            linhas.append(f"{self.prefixo}_{nome} {funcao()}")
+        return "\n".join(linhas) + "\n"
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in rotulos) + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MiddlewareTelemetria:
+    """Middleware ASGI: requisições em andamento, contagem por rota/status e latência total.
+
+    Rotas fora de `rotas()` (lida na primeira requisição, depois que as
+    rotas do app existem) entram como "outras", para não criar uma série por URL.
+    `erros_total` conta as respostas 5xx, menos os pares (rota, status) de
+    `esperados` (ex.: o 503 do readiness durante o aquecimento).
+    """
+
+    def __init__(self, app, telemetria, rotas, esperados=()):
+        self.app = app
+        self.telemetria = telemetria
+        self.obter_rotas = rotas
+        self.esperados = set(esperados)
+        self.rotas = None
+        self.em_andamento = 0
+        telemetria.medir("requisicoes_em_andamento", lambda: self.em_andamento, "Requisições HTTP em andamento")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self.rotas is None:
+            self.rotas = set(self.obter_rotas())
+        rota = scope["path"] if scope["path"] in self.rotas else "outras"
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            await send(mensagem)
+
+        self.em_andamento += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.em_andamento -= 1
+            rotulos = (("rota", rota),)
+            self.telemetria.observar("requisicao_segundos", time.perf_counter() - inicio, rotulos)
+            self.telemetria.incrementar("requisicoes_total", 1, rotulos + (("status", str(status[0])),))
+            if status[0] >= 500 and (rota, status[0]) not in self.esperados:
+                self.telemetria.incrementar("erros_total", 1, rotulos)
+
+
+class AmostradorPerfil:
+    """Perfil por amostragem das pilhas de todas as threads, em formato "folded".
+
+    Uma thread lê `sys._current_frames()` a cada `intervalo_s` e conta cada
+    pilha (funções separadas por ';'). A saída alimenta flamegraph.pl,
+    speedscope ou inferno diretamente.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._parar = threading.Event()
+        self.pilhas = collections.Counter()
+        self.amostras = 0
+        self.inicio = None
+        self.duracao_s = 0.0
+        self.intervalo_s = 0.0
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, duracao_s=30.0, intervalo_s=0.005):
+        if self.ativo:
+            return False
+        self.pilhas = collections.Counter()
+        self.amostras = 0
+        self.inicio = time.time()
+        self.duracao_s = duracao_s
+        self.intervalo_s = intervalo_s
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="amostrador-perfil", daemon=True)
+        self._thread.start()
+        return True
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        proprio = threading.get_ident()
+        nomes = {}
+        fim = time.monotonic() + self.duracao_s
+        while not self._parar.wait(self.intervalo_s) and time.monotonic() < fim:
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    nome = nomes.get(codigo)
+                    if nome is None:
+                        nome = nomes[codigo] = f"{codigo.co_name} ({codigo.co_filename.rsplit('/', 1)[-1]}:{codigo.co_firstlineno})"
+                    pilha.append(nome)
+                    frame = frame.f_back
+                self.pilhas[";".join(reversed(pilha))] += 1
+            self.amostras += 1
+
+    def estado(self):
+        return {
+            "ativo": self.ativo,
+            "inicio": self.inicio,
+            "duracao_s": self.duracao_s,
+            "intervalo_ms": self.intervalo_s * 1000,
+            "amostras": self.amostras,
+            "pilhas_distintas": len(self.pilhas),
+        }
+
+    def folded(self):
+        return "".join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
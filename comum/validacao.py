@@ -0,0 +1,111 @@
+"""
+Validação cruzada k-fold com os dados montados uma vez para todos os candidatos.
+
+`FoldsCompartilhados` prepara, no processo principal:
+  1. os folds estratificados (mesma proporção de fraudes em cada um);
+  2. uma matriz quantizada por fold: colunas com mais de `BINS` valores
+     distintos (o `valor`) viram a média do seu bin de quantil, em float32,
+     o dtype que as árvores usam, e há menos cortes a avaliar. Bordas e
+     médias vêm só do treino do fold, como se o fold de teste fosse dado novo;
+  3. um bloco de memória compartilhada com as linhas ordenadas por fold. A
+     matriz do fold f tem as linhas na ordem [Ff Ff+1 ... Fk-1 F0 ... Ff-1]:
+     o teste é o começo e o treino o resto, e os rótulos ficam uma vez só,
+     repetidos: [F0 F1 ... Fk-1 F0 ... Fk-2]. Treino e teste de qualquer
+     fold são fatias contíguas, e cada tarefa recebe views, sem cópia.
+
+Os workers abrem o bloco pelo nome (`abrir`); só o dono o apaga (`fechar`).
+"""
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+K_FOLDS = int(os.environ.get("EXPERIMENTOS_CV_FOLDS", 5))
+BINS = 256
+SEMENTE = 42
+
+
+def atribuir_folds(y, k, semente=SEMENTE):
+    """Fold de cada linha, estratificado por classe e com tamanhos que diferem em no máximo 1"""
+    rng = np.random.default_rng(semente)
+    folds = np.empty(len(y), dtype=np.int64)
+    inicio = 0
+    for classe in np.unique(y):
+        indices = rng.permutation(np.flatnonzero(y == classe))
+        # Cada classe continua o rodízio de onde a anterior parou
+        folds[indices] = (np.arange(len(indices)) + inicio) % k
+        inicio += len(indices)
+    return folds
+
+
+def quantizar(X, bins=BINS, treino=slice(None)):
+    """Matriz float32 em que colunas com mais de `bins` valores distintos viram a média do seu bin de quantil.
+
+    Bordas e médias saem só das linhas `treino`; as demais caem nos bins delas.
+    """
+    X = np.array(X, dtype=np.float32)
+    for j in range(X.shape[1]):
+        coluna, referencia = X[:, j], X[treino, j]
+        if len(np.unique(referencia)) <= bins:
+            continue
+        bordas = np.unique(np.quantile(referencia, np.linspace(0, 1, bins + 1)[1:-1]))
+        codigos = np.searchsorted(bordas, referencia, side="right")
+        medias = np.bincount(codigos, weights=referencia, minlength=len(bordas) + 1)
+        medias /= np.maximum(np.bincount(codigos, minlength=len(bordas) + 1), 1)
+        X[:, j] = medias[np.searchsorted(bordas, coluna, side="right")]
+    return X
+
+
+class FoldsCompartilhados:
+    def __init__(self, descritor, memoria, dono):
+        self.descritor = descritor
+        self.k = len(descritor["limites"]) - 1
+        self.n = descritor["n"]
+        self._memoria = memoria
+        self._dono = dono
+        colunas = descritor["colunas"]
+        linhas = self.n + descritor["limites"][-2]
+        self.X = np.ndarray((self.k, self.n, colunas), dtype=np.float32, buffer=memoria.buf)
+        self.y = np.ndarray((linhas,), dtype=np.int8, buffer=memoria.buf, offset=self.X.nbytes)
+
+    @classmethod
+    def criar(cls, X, y, k=K_FOLDS, bins=BINS, semente=SEMENTE):
+        """Monta folds e matrizes quantizadas e os copia (uma vez) para a memória compartilhada"""
+        y = np.asarray(y)
+        folds = atribuir_folds(y, k, semente)
+        ordem = np.argsort(folds, kind="stable")
+        limites = np.searchsorted(folds[ordem], np.arange(k + 1)).tolist()
+        X = np.asarray(X, dtype=np.float32)[ordem]
+        yq = y[ordem].astype(np.int8)
+
+        # Uma matriz por fold; rótulos de F0..Fk-2 repetidos no fim: o treino de qualquer fold fica contíguo
+        n, colunas = X.shape
+        linhas = n + limites[-2]
+        memoria = shared_memory.SharedMemory(create=True, size=k * n * colunas * 4 + linhas)
+        descritor = {"nome": memoria.name, "n": n, "colunas": colunas, "limites": limites}
+        folds = cls(descritor, memoria, dono=True)
+        for f in range(k):
+            inicio, fim = limites[f], limites[f + 1]
+            rodadas = np.roll(X, -inicio, axis=0)
+            folds.X[f] = quantizar(rodadas, bins, treino=slice(fim - inicio, None))
+        folds.y[:n], folds.y[n:] = yq, yq[:limites[-2]]
+        return folds
+
+    @classmethod
+    def abrir(cls, descritor):
+        """Abre, em outro processo, o bloco criado por `criar`"""
+        return cls(descritor, shared_memory.SharedMemory(name=descritor["nome"]), dono=False)
+
+    def fold(self, f):
+        """(X_treino, y_treino, X_teste, y_teste) do fold `f`, todos views do bloco compartilhado"""
+        inicio, fim = self.descritor["limites"][f], self.descritor["limites"][f + 1]
+        teste = fim - inicio
+        treino = slice(fim, fim + self.n - teste)
+        return self.X[f, teste:], self.y[treino], self.X[f, :teste], self.y[inicio:fim]
+
+    def fechar(self):
+        # As views precisam sair antes de fechar o mmap
+        del self.X, self.y
+        self._memoria.close()
+        if self._dono:
+            self._memoria.unlink()
@@ -0,0 +1,291 @@
+"""
+Contadores de velocidade por cliente em janelas deslizantes (ex.: transações em 1h e 24h).
+
+Cada cliente ocupa uma linha de arrays NumPy de tamanho fixo:
+    chaves     hash de 64 bits do cliente (0 = linha nunca usada)
+    ultimo     último balde (instante // balde_s) em que o cliente apareceu
+    baldes     anel de contadores, um por balde da maior janela
+    totais     total corrente de cada janela
+    recentes   hashes dos últimos `recentes` transaction_id contados do cliente
+
+Registrar um evento avança o anel do cliente até o balde atual. Os baldes
+que saem de cada janela são subtraídos do total, e o evento soma 1 ao balde
+atual e aos totais. O custo é O(1) por evento, e a consulta só lê os totais.
+As janelas têm a resolução de um balde.
+
+Um evento com id já presente em `recentes` é uma retentativa: devolve as
+contagens atuais sem contar de novo. Os ids ficam enquanto o cliente tem
+eventos na maior janela, até serem empurrados por `recentes` ids mais novos.
+
+A tabela é hash com sondagem linear e capacidade fixa, então a memória é
+limitada. Cliente sem evento há mais que a maior janela tem contagem zero, e
+sua linha pode ser reaproveitada. Se as `sondagens` linhas candidatas estão
+todas ativas, o cliente visto há mais tempo é expulso.
+
+Com `diretorio`, os arrays são arquivos .npy mapeados em memória
+(MAP_SHARED): o estado sobrevive a reinícios (`sincronizar()` grava as
+páginas sujas) e é compartilhado por workers criados com fork. Um flock
+por lote serializa os processos.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from comum.artefato import escrever_atomico
+
+JANELAS_S = (3600, 86400)
+BALDE_S = 1800
+SATURACAO = np.iinfo(np.uint16).max
+
+
+def hash_chave(chave):
+    """Hash estável (igual entre processos e reinícios) de 64 bits; 0 fica reservado para linha vazia"""
+    return int.from_bytes(hashlib.blake2b(str(chave).encode(), digest_size=8).digest(), "little") or 1
+
+
+class ContadorVelocidade:
+    def __init__(self, capacidade=1 << 20, balde_s=BALDE_S, janelas_s=JANELAS_S, diretorio=None, sondagens=16,
+                 recentes=4):
+        janelas_s = tuple(int(j) for j in janelas_s)
+        if any(j % balde_s for j in janelas_s):
+            raise ValueError(f"Janelas {janelas_s} precisam ser múltiplas do balde ({balde_s} s)")
+        # Potência de 2: a posição inicial da sondagem é `hash & mascara`
+        self.capacidade = 1 << max(int(capacidade) - 1, 1).bit_length()
+        self.mascara = self.capacidade - 1
+        self.balde_s = balde_s
+        self.janelas_s = janelas_s
+        self.larguras = [j // balde_s for j in janelas_s]
+        self.n_baldes = max(self.larguras)
+        self.sondagens = sondagens
+        self.n_recentes = max(int(recentes), 1)
+        self.diretorio = Path(diretorio) if diretorio is not None else None
+
+        self._lock = threading.Lock()
+        self._arquivo_lock = None
+        self._pid_lock = None
+        self.eventos = 0
+        self.novos = 0
+        self.reaproveitados = 0
+        self.expulsoes = 0
+        self.repetidos = 0
+        self.restaurado = False
+
+        formas = {
+            "chaves": ((self.capacidade,), np.uint64),
+            "ultimo": ((self.capacidade,), np.int32),
+            "baldes": ((self.capacidade, self.n_baldes), np.uint16),
+            "totais": ((self.capacidade, len(janelas_s)), np.uint32),
+            "recentes": ((self.capacidade, self.n_recentes), np.uint64),
+        }
+        if self.diretorio is None:
+            arrays = {nome: np.zeros(forma, dtype=dtype) for nome, (forma, dtype) in formas.items()}
+        else:
+            arrays = self._abrir(formas)
+        self.chaves = arrays["chaves"]
+        self.ultimo = arrays["ultimo"]
+        self.baldes = arrays["baldes"]
+        self.totais = arrays["totais"]
+        self.recentes = arrays["recentes"]
+        # Visões planas dos mesmos buffers: índice escalar em memoryview custa bem menos que em ndarray
+        self._chaves = memoryview(self.chaves.reshape(-1))
+        self._ultimo = memoryview(self.ultimo.reshape(-1))
+        self._baldes = memoryview(self.baldes.reshape(-1))
+        self._totais = memoryview(self.totais.reshape(-1))
+        self._recentes = memoryview(self.recentes.reshape(-1))
+
+    def _configuracao(self):
+        return {"capacidade": self.capacidade, "balde_s": self.balde_s, "janelas_s": list(self.janelas_s),
+                "recentes": self.n_recentes}
+
+    def _abrir(self, formas):
+        """Reabre os arrays do `diretorio` se a configuração bate; senão, cria arquivos novos (esparsos)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        config_path = self.diretorio / "config.json"
+        existentes = config_path.exists() and all((self.diretorio / f"{nome}.npy").exists() for nome in formas)
+        if existentes:
+            with open(config_path) as f:
+                existentes = json.load(f) == self._configuracao()
+
+        arrays = {}
+        for nome, (forma, dtype) in formas.items():
+            caminho = self.diretorio / f"{nome}.npy"
+            if existentes:
+                arrays[nome] = np.load(caminho, mmap_mode="r+")
+            else:
+                arrays[nome] = np.lib.format.open_memmap(caminho, mode="w+", dtype=dtype, shape=forma)
+        if not existentes:
+            escrever_atomico(config_path, json.dumps(self._configuracao(), indent=2).encode())
+        self.restaurado = bool(existentes)
+        return arrays
+
+    def _travar_processos(self):
+        """flock do diretório; o descritor é aberto por processo (depois do fork)"""
+        if self._pid_lock != os.getpid():
+            self._arquivo_lock = os.open(self.diretorio / "config.json", os.O_RDONLY)
+            self._pid_lock = os.getpid()
+        fcntl.flock(self._arquivo_lock, fcntl.LOCK_EX)
+
+    def _balde(self, instante):
+        return int((time.time() if instante is None else instante) // self.balde_s)
+
+    def _linha(self, h, balde, criar=True):
+        """Linha do cliente `h`; com `criar`, ocupa uma linha livre, expirada ou a mais antiga da sondagem"""
+        chaves, ultimo = self._chaves, self._ultimo
+        inicio = h & self.mascara
+        candidata, livre = None, False
+        mais_antiga, ultimo_mais_antigo = None, None
+        for passo in range(self.sondagens):
+            i = (inicio + passo) & self.mascara
+            chave = chaves[i]
+            if chave == h:
+                return i
+            if chave == 0:
+                if candidata is None:
+                    candidata, livre = i, True
+                break
+            visto = ultimo[i]
+            if candidata is None and visto <= balde - self.n_baldes:
+                candidata = i
+            elif mais_antiga is None or visto < ultimo_mais_antigo:
+                mais_antiga, ultimo_mais_antigo = i, visto
+        if not criar:
+            return None
+        # Contadores só quando a linha é de fato ocupada (a chave pode aparecer depois na sondagem)
+        if candidata is None:
+            candidata = mais_antiga
+            self.expulsoes += 1
+        elif livre:
+            self.novos += 1
+        else:
+            self.reaproveitados += 1
+
+        chaves[candidata] = h
+        ultimo[candidata] = balde
+        self.baldes[candidata] = 0
+        self.totais[candidata] = 0
+        self.recentes[candidata] = 0
+        return candidata
+
+    def _avancar(self, i, balde):
+        """Leva o anel da linha `i` até `balde`, descontando dos totais os baldes que saíram das janelas"""
+        anterior = self._ultimo[i]
+        if balde <= anterior:
+            return anterior
+        n = self.n_baldes
+        if balde - anterior >= n:
+            self.baldes[i] = 0
+            self.totais[i] = 0
+            self.recentes[i] = 0
+        else:
+            anel, totais = self._baldes, self._totais
+            base, base_totais = i * n, i * len(self.larguras)
+            for w, largura in enumerate(self.larguras):
+                # A janela em `anterior` cobre (anterior - largura, anterior]; saem os baldes <= balde - largura
+                saem = range(anterior - largura + 1, min(anterior, balde - largura) + 1)
+                if len(saem) >= largura:
+                    totais[base_totais + w] = 0
+                elif saem:
+                    totais[base_totais + w] -= sum(anel[base + j % n] for j in saem)
+            for j in range(anterior + 1, balde + 1):
+                anel[base + j % n] = 0
+        self._ultimo[i] = balde
+        return balde
+
+    def _registrar(self, chave, balde, id_=None):
+        i = self._linha(hash_chave(chave), balde)
+        # Evento atrasado (balde anterior ao último visto) conta no balde atual do cliente
+        atual = self._avancar(i, balde)
+        totais = self._totais
+        base = i * len(self.larguras)
+        if id_ is not None:
+            recentes, k = self._recentes, self.n_recentes
+            inicio = i * k
+            h = hash_chave(id_)
+            for j in range(inicio, inicio + k):
+                if recentes[j] == h:
+                    self.repetidos += 1
+                    return totais[base:base + len(self.larguras)].tolist()
+            # Mais recente na primeira posição; o mais antigo sai
+            for j in range(inicio + k - 1, inicio, -1):
+                recentes[j] = recentes[j - 1]
+            recentes[inicio] = h
+        posicao = i * self.n_baldes + atual % self.n_baldes
+        # O balde é uint16: satura em 65535 eventos, e os totais param junto para continuar batendo
+        if self._baldes[posicao] < SATURACAO:
+            self._baldes[posicao] += 1
+            for w in range(len(self.larguras)):
+                totais[base + w] += 1
+        self.eventos += 1
+        return totais[base:base + len(self.larguras)].tolist()
+
+    def registrar_lote(self, chaves, instante=None, ids=None):
+        """Conta um evento por chave (na ordem) e devolve a matriz [n, janelas] de contagens, já com ele.
+
+        `ids` (um por chave, None = sem id) identifica retentativas, que não contam de novo.
+        """
+        balde = self._balde(instante)
+        ids = ids if ids is not None else [None] * len(chaves)
+        with self._lock:
+            if self.diretorio is not None:
+                self._travar_processos()
+            try:
+                contagens = [self._registrar(chave, balde, id_) for chave, id_ in zip(chaves, ids)]
+            finally:
+                if self.diretorio is not None:
+                    fcntl.flock(self._arquivo_lock, fcntl.LOCK_UN)
+        return np.array(contagens, dtype=np.int64).reshape(len(chaves), len(self.janelas_s))
+
+    def registrar(self, chave, instante=None, id_=None):
+        """Conta um evento do cliente e devolve {janela_s: contagem}, incluindo o evento"""
+        return dict(zip(self.janelas_s, self.registrar_lote([chave], instante, [id_])[0].tolist()))
+
+    def consultar(self, chave, instante=None):
+        """Contagens atuais do cliente por janela, sem registrar evento"""
+        balde = self._balde(instante)
+        with self._lock:
+            if self.diretorio is not None:
+                self._travar_processos()
+            try:
+                i = self._linha(hash_chave(chave), balde, criar=False)
+                if i is None:
+                    return dict.fromkeys(self.janelas_s, 0)
+                self._avancar(i, balde)
+                base = i * len(self.larguras)
+                return dict(zip(self.janelas_s, self._totais[base:base + len(self.larguras)].tolist()))
+            finally:
+                if self.diretorio is not None:
+                    fcntl.flock(self._arquivo_lock, fcntl.LOCK_UN)
+
+    def sincronizar(self):
+        """Grava no disco as páginas alteradas (msync); sem `diretorio`, não faz nada"""
+        if self.diretorio is None:
+            return 0.0
+        inicio = time.perf_counter()
+        for array in (self.chaves, self.ultimo, self.baldes, self.totais, self.recentes):
+            array.flush()
+        return (time.perf_counter() - inicio) * 1000
+
+    def bytes_por_cliente(self):
+        arrays = (self.chaves, self.ultimo, self.baldes, self.totais, self.recentes)
+        return sum(a.itemsize * (a.size // self.capacidade) for a in arrays)
+
+    def estatisticas(self):
+        return {
+            "capacidade": self.capacidade,
+            "balde_s": self.balde_s,
+            "janelas_s": list(self.janelas_s),
+            "bytes_por_cliente": self.bytes_por_cliente(),
+            "persistente": self.diretorio is not None,
+            "restaurado": self.restaurado,
+            "eventos": self.eventos,
+            "clientes_novos": self.novos,
+            "linhas_reaproveitadas": self.reaproveitados,
+            "expulsoes": self.expulsoes,
+            "retentativas": self.repetidos,
+        }
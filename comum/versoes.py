@@ -0,0 +1,202 @@
+"""
+Registro de versões de modelo e ponteiro de implantação.
+
+Cada promoção grava uma versão imutável em um diretório novo,
+`producao/models/<versao>-<run>/` (`<versao>-<run>-poda<árvores>/` se o
+ensemble foi podado; com sufixo `-<n>` se o nome já existe: a API reaproveita
+versões carregadas pelo nome do diretório, então ele nunca é reescrito):
+    modelo.pkl      estimador original
+    artefato/       arrays mapeáveis (comum.artefato), quando exportável
+    calibracao.npy  calibrador (x, y) ajustado em metade do holdout (comum.calibracao)
+    perfil.json     perfil dos dados de treino (comum.perfil)
+    metadata.json   metadata da versão
+
+`producao/metadata.json` é o ponteiro da implantação: a metadata da versão
+primária mais, opcionalmente, `canario` ({"diretorio", "fracao"}) e
+`sombra` ({"diretorio"}). Trocar de versão é regravar o ponteiro com
+os.replace (atômico); a API percebe a mudança e recarrega sozinha.
+"""
+import io
+import itertools
+import json
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from comum.artefato import escrever_atomico, exportar, salvar_artefato, vincular_atomico
+from comum.calibracao import Calibrador, ajustar_calibrador, brier, metricas_no_limiar, varrer_limiares
+
+PRODUCAO_DIR = Path(__file__).resolve().parent.parent / "producao"
+MODELS_DIR = PRODUCAO_DIR / "models"
+PONTEIRO = PRODUCAO_DIR / "metadata.json"
+
+# Layout antigo: um único pickle sobrescrito a cada promoção
+PICKLE_LEGADO = "producao.pkl"
+
+
+def _gravar_json(caminho, dados):
+    escrever_atomico(caminho, json.dumps(dados, indent=2).encode())
+
+
+def _reservar_diretorio(models_dir, nome):
+    """Cria `nome` (ou `nome-2`, `nome-3`, ...) sem nunca reaproveitar um diretório existente"""
+    Path(models_dir).mkdir(parents=True, exist_ok=True)
+    for n in itertools.count(1):
+        diretorio = nome if n == 1 else f"{nome}-{n}"
+        try:
+            (Path(models_dir) / diretorio).mkdir()
+            return diretorio
+        except FileExistsError:
+            continue
+
+
+def registrar_versao(modelo, metadata, meses_treino, models_dir=MODELS_DIR, pickle_origem=None, meses_holdout=None):
+    """Grava a versão no registro e devolve sua metadata (com os caminhos dos arquivos).
+
+    `metadata` precisa de `versao` e `run_id`. O holdout (`dividir_holdout`)
+    dos `meses_holdout`, padrão `meses_treino`, precisa ser de linhas que o
+    modelo não viu: a grade treina no resto do mesmo corte; incremental e
+    refit treinam com todo o histórico, e o holdout deles é o do mês novo.
+    Ele é dividido ao meio (`partes_holdout`): o calibrador é ajustado na
+    metade de calibração; Brier, limiar e F1 vêm da metade de avaliação, e
+    o calibrador só fica se baixar o Brier nela. Com `poda` no metadata, a
+    calibração perde a metade escolhida para a poda e o F1, a precision, o
+    recall e o algoritmo registrados passam a ser os do modelo podado (os do
+    run ficam em `poda`). Volume e taxa de fraude do treino são os de `metadata`
+    (as linhas que o run viu); sem eles, os do perfil dos `meses_treino`.
+    Com `pickle_origem` (o pickle do run no MLflow), o modelo.pkl é um
+    hardlink dele em vez de uma nova serialização.
+    """
+    # pandas só na promoção: a API importa este módulo e não deve carregá-lo
+    from comum.dados import iterar_periodo, partes_holdout
+    from comum.perfil import gerar_perfil, salvar_perfil
+
+    poda = metadata.get("poda")
+    nome = f"{metadata['versao']}-{metadata['run_id'][:8]}" + (f"-poda{poda['arvores']}" if poda else "")
+    diretorio = _reservar_diretorio(models_dir, nome)
+    destino = Path(models_dir) / diretorio
+
+    if pickle_origem is not None:
+        vincular_atomico(pickle_origem, destino / "modelo.pkl")
+    else:
+        escrever_atomico(destino / "modelo.pkl", pickle.dumps(modelo))
+
+    exportado = exportar(modelo)
+    tipo_artefato = salvar_artefato(exportado, destino / "artefato")["tipo"] if exportado is not None else None
+
+    partes = partes_holdout(meses_holdout or meses_treino, poda=poda is not None)
+    X_calibracao, y_calibracao = partes["calibracao"]
+    X_holdout, y_holdout = partes["avaliacao"]
+    y_holdout = y_holdout.to_numpy()
+    calibrador = ajustar_calibrador(modelo.predict_proba(X_calibracao)[:, 1], y_calibracao.to_numpy())
+    brutas = modelo.predict_proba(X_holdout)[:, 1]
+    calibradas = calibrador.aplicar(brutas) if calibrador is not None else brutas
+    brier_antes, brier_depois = brier(y_holdout, brutas), brier(y_holdout, calibradas)
+    descartada = None
+    if calibrador is not None and brier_depois >= brier_antes:
+        descartada = {"metodo": calibrador.metodo, "brier_antes": brier_antes, "brier_depois": brier_depois}
+        calibrador, calibradas, brier_depois = None, brutas, brier_antes
+    escolha = varrer_limiares(y_holdout, calibradas)
+    if calibrador is not None:
+        buffer = io.BytesIO()
+        np.save(buffer, calibrador.para_array())
+        escrever_atomico(destino / "calibracao.npy", buffer.getvalue())
+
+    perfil = gerar_perfil(modelo, iterar_periodo(*meses_treino), metadata["versao"], metadata["run_id"], meses_treino,
+                          limiar=escolha["limiar"], calibrador=calibrador)
+    salvar_perfil(perfil, destino / "perfil.json")
+
+    if poda:
+        # O run mediu o ensemble inteiro: fica registrado o que o modelo servido faz na avaliação
+        poda = {**poda, **{f"{chave}_run": metadata[chave] for chave in ("algoritmo", "f1_score", "precision", "recall")}}
+        metadata = {
+            **metadata,
+            "algoritmo": f"{metadata['algoritmo']} (podado: {poda['arvores']} árvores)",
+            "f1_score": escolha["f1"],
+            "precision": escolha["precision"],
+            "recall": escolha["recall"],
+            "poda": poda,
+        }
+
+    metadata = {
+        **metadata,
+        "diretorio": diretorio,
+        "modelo": f"{diretorio}/modelo.pkl",
+        "artefato": f"{diretorio}/artefato" if exportado is not None else None,
+        "tipo_artefato": tipo_artefato,
+        "perfil": f"{diretorio}/perfil.json",
+        "limiar": escolha["limiar"],
+        "calibracao": None if calibrador is None else {
+            "arquivo": f"{diretorio}/calibracao.npy",
+            "metodo": calibrador.metodo,
+            "brier_antes": brier_antes,
+            "brier_depois": brier_depois,
+        },
+        "calibracao_descartada": descartada,
+        "holdout": {
+            "meses": list(meses_holdout or meses_treino),
+            "n": len(y_holdout),
+            "n_calibracao": len(y_calibracao),
+            **escolha,
+            "f1_limiar_padrao": metricas_no_limiar(y_holdout, brutas, 0.5)["f1"],
+        },
+        "n_transacoes_treino": metadata.get("n_transacoes_treino", perfil["n_transacoes"]),
+        "taxa_fraude_treino": metadata.get("taxa_fraude_treino", perfil["taxa_fraude"]),
+    }
+    _gravar_json(destino / "metadata.json", metadata)
+    return metadata
+
+
+def metadata_versao(diretorio, models_dir=MODELS_DIR):
+    with open(Path(models_dir) / diretorio / "metadata.json") as f:
+        return json.load(f)
+
+
+def listar_versoes(models_dir=MODELS_DIR):
+    """Metadata de todas as versões do registro, da mais antiga para a mais nova"""
+    versoes = [metadata_versao(p.parent.name, models_dir) for p in Path(models_dir).glob("*/metadata.json")]
+    return sorted(versoes, key=lambda m: (m.get("data_deploy", ""), m["diretorio"]))
+
+
+def ler_ponteiro(ponteiro=PONTEIRO):
+    with open(ponteiro) as f:
+        return json.load(f)
+
+
+def implantar(primaria, canario=None, fracao_canario=0.0, sombra=None, ponteiro=PONTEIRO, models_dir=MODELS_DIR):
+    """Regrava o ponteiro de uma vez: primária, canário (com fração do tráfego) e sombra"""
+    if canario == primaria or fracao_canario <= 0:
+        canario = None
+    if sombra in (primaria, canario):
+        sombra = None
+
+    conteudo = metadata_versao(primaria, models_dir)
+    if canario is not None:
+        metadata_versao(canario, models_dir)
+        conteudo["canario"] = {"diretorio": canario, "fracao": min(1.0, float(fracao_canario))}
+    if sombra is not None:
+        metadata_versao(sombra, models_dir)
+        conteudo["sombra"] = {"diretorio": sombra}
+    _gravar_json(ponteiro, conteudo)
+    return conteudo
+
+
+def carregar_modelo(metadata, models_dir=MODELS_DIR):
+    """Estimador da versão descrita por `metadata` (ou o pickle do layout antigo)"""
+    with open(Path(models_dir) / metadata.get("modelo", PICKLE_LEGADO), "rb") as f:
+        return pickle.load(f)
+
+
+def carregar_calibrador(metadata, models_dir=MODELS_DIR):
+    """Calibrador da versão (arrays mapeados em memória), ou None"""
+    calibracao = metadata.get("calibracao")
+    if not calibracao:
+        return None
+    return Calibrador.de_array(np.load(Path(models_dir) / calibracao["arquivo"], mmap_mode="r"), calibracao["metodo"])
+
+
+def carregar_modelo_ativo(ponteiro=PONTEIRO, models_dir=MODELS_DIR):
+    """(estimador, metadata) da versão primária"""
+    metadata = ler_ponteiro(ponteiro)
+    return carregar_modelo(metadata, models_dir), metadata
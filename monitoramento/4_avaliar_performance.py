@@ -4,64 +4,75 @@
 Testa o modelo v1.0 (treinado em Outubro) com dados de Novembro.
 Detecta degradação de performance (concept drift).
 """
-import pickle
-import json
-import pandas as pd
-from sklearn.metrics import f1_score, precision_score, recall_score
+import os
+import sys
+import warnings
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.features import CATEGORIAS, CodificadorFeatures
+from comum.dados import iterar_periodo, nome_mes
+from comum.metricas import MatrizConfusao, avaliar_em_blocos
+from comum.perfil import carregar_perfil
+from comum.registro import arquivos_registro, ler_registros
+from comum.versoes import MODELS_DIR, PONTEIRO, carregar_calibrador, carregar_modelo_ativo
+
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
 print("📊 RELATÓRIO DE MONITORAMENTO - Novembro 2025")
 print("=" * 60)
 
-# Carregar modelo de produção
-model_path = Path("../producao/models/producao.pkl")
-metadata_path = Path("../producao/metadata.json")
-
-if not model_path.exists():
+# Carregar a versão primária de produção
+if not PONTEIRO.exists():
     print("❌ Erro: Modelo de produção não encontrado")
     exit(1)
 
-with open(model_path, "rb") as f:
-    modelo = pickle.load(f)
+modelo, metadata = carregar_modelo_ativo()
 
-with open(metadata_path, "r") as f:
-    metadata = json.load(f)
+codificador = CodificadorFeatures.do_modelo(modelo)
+# Mesma regra de decisão da API: probabilidade calibrada >= limiar da versão
+regra = {"limiar": metadata.get("limiar", 0.5), "calibrador": carregar_calibrador(metadata)}
+
+# Baseline: perfil de treino salvo na promoção (sem repontuar o treino).
+# Sem perfil, Outubro é pontuado como antes.
+COLUNAS = ["valor", "hora", "categoria", "categoria_cod", "qtd_transacoes_24h", "is_fraud"]
+perfil_path = MODELS_DIR / (metadata.get("perfil") or "")
+if metadata.get("perfil") and perfil_path.exists():
+    perfil = carregar_perfil(perfil_path)
+    meses_treino = perfil["meses"]
+    treino = MatrizConfusao.de_dict(perfil["matriz"])
+else:
+    meses_treino = ["2025-10"]
+    treino = avaliar_em_blocos(modelo, iterar_periodo(*meses_treino, colunas=COLUNAS), codificador, **regra)
 
-# Carregar dados de Outubro (baseline) e Novembro (produção)
-df_outubro = pd.read_csv("../dados/outubro_2025.csv")
-df_novembro = pd.read_csv("../dados/novembro_2025.csv")
+# Novembro (produção): lido em blocos, cada bloco só atualiza a matriz de confusão acumulada
+novembro = avaliar_em_blocos(modelo, iterar_periodo("2025-11", colunas=COLUNAS), codificador, **regra)
 
+rotulo_treino = " + ".join(nome_mes(m) for m in meses_treino)
+nome_treino = " + ".join(nome_mes(m).split()[0] for m in meses_treino)
 print(f"\n📅 Período de Análise")
-print(f"   Treino: Outubro 2025 ({len(df_outubro)} transações, {df_outubro['is_fraud'].sum()/len(df_outubro)*100:.0f}% fraude)")
-print(f"   Produção: Novembro 2025 ({len(df_novembro)} transações, {df_novembro['is_fraud'].sum()/len(df_novembro)*100:.0f}% fraude)")
+print(f"   Treino: {rotulo_treino} ({treino.n} transações, {treino.taxa_fraude*100:.0f}% fraude)")
+print(f"   Produção: Novembro 2025 ({novembro.n} transações, {novembro.taxa_fraude*100:.0f}% fraude)")
 
 print(f"\n🤖 Modelo em Produção")
 print(f"   Versão: {metadata['versao']}")
 print(f"   Deploy: {metadata['data_deploy']}")
 print(f"   Algoritmo: {metadata['algoritmo']}")
 
-# Avaliar em Outubro (baseline)
-X_out = df_outubro[["valor", "hora", "categoria_cod", "qtd_transacoes_24h"]]
-y_out = df_outubro["is_fraud"]
-y_pred_out = modelo.predict(X_out)
+# Baseline (treino)
+f1_out = treino.f1
+prec_out = treino.precision
+rec_out = treino.recall
 
-f1_out = f1_score(y_out, y_pred_out)
-prec_out = precision_score(y_out, y_pred_out)
-rec_out = recall_score(y_out, y_pred_out)
-
-print(f"\n📈 MÉTRICAS - OUTUBRO (Baseline)")
+print(f"\n📈 MÉTRICAS - {nome_treino.upper()} (Baseline)")
 print(f"   F1 Score:  {f1_out:.3f}  {'━' * int(f1_out * 20)} 100%")
 print(f"   Precision: {prec_out:.3f}  {'━' * int(prec_out * 20)} {int(prec_out/f1_out*100):3d}%")
 print(f"   Recall:    {rec_out:.3f}  {'━' * int(rec_out * 20)} {int(rec_out/f1_out*100):3d}%")
 
 # Avaliar em Novembro (produção)
-X_nov = df_novembro[["valor", "hora", "categoria_cod", "qtd_transacoes_24h"]]
-y_nov = df_novembro["is_fraud"]
-y_pred_nov = modelo.predict(X_nov)
-
-f1_nov = f1_score(y_nov, y_pred_nov)
-prec_nov = precision_score(y_nov, y_pred_nov)
-rec_nov = recall_score(y_nov, y_pred_nov)
+f1_nov = novembro.f1
+prec_nov = novembro.precision
+rec_nov = novembro.recall
 
 degradacao_f1 = ((f1_nov - f1_out) / f1_out) * 100
 degradacao_prec = ((prec_nov - prec_out) / prec_out) * 100
@@ -91,38 +102,66 @@ else:
     print(f"     Status: ✅ OK\n")
 
 # Mudança na taxa de fraude
-taxa_out = df_outubro['is_fraud'].sum() / len(df_outubro)
-taxa_nov = df_novembro['is_fraud'].sum() / len(df_novembro)
+taxa_out = treino.taxa_fraude
+taxa_nov = novembro.taxa_fraude
 mudanca_taxa = ((taxa_nov - taxa_out) / taxa_out) * 100
 
 print(f"  2. MUDANÇA NO PADRÃO DE FRAUDES")
-print(f"     Taxa Outubro: {taxa_out*100:.0f}%")
+print(f"     Taxa {nome_treino}: {taxa_out*100:.0f}%")
 print(f"     Taxa Novembro: {taxa_nov*100:.0f}% ({mudanca_taxa:+.0f}%)\n")
 
 # Análise de padrões
 print(f"  3. NOVOS PADRÕES IDENTIFICADOS")
-fraudes_nov = df_novembro[df_novembro['is_fraud'] == 1]
-fraudes_out = df_outubro[df_outubro['is_fraud'] == 1]
-
-valor_medio_out = fraudes_out['valor'].mean()
-valor_medio_nov = fraudes_nov['valor'].mean()
+valor_medio_out = treino.valor_medio_fraudes
+valor_medio_nov = novembro.valor_medio_fraudes
 mudanca_valor = ((valor_medio_nov - valor_medio_out) / valor_medio_out) * 100
 
 print(f"     • Valores médios de fraude: R$ {valor_medio_out:.0f} → R$ {valor_medio_nov:.0f} ({mudanca_valor:+.0f}%)")
 
 # Categorias novas
-cats_nov = set(df_novembro['categoria'].unique())
-cats_out = set(df_outubro['categoria'].unique())
-novas_cats = cats_nov - cats_out
+cats_out = set(treino.categorias())
+novas_cats = [c for c in novembro.categorias() if c not in cats_out]
 
 if novas_cats:
     print(f"     • Novas categorias detectadas: {', '.join(novas_cats)}")
 
 # Horários
-hora_media_out = fraudes_out['hora'].mean()
-hora_media_nov = fraudes_nov['hora'].mean()
+hora_media_out = treino.hora_media_fraudes
+hora_media_nov = novembro.hora_media_fraudes
 print(f"     • Horário médio fraudes: {hora_media_out:.0f}h → {hora_media_nov:.0f}h")
 
+# Recall por categoria (mesma passada)
+print(f"\n  4. RECALL POR CATEGORIA (categorias com fraude em Novembro)")
+cat_out = treino.por_categoria()
+for nome, nov in sorted(novembro.por_categoria().items(), key=lambda item: -item[1]["fraudes"]):
+    if nov["fraudes"] == 0:
+        continue
+    out = cat_out.get(nome)
+    antes = f"{out['recall']:.2f}" if out and out["fraudes"] else " -- "
+    print(f"     • {nome:14} {nov['fraudes']:4d} fraudes ({nov['taxa_fraude']*100:3.0f}%) | recall {antes} → {nov['recall']:.2f}")
+
+# Métricas reais de produção: predições registradas pela API com os rótulos
+# juntados por 'juntar_rotulos.py', lidas em blocos
+registro_dir = Path(os.environ.get("REGISTRO_DIR", "../producao/logs"))
+if arquivos_registro(registro_dir, rotulados=True):
+    por_versao = {}
+    latencias = {}
+    for bloco in ler_registros(registro_dir, rotulados=True):
+        bloco["categoria_cod"] = bloco["categoria"].map(CATEGORIAS).fillna(0)
+        for versao, grupo in bloco.groupby("versao"):
+            por_versao.setdefault(versao, MatrizConfusao()).atualizar(
+                grupo["is_fraud"].to_numpy(), grupo["fraude"].to_numpy(),
+                categoria_cod=grupo["categoria_cod"].to_numpy(),
+                valor=grupo["valor"].to_numpy(), hora=grupo["hora"].to_numpy()
+            )
+            latencias[versao] = latencias.get(versao, 0.0) + float(grupo["latencia_ms"].sum())
+
+    print(f"\n  5. MÉTRICAS REAIS DE PRODUÇÃO (registro da API)")
+    for versao, matriz in sorted(por_versao.items()):
+        print(f"     • {versao}: {matriz.n} predições rotuladas ({matriz.taxa_fraude*100:.0f}% fraude) | "
+              f"F1 {matriz.f1:.3f} | Precision {matriz.precision:.3f} | Recall {matriz.recall:.3f} | "
+              f"latência média {latencias[versao] / matriz.n:.1f} ms")
+
 # Recomendação
 print(f"\n💡 RECOMENDAÇÃO: {'RETREINAMENTO URGENTE' if alerta_critico else 'Monitorar'}")
 
@@ -0,0 +1,59 @@
+"""
+JUNTAR RÓTULOS AO REGISTRO DE PREDIÇÕES
+
+Os rótulos (is_fraud) chegam dias depois da predição. Este job junta os
+rótulos disponíveis ao registro da API (`producao/logs`) por
+transaction_id e grava `producao/logs/rotulados/`, que o
+`4_avaliar_performance.py` usa para as métricas reais de produção.
+
+Uso:
+    python juntar_rotulos.py                  # rótulos dos meses em dados/
+    python juntar_rotulos.py rotulos.csv ...  # CSVs com transaction_id,is_fraud
+"""
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.dados import carregar_periodo, meses_disponiveis
+from comum.registro import arquivos_registro, juntar_rotulos
+
+REGISTRO_DIR = Path(os.environ.get("REGISTRO_DIR", "../producao/logs"))
+
+print("🏷️  JUNTANDO RÓTULOS AO REGISTRO DE PREDIÇÕES")
+print("=" * 60)
+
+if not arquivos_registro(REGISTRO_DIR):
+    print(f"❌ Nenhum registro de predições em {REGISTRO_DIR} (a API grava com REGISTRO_INTERVALO_S > 0)")
+    exit(1)
+
+# Rótulos: só transaction_id e is_fraud, uma partição por vez (um mês de dados/, ou 1M de linhas de CSV)
+colunas = ["transaction_id", "is_fraud"]
+if len(sys.argv) > 1:
+    origem = ", ".join(sys.argv[1:])
+    blocos = (b for arquivo in sys.argv[1:]
+              for b in pd.read_csv(arquivo, usecols=colunas, dtype={"transaction_id": str, "is_fraud": "int8"},
+                                   chunksize=1_000_000))
+else:
+    meses = list(meses_disponiveis())
+    origem = f"dados/ ({', '.join(meses)})"
+    blocos = (carregar_periodo(mes, colunas=colunas) for mes in meses)
+
+n_rotulos = 0
+
+
+def particoes():
+    global n_rotulos
+    for bloco in blocos:
+        n_rotulos += len(bloco)
+        yield bloco.set_index("transaction_id")["is_fraud"]
+
+
+lidos, rotulados = juntar_rotulos(REGISTRO_DIR, particoes())
+print(f"\n📥 {n_rotulos} rótulos de {origem}")
+print(f"✅ {rotulados} de {lidos} predições rotuladas ({rotulados / max(lidos, 1) * 100:.0f}%)")
+print(f"   Saída: {REGISTRO_DIR / 'rotulados'}")
+
+print(f"\n👉 Próximo passo: Execute '4_avaliar_performance.py'")
@@ -4,11 +4,20 @@
 Busca o melhor modelo do MLflow e promove para produção.
 """
 import mlflow
-import pickle
 import json
+import sys
+import warnings
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.orcamento import PODA_TOLERANCIA_F1, imprimir_selecao, podar_no_holdout, selecionar, servico_do_run
+from comum.placar import TOP_K, carregar_modelo_run, melhores_runs, treino_do_run
+from comum.versoes import MODELS_DIR, implantar, registrar_versao
+
+# O perfil pontua o treino com matrizes NumPy; o modelo foi treinado com DataFrame
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
 print("📦 PROMOVENDO MODELO PARA PRODUÇÃO")
 print("=" * 60)
 
@@ -21,60 +30,82 @@ if experiment is None:
     print("❌ Erro: Execute primeiro '1_rodar_experimentos.py'")
     exit(1)
 
-runs = mlflow.search_runs(
-    experiment_ids=[experiment.experiment_id],
-    order_by=["metrics.f1_score DESC"]
-)
+# Candidatos do placar: vence o melhor F1 que cabe no orçamento de latência e memória
+runs = melhores_runs(experiment.experiment_id, k=TOP_K)
 
 if len(runs) == 0:
     print("❌ Nenhum experimento encontrado")
     exit(1)
 
-melhor_run = runs.iloc[0]
+melhor_run = selecionar(runs)
+imprimir_selecao(runs, melhor_run)
+if melhor_run is None:
+    print("❌ Nenhum modelo cabe no orçamento (ORCAMENTO_P99_MS, ORCAMENTO_LOTE_P99_MS, ORCAMENTO_MB)")
+    exit(1)
 run_id = melhor_run["run_id"]
-f1 = melhor_run["metrics.f1_score"]
-precision = melhor_run["metrics.precision"]
-recall = melhor_run["metrics.recall"]
+f1 = melhor_run["metricas"]["f1_score"]
+precision = melhor_run["metricas"]["precision"]
+recall = melhor_run["metricas"]["recall"]
 
 print("\n✅ Melhor modelo identificado:")
-print(f"   Algoritmo: {melhor_run['tags.mlflow.runName']}")
+print(f"   Algoritmo: {melhor_run['nome']}")
 print(f"   F1 Score: {f1:.3f}")
 print(f"   Precision: {precision:.3f}")
 print(f"   Recall: {recall:.3f}")
 print(f"   Run ID: {run_id[:12]}")
 
+meses_treino = ["2025-10"]
+
 # Carregar modelo do MLflow
 print("\n📥 Carregando modelo do MLflow...")
-model = mlflow.sklearn.load_model(f"runs:/{run_id}/model")
-
-# Criar diretório models se não existir
-models_dir = Path("../producao/models")
-models_dir.mkdir(parents=True, exist_ok=True)
-
-# Salvar modelo em produção
-model_path = models_dir / "producao.pkl"
-with open(model_path, "wb") as f:
-    pickle.dump(model, f)
-
-print(f"✅ Modelo salvo em: {model_path}")
-
-# Criar metadata
-metadata = {
+model, pickle_run = carregar_modelo_run(melhor_run)
+servico, poda = servico_do_run(melhor_run), None
+if PODA_TOLERANCIA_F1 > 0:
+    model, poda = podar_no_holdout(model, meses_treino)
+    if poda is not None:
+        # O modelo mudou: o pickle do run não serve mais
+        servico, pickle_run = poda.pop("servico"), None
+        print(f"✂️  Poda: {poda['arvores_originais']} → {poda['arvores']} árvores | F1 na parte de poda "
+              f"{poda['f1_poda_original']:.3f} → {poda['f1_poda']:.3f} | p99 {servico['latencia_lote1_p99_ms']:.2f} ms, "
+              f"{servico['tamanho_mb']:.1f} MB")
+    else:
+        print(f"✂️  Poda: nenhuma árvore removível dentro da tolerância de {PODA_TOLERANCIA_F1} no F1")
+
+# Registrar a versão (pickle, artefato em arrays e perfil de treino) em models/<versao>-<run>/
+metadata = registrar_versao(model, {
     "versao": "v1.0",
     "data_deploy": datetime.now().strftime("%Y-%m-%d"),
     "data_treino": "outubro_2025",
-    "algoritmo": melhor_run['tags.mlflow.runName'],
+    "algoritmo": melhor_run['nome'],
     "f1_score": float(f1),
     "precision": float(precision),
     "recall": float(recall),
     "run_id": run_id,
-    "n_transacoes_treino": 2000,
-    "taxa_fraude_treino": 0.10
-}
-
-metadata_path = Path("../producao/metadata.json")
-with open(metadata_path, "w") as f:
-    json.dump(metadata, f, indent=2)
+    "servico": servico,
+    "poda": poda,
+    # Linhas que o run treinou (runs antigos não têm: ficam as do perfil dos meses)
+    **{k: v for k, v in treino_do_run(melhor_run).items() if k != "modo" and v is not None}
+}, meses_treino, pickle_origem=pickle_run)
+
+print(f"✅ Versão registrada em: {MODELS_DIR.name}/{metadata['diretorio']}")
+if metadata["artefato"]:
+    print(f"   Artefato {metadata['tipo_artefato']}: {metadata['artefato']}")
+print(f"   Perfil de treino: {metadata['perfil']} | treino do run: {metadata['n_transacoes_treino']} transações")
+
+# Calibração e limiar escolhidos no holdout (a API decide só com predict_proba e este limiar)
+holdout = metadata["holdout"]
+print(f"   Holdout: {holdout['n_calibracao']} transações para calibrar, {holdout['n']} para avaliar")
+if metadata["calibracao"]:
+    c = metadata["calibracao"]
+    print(f"   Calibração {c['metodo']}: Brier {c['brier_antes']:.4f} → {c['brier_depois']:.4f}")
+elif metadata["calibracao_descartada"]:
+    c = metadata["calibracao_descartada"]
+    print(f"   Calibração {c['metodo']} descartada: Brier {c['brier_antes']:.4f} → {c['brier_depois']:.4f} (não melhorou)")
+print(f"   Limiar ({holdout['criterio']}, {holdout['cortes_avaliados']} cortes): {holdout['limiar']:.3f} | "
+      f"F1 holdout {holdout['f1_limiar_padrao']:.3f} (0.5) → {holdout['f1']:.3f}")
+
+# Apontar a produção para a nova versão (troca atômica do metadata.json)
+implantar(metadata["diretorio"])
 
 print(f"\n✅ Metadata atualizada:")
 print(json.dumps(metadata, indent=2))
@@ -2,17 +2,88 @@
 3. API DE PRODUÇÃO
 
 API FastAPI que usa o modelo promovido.
+
+O metadata.json aponta a versão primária e, opcionalmente, uma versão
+canário (recebe uma fração do tráfego) e uma versão sombra (pontua o
+mesmo tráfego sem afetar as respostas). Ver `comum/versoes.py`.
+
+A partida fica fora do caminho pesado: pandas, sklearn e XGBoost não são
+importados para servir. Com INICIO_RAPIDO=1 a versão começa a responder
+pelo artefato mapeado, e o pickle é carregado em segundo plano depois que
+a API fica pronta. Um lote de aquecimento passa pela inferência antes de
+`/health/ready` responder 200; `/health/live` só indica que o processo responde.
 """
-from fastapi import FastAPI, HTTPException
+import time
+
+INICIO = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-import pickle
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import itertools
 import json
-import pandas as pd
+import os
+import sys
+import uuid
+import warnings
 from pathlib import Path
-from typing import Literal
+from typing import Literal, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.agrupador import AgrupadorRequisicoes
+from comum.artefato import carregar_artefato, tamanho_artefato
+from comum.cache import CacheResultados
+from comum.drift import EsbocoFeatures, MonitorDrift
+from comum.features import CATEGORIAS, CodificadorFeatures
+from comum.implantacao import AvaliadorSombra, EstatisticasVersao
+from comum.perfil import carregar_perfil
+from comum.registro import RegistroPredicoes
+from comum.telemetria import AmostradorPerfil, MiddlewareTelemetria, Telemetria
+from comum.velocidade import ContadorVelocidade
+from comum.versoes import carregar_calibrador, carregar_modelo, metadata_versao
+
+IMPORTACAO_MS = (time.perf_counter() - INICIO) * 1000
+
+# O modelo foi treinado com DataFrame; a inferência usa matrizes NumPy
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    global sorteio
+    # Por processo: workers criados por fork (servir.py) herdariam a mesma sequência do sorteio do canário
+    sorteio = np.random.default_rng()
+    await agrupador.iniciar()
+    if DRIFT_INTERVALO_S > 0:
+        await monitor.iniciar()
+    if REGISTRO_INTERVALO_S > 0:
+        await registro.iniciar()
+    if SOMBRA_INTERVALO_S > 0:
+        await avaliador_sombra.iniciar()
+    vigia = asyncio.create_task(vigiar_metadata()) if RECARGA_INTERVALO_S > 0 else None
+    preparo = asyncio.create_task(preparar())
+    sincronia = asyncio.create_task(sincronizar_velocidade()) if VELOCIDADE_SINCRONIZAR_S > 0 else None
+    yield
+    preparo.cancel()
+    if sincronia is not None:
+        sincronia.cancel()
+    velocidade.sincronizar()
+    if vigia is not None:
+        vigia.cancel()
+    await monitor.parar()
+    await agrupador.parar()
+    await registro.parar()
+    await avaliador_sombra.parar()
 
-app = FastAPI(title="API de Detecção de Fraudes", version="1.0.0")
+
+app = FastAPI(title="API de Detecção de Fraudes", version="1.0.0", lifespan=ciclo_de_vida)
 
 # CORS
 app.add_middleware(
@@ -22,54 +93,597 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Carregar modelo e metadata
-MODEL_PATH = Path("models/producao.pkl")
+# Telemetria (/metrics): latência por rota e por estágio, contadores e requisições em andamento
+telemetria = Telemetria()
+app.add_middleware(MiddlewareTelemetria, telemetria=telemetria, rotas=lambda: [r.path for r in app.routes],
+                   esperados=[("/health/ready", 503)])
+
+# Registro de versões e ponteiro da implantação
+MODELS_DIR = Path("models")
 METADATA_PATH = Path("metadata.json")
 
-if not MODEL_PATH.exists():
+if not METADATA_PATH.exists():
     print("❌ Erro: Modelo não encontrado. Execute '2_promover_modelo.py' primeiro.")
     exit(1)
 
+# Configuração de inferência
+MAX_ITENS_LOTE = int(os.environ.get("MAX_ITENS_LOTE", 10000))
+MICROLOTE_MAX_ITENS = int(os.environ.get("MICROLOTE_MAX_ITENS", 64))
+MICROLOTE_MAX_ESPERA_MS = float(os.environ.get("MICROLOTE_MAX_ESPERA_MS", 2.0))
+# Acima deste tamanho de lote o modelo original (código nativo) é mais rápido
+MOTOR_ARVORES_MAX_LOTE = int(os.environ.get("MOTOR_ARVORES_MAX_LOTE", 64))
+# Com 1, não carrega o pickle quando há artefato: só páginas mapeadas, compartilhadas entre workers
+SOMENTE_ARTEFATO = os.environ.get("MODELO_SOMENTE_ARTEFATO", "0") == "1"
+# Com 1, a partida só mapeia o artefato; o pickle (que importa sklearn/XGBoost) é carregado depois de pronta
+INICIO_RAPIDO = os.environ.get("INICIO_RAPIDO", "0") == "1"
+# Intervalo de verificação do metadata.json para recarga a quente (0 desliga)
+RECARGA_INTERVALO_S = float(os.environ.get("RECARGA_INTERVALO_S", 2.0))
+# Monitor de drift: intervalo de processamento (0 desliga), janela e capacidade do anel (em lotes)
+DRIFT_INTERVALO_S = float(os.environ.get("DRIFT_INTERVALO_S", 5.0))
+DRIFT_JANELA_S = float(os.environ.get("DRIFT_JANELA_S", 3600.0))
+DRIFT_CAPACIDADE = int(os.environ.get("DRIFT_CAPACIDADE", 4096))
+# Registro de predições: diretório, intervalo entre gravações/fsync (0 desliga) e tamanho de rotação
+REGISTRO_DIR = Path(os.environ.get("REGISTRO_DIR", "logs"))
+REGISTRO_INTERVALO_S = float(os.environ.get("REGISTRO_INTERVALO_S", 1.0))
+REGISTRO_MAX_MB = float(os.environ.get("REGISTRO_MAX_MB", 64))
+# Versão sombra: intervalo da thread que a pontua (0 desliga) e capacidade do anel (em lotes)
+SOMBRA_INTERVALO_S = float(os.environ.get("SOMBRA_INTERVALO_S", 0.05))
+SOMBRA_CAPACIDADE = int(os.environ.get("SOMBRA_CAPACIDADE", 1024))
+# Cache de probabilidades por versão e vetor codificado: capacidade em linhas (0 desliga) e validade
+CACHE_CAPACIDADE = int(os.environ.get("CACHE_CAPACIDADE", 10000))
+CACHE_TTL_S = float(os.environ.get("CACHE_TTL_S", 300.0))
+# Contador de velocidade por cliente: diretório dos arrays mapeados (padrão vazio: só em memória, por worker),
+# capacidade em clientes, resolução (balde), janelas e intervalo de gravação no disco (0 só grava ao sair)
+VELOCIDADE_DIR = os.environ.get("VELOCIDADE_DIR", "")
+VELOCIDADE_CAPACIDADE = int(os.environ.get("VELOCIDADE_CAPACIDADE", 1 << 20))
+VELOCIDADE_BALDE_S = int(os.environ.get("VELOCIDADE_BALDE_S", 1800))
+VELOCIDADE_JANELAS_S = sorted({int(j) for j in os.environ.get("VELOCIDADE_JANELAS_S", "3600,86400").split(",")} | {86400})
+VELOCIDADE_SINCRONIZAR_S = float(os.environ.get("VELOCIDADE_SINCRONIZAR_S", 30.0))
+# Com 1, libera o perfil por amostragem em /profiler (ligado e desligado em execução)
+PROFILER_HABILITADO = os.environ.get("PROFILER_HABILITADO", "0") == "1"
+
+
+# Identifica cada versão carregada no cache de resultados (nunca se repete no processo)
+GERACOES = itertools.count(1)
+
+
+class ModeloProducao:
+    """Versão de modelo carregada.
+
+    Nunca é alterada depois de criada: a recarga monta outra instância e
+    troca a referência global, e requisições em andamento terminam com a
+    instância que já tinham. A exceção é o estimador com `estimador=False`
+    (partida rápida): `carregar_estimador()` o preenche depois, em segundo plano.
+    """
+
+    def __init__(self, metadata, estimador=True):
+        inicio = time.perf_counter()
+        self.metadata = metadata
+        # Diretório no registro de versões (None no layout antigo, com um único pickle)
+        self.diretorio = metadata.get("diretorio")
+        self.geracao = next(GERACOES)
+
+        # Artefato em arrays mapeados em memória (exportado na promoção)
+        self.artefato = None
+        self.artefato_dir = None
+        if self.metadata.get("artefato"):
+            artefato_dir = MODELS_DIR / self.metadata["artefato"]
+            if artefato_dir.exists():
+                self.artefato = carregar_artefato(artefato_dir, mmap=True)
+                self.artefato_dir = artefato_dir
+
+        self.modelo = None
+        self.estimador_ms = None
+        if self.artefato is None or (estimador and not SOMENTE_ARTEFATO):
+            self.carregar_estimador()
+
+        # Codificador compilado uma vez a partir do esquema do modelo
+        self.codificador = CodificadorFeatures.do_modelo(self.modelo if self.modelo is not None else self.artefato)
+        # Limiar e calibrador escolhidos no holdout, na promoção
+        self.limiar = float(os.environ.get("LIMIAR_FRAUDE", self.metadata.get("limiar", 0.5)))
+        self.calibrador = carregar_calibrador(self.metadata, MODELS_DIR)
+
+        # Esboço dos dados de treino para o monitor de drift (gerado na promoção)
+        self.referencia = None
+        if self.metadata.get("perfil"):
+            perfil_path = MODELS_DIR / self.metadata["perfil"]
+            if perfil_path.exists():
+                self.referencia = EsbocoFeatures.de_dict(carregar_perfil(perfil_path)["esboco"])
+        self.carga_ms = (time.perf_counter() - inicio) * 1000
+
+    @property
+    def versao(self):
+        return self.metadata["versao"]
+
+    @property
+    def identificador(self):
+        """Chave das estatísticas e da telemetria: o diretório no registro (dois builds
+        "v2.0" não se misturam); o rótulo `versao` fica só para exibição"""
+        return self.diretorio or self.versao
+
+    @property
+    def estimador_pendente(self):
+        return self.modelo is None and not SOMENTE_ARTEFATO
+
+    def carregar_estimador(self):
+        inicio = time.perf_counter()
+        self.modelo = carregar_modelo(self.metadata, MODELS_DIR)
+        self.estimador_ms = (time.perf_counter() - inicio) * 1000
+
+    def predict_proba(self, matriz):
+        modelo = self.modelo
+        if self.artefato is not None and (modelo is None or len(matriz) <= MOTOR_ARVORES_MAX_LOTE):
+            probabilidades = self.artefato.predict_proba(matriz)
+        else:
+            probabilidades = modelo.predict_proba(matriz)
+        if self.calibrador is None:
+            return probabilidades
+        p1 = self.calibrador.aplicar(probabilidades[:, 1])
+        return np.column_stack([1.0 - p1, p1])
+
+    def info(self):
+        return {
+            "versao": self.metadata["versao"],
+            "f1_score": self.metadata["f1_score"],
+            "deploy_date": self.metadata["data_deploy"]
+        }
+
+    def descricao_artefato(self):
+        if self.artefato_dir is None:
+            return None
+        return {
+            "diretorio": self.metadata["artefato"],
+            "tipo": type(self.artefato).__name__,
+            "bytes": tamanho_artefato(self.artefato_dir),
+            "mmap": True,
+            "pickle_carregado": self.modelo is not None
+        }
+
+
+class Implantacao:
+    """Versões servidas, lidas do ponteiro: primária, canário (com a fração do tráfego) e sombra.
+
+    Também não muda depois de criada. Na recarga, versões que continuam
+    no ponteiro são reaproveitadas da implantação anterior (sem recarregar
+    e sem reiniciar a janela do monitor de drift).
+    """
+
+    def __init__(self, anterior=None, estimador=True):
+        inicio = time.perf_counter()
+        self.estimador = estimador
+        self.mtime = METADATA_PATH.stat().st_mtime_ns
+        with open(METADATA_PATH, "r") as f:
+            ponteiro = json.load(f)
+        carregadas = {m.diretorio: m for m in anterior.versoes() if m.diretorio} if anterior else {}
+
+        canario, sombra = ponteiro.pop("canario", None), ponteiro.pop("sombra", None)
+        self.primaria = self._obter(ponteiro, carregadas)
+        self.canario = self._obter(metadata_versao(canario["diretorio"], MODELS_DIR), carregadas) if canario else None
+        self.fracao_canario = float(canario["fracao"]) if canario else 0.0
+        self.sombra = self._obter(metadata_versao(sombra["diretorio"], MODELS_DIR), carregadas) if sombra else None
+        self.carga_ms = (time.perf_counter() - inicio) * 1000
+
+    def _obter(self, metadata, carregadas):
+        diretorio = metadata.get("diretorio")
+        if diretorio in carregadas:
+            return carregadas[diretorio]
+        return ModeloProducao(metadata, estimador=self.estimador)
+
+    def versoes(self):
+        return [m for m in (self.primaria, self.canario, self.sombra) if m is not None]
+
+    def resumo(self):
+        return {
+            "primaria": self.primaria.versao,
+            "canario": {"versao": self.canario.versao, "fracao": self.fracao_canario} if self.canario else None,
+            "sombra": self.sombra.versao if self.sombra else None
+        }
+
+
 print("🚀 API DE DETECÇÃO DE FRAUDES")
 print("=" * 60)
 print("\n✅ Carregando modelo de produção...")
 
-with open(MODEL_PATH, "rb") as f:
-    modelo = pickle.load(f)
+implantacao = Implantacao(estimador=not INICIO_RAPIDO)
+ativo = implantacao.primaria
+recarga = {"total": 0, "carga_inicial_ms": implantacao.carga_ms, "ultima_ms": None, "ultima_em": None, "erro": None}
+mtime_falha = None
+# Tempos da partida (ms desde o início do módulo); `pronto` libera /health/ready
+partida = {
+    "pronto": False,
+    "modo": "rapido" if INICIO_RAPIDO else "completo",
+    "importacao_ms": round(IMPORTACAO_MS, 1),
+    "carga_ms": round(implantacao.carga_ms, 1),
+    "aquecimento_ms": None,
+    "pronto_ms": None,
+    "estimador_ms": None
+}
+
+# Criado antes do fork (servir.py): com VELOCIDADE_DIR, os workers compartilham os mesmos arrays
+velocidade = ContadorVelocidade(
+    capacidade=VELOCIDADE_CAPACIDADE,
+    balde_s=VELOCIDADE_BALDE_S,
+    janelas_s=VELOCIDADE_JANELAS_S,
+    diretorio=VELOCIDADE_DIR or None
+)
+JANELA_24H = VELOCIDADE_JANELAS_S.index(86400)
+
+print(f"   Versão: {ativo.metadata['versao']}")
+print(f"   F1 Score: {ativo.metadata['f1_score']:.3f}")
+print(f"   Deploy: {ativo.metadata['data_deploy']}")
+print(f"\n✅ Modelo carregado com sucesso! ({implantacao.carga_ms:.0f} ms; importações {IMPORTACAO_MS:.0f} ms)")
+
+calibracao = ativo.metadata.get("calibracao")
+print(f"   Limiar de fraude: {ativo.limiar:.3f} (calibração {calibracao['metodo'] if calibracao else 'nenhuma'})")
+print(f"   Micro-lote: até {MICROLOTE_MAX_ITENS} itens / {MICROLOTE_MAX_ESPERA_MS:g} ms")
+if CACHE_CAPACIDADE > 0:
+    print(f"   Cache de resultados: {CACHE_CAPACIDADE} linhas, validade {CACHE_TTL_S:g} s")
+if ativo.artefato is not None:
+    if ativo.estimador_pendente:
+        uso = "pickle em segundo plano, depois de pronta"
+    else:
+        uso = "somente artefato" if ativo.modelo is None else f"lotes até {MOTOR_ARVORES_MAX_LOTE}"
+    print(f"   Artefato mapeado: {ativo.metadata['artefato']} ({uso})")
+if DRIFT_INTERVALO_S > 0:
+    referencia = ativo.metadata["perfil"] if ativo.referencia is not None else "sem perfil de treino"
+    print(f"   Monitor de drift: {referencia} (janela de {DRIFT_JANELA_S:g} s)")
+print(f"   Velocidade: {velocidade.capacidade} clientes, janelas {VELOCIDADE_JANELAS_S} s "
+      f"({'restaurada de ' + VELOCIDADE_DIR if velocidade.restaurado else VELOCIDADE_DIR or 'só em memória'})")
+if implantacao.canario is not None:
+    print(f"   🐤 Canário: {implantacao.canario.versao} ({implantacao.fracao_canario * 100:g}% do tráfego)")
+if implantacao.sombra is not None:
+    print(f"   👥 Sombra: {implantacao.sombra.versao}")
+
+
+async def vigiar_metadata():
+    """Recarrega as versões quando o metadata.json muda (promoção ou troca de ponteiro)"""
+    global implantacao, ativo, mtime_falha
+    while True:
+        await asyncio.sleep(RECARGA_INTERVALO_S)
+        try:
+            mtime = METADATA_PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if mtime in (implantacao.mtime, mtime_falha):
+            continue
+
+        anterior = implantacao.resumo()
+        try:
+            nova = await asyncio.to_thread(Implantacao, implantacao)
+            await asyncio.to_thread(aquecer, nova)
+        except Exception as e:
+            recarga["erro"] = str(e)
+            mtime_falha = mtime
+            print(f"⚠️  Falha ao recarregar modelo: {e}")
+            continue
+
+        implantacao, ativo = nova, nova.primaria
+        if cache is not None:
+            # Versões que saíram da implantação; as reaproveitadas mantêm suas entradas
+            cache.invalidar(m.geracao for m in nova.versoes())
+        recarga.update(
+            total=recarga["total"] + 1,
+            ultima_ms=nova.carga_ms,
+            ultima_em=datetime.now().isoformat(timespec="seconds"),
+            erro=None
+        )
+        print(f"🔄 Implantação recarregada: {anterior} → {nova.resumo()} ({nova.carga_ms:.0f} ms)")
+
+
+def transacoes_aquecimento(n):
+    """Transações sintéticas válidas, passando por todas as categorias e horas"""
+    categorias = list(CATEGORIAS)
+    return [
+        TransacaoInput.model_validate({
+            "valor": 10.0 * (i + 1),
+            "hora": i % 24,
+            "categoria": categorias[i % len(categorias)],
+            "qtd_transacoes_24h": i % 10
+        })
+        for i in range(n)
+    ]
+
+
+def aquecer(imp):
+    """Passa lotes sintéticos pela inferência de cada versão, fora das métricas e do registro.
 
-with open(METADATA_PATH, "r") as f:
-    metadata = json.load(f)
+    Os tamanhos cobrem a requisição unitária, o micro-lote cheio e um lote
+    acima de MOTOR_ARVORES_MAX_LOTE, que usa o estimador original quando
+    ele está carregado. Devolve a duração em ms.
+    """
+    inicio = time.perf_counter()
+    transacoes = transacoes_aquecimento(max(MICROLOTE_MAX_ITENS, MOTOR_ARVORES_MAX_LOTE + 1))
+    for modelo in imp.versoes():
+        for n in sorted({1, MICROLOTE_MAX_ITENS, MOTOR_ARVORES_MAX_LOTE + 1}):
+            probabilidades = modelo.predict_proba(modelo.codificador.codificar(transacoes[:n]))[:, 1]
+        PredicaoOutput(transaction_id="aquecimento", fraude=bool(probabilidades[0] >= modelo.limiar),
+                       probabilidade=float(probabilidades[0]), modelo=modelo.info()).model_dump_json()
+    return (time.perf_counter() - inicio) * 1000
 
-print(f"   Versão: {metadata['versao']}")
-print(f"   F1 Score: {metadata['f1_score']:.3f}")
-print(f"   Deploy: {metadata['data_deploy']}")
-print(f"\n✅ Modelo carregado com sucesso!")
+
+async def preparar():
+    """Aquece a implantação e marca a API como pronta; depois carrega os estimadores adiados"""
+    partida["aquecimento_ms"] = round(await asyncio.to_thread(aquecer, implantacao), 1)
+    partida["pronto_ms"] = round((time.perf_counter() - INICIO) * 1000, 1)
+    partida["pronto"] = True
+    print(f"✅ Pronta em {partida['pronto_ms']:.0f} ms (importações {partida['importacao_ms']:.0f} ms, "
+          f"carga {partida['carga_ms']:.0f} ms, aquecimento {partida['aquecimento_ms']:.0f} ms)")
+
+    pendentes = [m for m in implantacao.versoes() if m.estimador_pendente]
+    if pendentes:
+        inicio = time.perf_counter()
+        for modelo in pendentes:
+            await asyncio.to_thread(modelo.carregar_estimador)
+        await asyncio.to_thread(aquecer, implantacao)
+        partida["estimador_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        print(f"✅ Estimador carregado em segundo plano ({partida['estimador_ms']:.0f} ms)")
+
+
+async def sincronizar_velocidade():
+    """Grava periodicamente no disco o estado do contador de velocidade"""
+    while True:
+        await asyncio.sleep(VELOCIDADE_SINCRONIZAR_S)
+        await asyncio.to_thread(velocidade.sincronizar)
+
+
+def completar_velocidade(transacoes):
+    """Conta um evento por transação com `cliente_id` e preenche `qtd_transacoes_24h` quando omitida.
+
+    Bloqueia (lock e, com VELOCIDADE_DIR, flock entre workers): chamar fora do event loop.
+    Retentativa com o mesmo `transaction_id` não conta de novo.
+    """
+    com_cliente = [t for t in transacoes if t.cliente_id is not None]
+    if not com_cliente:
+        return
+    contagens = velocidade.registrar_lote([t.cliente_id for t in com_cliente],
+                                          ids=[t.transaction_id for t in com_cliente])[:, JANELA_24H].tolist()
+    for t, contagem in zip(com_cliente, contagens):
+        if t.qtd_transacoes_24h is None:
+            t.qtd_transacoes_24h = contagem
+
+
+def memoria_processo():
+    """Memória do worker em MB; PSS divide as páginas compartilhadas entre os processos"""
+    campos = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "compartilhada_mb", "Private_Clean": "privada_mb",
+              "Shared_Dirty": "compartilhada_mb", "Private_Dirty": "privada_mb"}
+    memoria = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for linha in f:
+                nome, _, resto = linha.partition(":")
+                if nome in campos:
+                    chave = campos[nome]
+                    memoria[chave] = memoria.get(chave, 0.0) + int(resto.split()[0]) / 1024
+    except OSError:
+        import resource
+        memoria["rss_max_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {k: round(v, 1) for k, v in memoria.items()}
 
 
 # Schemas
 class TransacaoInput(BaseModel):
+    transaction_id: Optional[str] = Field(None, max_length=64, description="ID para juntar o rótulo depois (gerado se omitido)")
     valor: float = Field(..., gt=0, description="Valor da transação em R$")
     hora: int = Field(..., ge=0, le=23, description="Hora da transação (0-23)")
-    categoria: Literal[
-        "alimentacao", "farmacia", "transporte", "vestuario", "restaurante",
-        "lazer", "eletronicos", "livros", "assinatura", "supermercado",
-        "joias", "viagem", "pix", "transferencia"
-    ]
-    qtd_transacoes_24h: int = Field(..., ge=0, description="Transações nas últimas 24h")
+    categoria: Literal[tuple(CATEGORIAS)]
+    cliente_id: Optional[str] = Field(None, max_length=64, description="Cliente, para o contador de velocidade da API")
+    qtd_transacoes_24h: Optional[int] = Field(
+        None, ge=0, description="Transações nas últimas 24h (se omitida, a API conta pelo cliente_id)"
+    )
+
+    @model_validator(mode="after")
+    def exigir_velocidade(self):
+        if self.qtd_transacoes_24h is None and self.cliente_id is None:
+            raise ValueError("Informe qtd_transacoes_24h ou cliente_id")
+        return self
 
 
 class PredicaoOutput(BaseModel):
+    transaction_id: str
     fraude: bool
     probabilidade: float
     modelo: dict
 
 
+class ItemLoteOutput(BaseModel):
+    indice: int
+    transaction_id: Optional[str] = None
+    versao: Optional[str] = None
+    fraude: Optional[bool] = None
+    probabilidade: Optional[float] = None
+    erros: Optional[list] = None
+
+
+class PredicaoLoteOutput(BaseModel):
+    resultados: list[ItemLoteOutput]
+    n_validos: int
+    n_invalidos: int
+    limiar: float
+    modelo: dict
+
+
+# Inferência
+servidas = {}
+cache = CacheResultados(CACHE_CAPACIDADE, CACHE_TTL_S) if CACHE_CAPACIDADE > 0 else None
+sorteio = np.random.default_rng()
+
+
+ESTAGIO_FILA = (("estagio", "fila"),)
+ESTAGIO_MICROLOTE = (("estagio", "microlote"),)
+ESTAGIO_LEITURA = (("estagio", "leitura"),)
+ESTAGIO_VALIDACAO = (("estagio", "validacao"),)
+ESTAGIO_VALIDACAO_UNITARIA = (("estagio", "validacao_unitaria"),)
+ESTAGIO_RESPOSTA = (("estagio", "resposta"),)
+
+
+def servir(modelo, matriz):
+    """Uma chamada a predict_proba (só nas linhas fora do cache); a decisão vem do limiar da versão"""
+    inicio = time.perf_counter()
+    if cache is not None:
+        probabilidades = cache.obter(modelo.geracao, matriz, lambda X: modelo.predict_proba(X)[:, 1])
+    else:
+        probabilidades = modelo.predict_proba(matriz)[:, 1]
+    fraudes = probabilidades >= modelo.limiar
+    segundos = time.perf_counter() - inicio
+
+    n_fraudes = int(fraudes.sum())
+    estatisticas = servidas.get(modelo.identificador)
+    if estatisticas is None:
+        estatisticas = servidas[modelo.identificador] = EstatisticasVersao(modelo.versao)
+    estatisticas.registrar(len(matriz), n_fraudes, segundos * 1000)
+    versao = ("versao", modelo.identificador)
+    telemetria.observar("estagio_segundos", segundos, (("estagio", "modelo"), versao))
+    telemetria.incrementar("decisoes_total", n_fraudes, (versao, ("fraude", "true")))
+    telemetria.incrementar("decisoes_total", len(matriz) - n_fraudes, (versao, ("fraude", "false")))
+    return fraudes, probabilidades
+
+
+def pontuar(transacoes):
+    """Pontua o lote e devolve (fraudes, probabilidades, versão que respondeu cada item).
+
+    Usa uma única implantação do início ao fim, mesmo se houver recarga no
+    meio. Com canário, cada item vai para ele com probabilidade
+    `fracao_canario`; a sombra só recebe uma cópia do lote.
+    """
+    imp = implantacao
+    primaria = imp.primaria
+    inicio = time.perf_counter()
+    matriz = primaria.codificador.codificar(transacoes)
+    telemetria.observar("estagio_segundos", time.perf_counter() - inicio,
+                        (("estagio", "codificacao"), ("versao", primaria.identificador)))
+
+    if imp.canario is None:
+        fraudes, probabilidades = servir(primaria, matriz)
+        modelos = [primaria] * len(transacoes)
+        monitor.registrar(primaria, matriz, probabilidades)
+    else:
+        no_canario = sorteio.random(len(transacoes)) < imp.fracao_canario
+        fraudes = np.zeros(len(transacoes), dtype=bool)
+        probabilidades = np.zeros(len(transacoes))
+        modelos = [primaria] * len(transacoes)
+
+        indices = np.flatnonzero(no_canario)
+        if len(indices):
+            canario = imp.canario
+            X = canario.codificador.codificar([transacoes[i] for i in indices])
+            fraudes[indices], probabilidades[indices] = servir(canario, X)
+            for i in indices.tolist():
+                modelos[i] = canario
+
+        indices = np.flatnonzero(~no_canario)
+        if len(indices):
+            X = matriz[indices]
+            fraudes[indices], probabilidades[indices] = servir(primaria, X)
+            monitor.registrar(primaria, X, probabilidades[indices])
+
+    if imp.sombra is not None:
+        avaliador_sombra.registrar(imp.sombra, primaria.codificador, transacoes, matriz, probabilidades, fraudes)
+    return fraudes, probabilidades, modelos
+
+
+def pontuar_microlote(transacoes):
+    """Função de lote do agrupador (roda em thread): devolve (fraude, probabilidade, modelo) por transação"""
+    completar_velocidade(transacoes)
+    fraudes, probabilidades, modelos = pontuar(transacoes)
+    return list(zip(fraudes.tolist(), probabilidades.tolist(), modelos))
+
+
+agrupador = AgrupadorRequisicoes(
+    pontuar_microlote,
+    max_itens=MICROLOTE_MAX_ITENS,
+    max_espera_ms=MICROLOTE_MAX_ESPERA_MS,
+    observar_espera=lambda espera: telemetria.observar("estagio_segundos", espera, ESTAGIO_FILA)
+)
+
+registro = RegistroPredicoes(
+    REGISTRO_DIR,
+    intervalo_s=REGISTRO_INTERVALO_S or 1.0,
+    max_bytes=int(REGISTRO_MAX_MB * (1 << 20))
+)
+
+avaliador_sombra = AvaliadorSombra(intervalo_s=SOMBRA_INTERVALO_S or 1.0, capacidade=SOMBRA_CAPACIDADE)
+
+monitor = MonitorDrift(
+    lambda: ativo,
+    intervalo_s=DRIFT_INTERVALO_S or 1.0,
+    janela_s=DRIFT_JANELA_S,
+    capacidade=DRIFT_CAPACIDADE
+)
+
+amostrador = AmostradorPerfil()
+
+telemetria.descrever("requisicao_segundos", "histogram", "Latência total por rota (s)")
+telemetria.descrever("requisicoes_total", "counter", "Requisições por rota e status")
+telemetria.descrever("erros_total", "counter", "Respostas 5xx inesperadas por rota (sem o 503 do readiness)")
+telemetria.descrever("estagio_segundos", "histogram",
+                     "Latência por estágio: leitura, validacao, fila, microlote, codificacao, modelo (por versão), resposta (s)")
+telemetria.descrever("decisoes_total", "counter", "Transações pontuadas por versão (diretório no registro) e decisão")
+telemetria.medir("microlote_na_fila", lambda: agrupador.estatisticas()["na_fila"], "Itens aguardando micro-lote")
+telemetria.medir("registro_na_fila", lambda: registro.estatisticas()["na_fila"], "Lotes aguardando gravação no registro")
+telemetria.medir("registro_erros_total", lambda: registro.erros_gravacao,
+                 "Gravações do registro de predições que falharam (ex.: disco cheio)", "counter")
+telemetria.medir("registro_perdidos_total", lambda: registro.registros_perdidos,
+                 "Predições descartadas por falha na gravação do registro", "counter")
+telemetria.medir("sombra_na_fila", lambda: avaliador_sombra.estatisticas()["na_fila"], "Lotes aguardando a versão sombra")
+telemetria.medir("sombra_erros_total", lambda: avaliador_sombra.erros,
+                 "Lotes que a versão sombra não conseguiu pontuar", "counter")
+telemetria.medir("recargas", lambda: recarga["total"], "Recargas de implantação desde o início")
+if cache is not None:
+    telemetria.medir("cache_acertos_total", lambda: cache.acertos, "Linhas respondidas pelo cache de resultados", "counter")
+    telemetria.medir("cache_faltas_total", lambda: cache.faltas, "Linhas que foram ao modelo", "counter")
+    telemetria.medir("cache_expulsoes_total", lambda: cache.expulsoes, "Entradas descartadas pelo LRU", "counter")
+    telemetria.medir("cache_itens", lambda: len(cache), "Entradas no cache de resultados")
+telemetria.medir("velocidade_eventos_total", lambda: velocidade.eventos,
+                 "Eventos contados pelo contador de velocidade neste worker", "counter")
+telemetria.medir("velocidade_expulsoes_total", lambda: velocidade.expulsoes,
+                 "Clientes ativos expulsos por falta de espaço na tabela", "counter")
+telemetria.medir("velocidade_retentativas_total", lambda: velocidade.repetidos,
+                 "Transações com transaction_id já contado (não somam de novo)", "counter")
+telemetria.medir("pronta", lambda: int(partida["pronto"]), "1 depois do aquecimento da partida")
+telemetria.medir("partida_pronta_segundos", lambda: (partida["pronto_ms"] or 0) / 1000,
+                 "Do início do módulo até a API ficar pronta (s)")
+
+
+async def ler_itens_lote(request: Request):
+    """Lê o corpo do lote: lista JSON, NDJSON ou formato colunar"""
+    corpo = await request.body()
+    tipo = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in tipo or "jsonlines" in tipo:
+            return [json.loads(linha) for linha in corpo.splitlines() if linha.strip()]
+
+        dados = json.loads(corpo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {e}")
+
+    if isinstance(dados, list):
+        return dados
+
+    if isinstance(dados, dict) and "transacoes" in dados:
+        if not isinstance(dados["transacoes"], list):
+            raise HTTPException(status_code=400, detail="'transacoes' deve ser uma lista")
+        return dados["transacoes"]
+
+    # Colunar: {"valor": [...], "hora": [...], "categoria": [...], ...}
+    if isinstance(dados, dict) and dados and all(isinstance(v, list) for v in dados.values()):
+        tamanhos = {len(v) for v in dados.values()}
+        if len(tamanhos) != 1:
+            raise HTTPException(status_code=400, detail="Colunas com tamanhos diferentes")
+        colunas = list(dados.keys())
+        return [dict(zip(colunas, linha)) for linha in zip(*dados.values())]
+
+    raise HTTPException(
+        status_code=400,
+        detail="Esperado lista de transações, NDJSON ou objeto colunar"
+    )
+
+
 # Endpoints
 @app.get("/")
 def root():
     return {
         "servico": "API de Detecção de Fraudes",
-        "versao": metadata["versao"],
+        "versao": ativo.versao,
         "status": "online",
         "docs": "/docs"
     }
@@ -78,52 +692,205 @@ def root():
 @app.get("/health")
 def health():
     return {
-        "status": "healthy",
-        "modelo": metadata
+        "status": "healthy" if partida["pronto"] else "warming_up",
+        "pid": os.getpid(),
+        "partida": partida,
+        "modelo": ativo.metadata,
+        "implantacao": implantacao.resumo(),
+        "artefato": ativo.descricao_artefato(),
+        "memoria": memoria_processo(),
+        "recarga": recarga,
+        "agrupador": agrupador.estatisticas(),
+        "drift": monitor.relatorio()["status"],
+        "registro": registro.estatisticas(),
+        "cache": cache.estatisticas() if cache is not None else None,
+        "velocidade": velocidade.estatisticas()
+    }
+
+
+@app.get("/health/live")
+def health_live():
+    """Liveness: o processo responde (não depende do modelo estar aquecido)"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: 200 só depois do lote de aquecimento; 503 enquanto isso"""
+    return JSONResponse(partida, status_code=200 if partida["pronto"] else 503)
+
+
+@app.get("/velocidade/{cliente_id}")
+def consultar_velocidade(cliente_id: str):
+    """Transações do cliente em cada janela, pelo contador da API (sem registrar evento)"""
+    contagens = velocidade.consultar(cliente_id)
+    return {"cliente_id": cliente_id, "janelas_s": {str(j): n for j, n in contagens.items()}}
+
+
+@app.get("/drift")
+def drift():
+    """PSI/KS do tráfego recente (janela deslizante) contra o perfil de treino do modelo ativo"""
+    return monitor.relatorio()
+
+
+@app.get("/versoes")
+def versoes():
+    """Versões implantadas, contadores por versão servida e comparação da sombra"""
+    imp = implantacao
+
+    def descrever(modelo):
+        if modelo is None:
+            return None
+        return {**modelo.info(), "diretorio": modelo.diretorio, "limiar": modelo.limiar}
+
+    canario = descrever(imp.canario)
+    if canario is not None:
+        canario["fracao"] = imp.fracao_canario
+    return {
+        "primaria": descrever(imp.primaria),
+        "canario": canario,
+        "sombra": descrever(imp.sombra),
+        "servidas": {v: e.para_dict() for v, e in servidas.items()},
+        "avaliador_sombra": avaliador_sombra.estatisticas()
     }
 
 
-@app.post("/predict", response_model=PredicaoOutput)
-def predict(transacao: TransacaoInput):
-    """Analisa uma transação e retorna se é fraude"""
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métricas do worker no formato texto do Prometheus"""
+    return PlainTextResponse(telemetria.exportar(), media_type="text/plain; version=0.0.4")
+
+
+def exigir_profiler():
+    if not PROFILER_HABILITADO:
+        raise HTTPException(status_code=404, detail="Profiler desabilitado (PROFILER_HABILITADO=1)")
+
+
+@app.post("/profiler")
+def iniciar_profiler(duracao_s: float = 30.0, intervalo_ms: float = 5.0):
+    """Começa a amostrar as pilhas de todas as threads por `duracao_s` segundos"""
+    exigir_profiler()
+    if not amostrador.iniciar(duracao_s=min(duracao_s, 600.0), intervalo_s=max(intervalo_ms, 1.0) / 1000):
+        raise HTTPException(status_code=409, detail="Profiler já em andamento")
+    return amostrador.estado()
+
+
+@app.delete("/profiler")
+def parar_profiler():
+    exigir_profiler()
+    amostrador.parar()
+    return amostrador.estado()
+
+
+@app.get("/profiler")
+def profiler(formato: Literal["estado", "folded"] = "estado"):
+    """Estado do perfil, ou as pilhas em formato folded (flamegraph.pl, speedscope)"""
+    exigir_profiler()
+    if formato == "folded":
+        return PlainTextResponse(amostrador.folded())
+    return amostrador.estado()
+
+
+@app.post("/predict", response_model=PredicaoOutput, openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": TransacaoInput.model_json_schema()}}}
+})
+async def predict(request: Request):
+    """Analisa uma transação e retorna se é fraude.
+
+    Chamadas concorrentes são agrupadas em micro-lotes antes do modelo.
+    O corpo é validado aqui (não pela assinatura) para medir o estágio.
+    """
+    inicio = time.perf_counter()
     try:
-        # Mapear categoria para código
-        categoria_map = {
-            "alimentacao": 1, "farmacia": 2, "transporte": 3,
-            "vestuario": 4, "restaurante": 5, "lazer": 6,
-            "eletronicos": 7, "livros": 8, "assinatura": 9,
-            "supermercado": 10, "joias": 11, "viagem": 12,
-            "pix": 13, "transferencia": 14
-        }
-        
-        # Preparar dados
-        dados = pd.DataFrame([{
-            "valor": transacao.valor,
-            "hora": transacao.hora,
-            "categoria_cod": categoria_map[transacao.categoria],
-            "qtd_transacoes_24h": transacao.qtd_transacoes_24h
-        }])
-        
-        # Predição
-        predicao = modelo.predict(dados)[0]
-        probabilidade = modelo.predict_proba(dados)[0]
-        
+        transacao = TransacaoInput.model_validate_json(await request.body())
+    except ValidationError as e:
+        telemetria.observar("estagio_segundos", time.perf_counter() - inicio, ESTAGIO_VALIDACAO_UNITARIA)
+        # Mesmo formato do 422 que o FastAPI dá para o corpo
+        raise RequestValidationError([{**erro, "loc": ("body", *erro["loc"])} for erro in e.errors(include_url=False)])
+    validada = time.perf_counter()
+    telemetria.observar("estagio_segundos", validada - inicio, ESTAGIO_VALIDACAO_UNITARIA)
+    try:
+        fraude, probabilidade, modelo = await agrupador.submeter(transacao)
+        telemetria.observar("estagio_segundos", time.perf_counter() - validada, ESTAGIO_MICROLOTE)
+        transaction_id = transacao.transaction_id or uuid.uuid4().hex
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        registro.registrar(modelo.versao, latencia_ms, (transacao,), (transaction_id,), (probabilidade,), (fraude,))
+
         return PredicaoOutput(
-            fraude=bool(predicao == 1),
-            probabilidade=float(probabilidade[1]),
-            modelo={
-                "versao": metadata["versao"],
-                "f1_score": metadata["f1_score"],
-                "deploy_date": metadata["data_deploy"]
-            }
+            transaction_id=transaction_id,
+            fraude=fraude,
+            probabilidade=probabilidade,
+            modelo=modelo.info()
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/predict/batch", response_model=PredicaoLoteOutput)
+async def predict_batch(request: Request):
+    """Analisa um lote de transações com uma única chamada ao modelo.
+
+    Aceita lista JSON, NDJSON (application/x-ndjson) ou objeto colunar.
+    Os resultados voltam na ordem do pedido; itens inválidos trazem `erros`.
+    """
+    inicio = time.perf_counter()
+    itens = await ler_itens_lote(request)
+    lidos = time.perf_counter()
+    telemetria.observar("estagio_segundos", lidos - inicio, ESTAGIO_LEITURA)
+    if len(itens) > MAX_ITENS_LOTE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(itens)} itens excede o limite de {MAX_ITENS_LOTE}"
+        )
+
+    # Validar item a item, guardando a posição original
+    resultados = [None] * len(itens)
+    validos = []
+    indices_validos = []
+    for i, item in enumerate(itens):
+        try:
+            validos.append(TransacaoInput.model_validate(item))
+            indices_validos.append(i)
+        except ValidationError as e:
+            resultados[i] = ItemLoteOutput(
+                indice=i,
+                erros=e.errors(include_url=False, include_context=False)
+            )
+    telemetria.observar("estagio_segundos", time.perf_counter() - lidos, ESTAGIO_VALIDACAO)
+
+    modelo = implantacao.primaria
+    try:
+        if validos:
+            # Velocidade e modelo fora do event loop, como no micro-lote do /predict
+            await asyncio.to_thread(completar_velocidade, validos)
+            fraudes, probabilidades, modelos = await asyncio.to_thread(pontuar, validos)
+            pontuados = time.perf_counter()
+            # Lote todo respondido por uma só versão (sem canário ou após recarga): é ela que aparece na resposta
+            if all(m is modelos[0] for m in modelos):
+                modelo = modelos[0]
+            ids = [t.transaction_id or uuid.uuid4().hex for t in validos]
+            versoes_itens = [m.versao for m in modelos]
+            for i, id_, versao, fraude, prob in zip(indices_validos, ids, versoes_itens, fraudes.tolist(), probabilidades.tolist()):
+                resultados[i] = ItemLoteOutput(indice=i, transaction_id=id_, versao=versao, fraude=fraude, probabilidade=prob)
+            fim = time.perf_counter()
+            telemetria.observar("estagio_segundos", fim - pontuados, ESTAGIO_RESPOSTA)
+            registro.registrar(versoes_itens, (fim - inicio) * 1000, validos, ids, probabilidades, fraudes)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return PredicaoLoteOutput(
+        resultados=resultados,
+        n_validos=len(validos),
+        n_invalidos=len(itens) - len(validos),
+        limiar=modelo.limiar,
+        modelo=modelo.info()
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     print("\nINFO:     Uvicorn running on http://localhost:8001")
-    print("INFO:     Docs: http://localhost:8001/docs\n")
+    print("INFO:     Docs: http://localhost:8001/docs")
+    print("INFO:     Um worker só; em produção use 'python servir.py --workers N'\n")
     uvicorn.run(app, host="0.0.0.0", port=8001)
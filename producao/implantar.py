@@ -0,0 +1,69 @@
+"""
+IMPLANTAÇÃO DE VERSÕES
+
+Mostra o registro de versões e troca o ponteiro da produção
+(metadata.json) de forma atômica. A API em execução recarrega sozinha.
+
+Uso:
+    python implantar.py                          # versões e implantação atual
+    python implantar.py primaria v2.0-1a2b3c4d   # troca a versão primária
+    python implantar.py canario v2.0-1a2b3c4d 0.1
+    python implantar.py canario off
+    python implantar.py sombra v2.0-1a2b3c4d
+    python implantar.py sombra off
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.versoes import PONTEIRO, implantar, ler_ponteiro, listar_versoes
+
+print("🚦 IMPLANTAÇÃO DE VERSÕES")
+print("=" * 60)
+
+if not PONTEIRO.exists():
+    print("❌ Erro: Nenhuma versão em produção. Execute '2_promover_modelo.py' primeiro.")
+    exit(1)
+
+ponteiro = ler_ponteiro()
+primaria = ponteiro.get("diretorio")
+canario = ponteiro.get("canario") or {}
+sombra = (ponteiro.get("sombra") or {}).get("diretorio")
+
+if len(sys.argv) > 1:
+    if primaria is None:
+        print("❌ Erro: o metadata.json é do layout antigo (sem registro de versões); promova o modelo de novo")
+        exit(1)
+
+    acao, alvo = sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None
+    if acao not in ("primaria", "canario", "sombra") or alvo is None:
+        print(__doc__)
+        exit(1)
+
+    desligar = alvo == "off"
+    if acao == "primaria":
+        primaria = alvo
+    elif acao == "canario":
+        canario = {} if desligar else {"diretorio": alvo, "fracao": float(sys.argv[3]) if len(sys.argv) > 3 else 0.1}
+    else:
+        sombra = None if desligar else alvo
+
+    try:
+        ponteiro = implantar(primaria, canario=canario.get("diretorio"), fracao_canario=canario.get("fracao", 0.0),
+                             sombra=sombra)
+    except FileNotFoundError:
+        print(f"❌ Erro: versão '{alvo}' não está no registro")
+        exit(1)
+    print(f"\n✅ Ponteiro atualizado ({acao}: {alvo})")
+
+print("\n📦 Versões registradas:\n")
+print(f"   {'Diretório':<20} {'F1':>6}  {'Deploy':<10}  Papel")
+print(f"   {'─' * 50}")
+papeis = {ponteiro.get("diretorio"): "primária"}
+if ponteiro.get("canario"):
+    papeis[ponteiro["canario"]["diretorio"]] = f"canário ({ponteiro['canario']['fracao'] * 100:g}%)"
+if ponteiro.get("sombra"):
+    papeis[ponteiro["sombra"]["diretorio"]] = "sombra"
+for metadata in listar_versoes():
+    print(f"   {metadata['diretorio']:<20} {metadata['f1_score']:>6.3f}  {metadata['data_deploy']:<10}  "
+          f"{papeis.get(metadata['diretorio'], '')}")
@@ -0,0 +1,115 @@
+"""
+PONTUAÇÃO EM LOTE
+
+Pontua todas as transações de um ou mais CSVs com a versão em produção
+(ou outra do registro) e grava probabilidade e decisão em Parquet, com a
+mesma regra da API: probabilidade calibrada >= limiar da versão. O modelo
+é carregado uma vez e compartilhado (fork) por um pool de processos; cada
+worker lê, pontua e grava a sua faixa do arquivo (comum/pontuacao.py).
+
+Interrompido (Ctrl+C ou queda), rodar o mesmo comando retoma das faixas
+que faltam.
+
+Uso (em producao/):
+    python pontuar_arquivos.py ../dados/novembro_2025.csv
+    python pontuar_arquivos.py ../dados/*.csv --saida pontuacoes/out-nov --workers 4
+    python pontuar_arquivos.py ../dados/novembro_2025.csv --versao v2.0-1a2b3c4d --recomecar
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+parser = argparse.ArgumentParser(description="Pontua arquivos de transações em paralelo e grava Parquet")
+parser.add_argument("arquivos", nargs="+", type=Path, help="CSVs no formato de dados/ (transaction_id e features)")
+parser.add_argument("--saida", type=Path, help="diretório de saída (padrão: pontuacoes/<arquivos>)")
+parser.add_argument("--versao", help="diretório da versão no registro (padrão: a primária do metadata.json)")
+parser.add_argument("--workers", type=int, default=len(os.sched_getaffinity(0)), help="padrão: um por CPU disponível")
+parser.add_argument("--threads", type=int, default=1, help="threads de BLAS/OpenMP por worker (padrão 1)")
+parser.add_argument("--bloco-mb", type=float, help="tamanho das faixas de cada arquivo (padrão: PONTUACAO_BLOCO_MB ou 8)")
+parser.add_argument("--recomecar", action="store_true", help="descarta as partes já gravadas na saída")
+args = parser.parse_args()
+
+# Antes de importar numpy/sklearn/XGBoost: os pools nativos leem na inicialização,
+# e um pool OpenMP já iniciado no processo principal não sobrevive ao fork
+for variavel in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ[variavel] = str(args.threads)
+
+import signal
+import time
+import warnings
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.pontuacao import BLOCO_MB, ModeloLote, pontuar_arquivos
+from comum.versoes import PONTEIRO, ler_ponteiro, metadata_versao
+
+# O modelo foi treinado com DataFrame e pontua a matriz NumPy do codificador
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+print("🧮 PONTUAÇÃO EM LOTE")
+print("=" * 60)
+
+faltando = [str(a) for a in args.arquivos if not a.is_file()]
+if faltando:
+    print(f"❌ Arquivo(s) não encontrado(s): {', '.join(faltando)}")
+    exit(1)
+
+if args.versao:
+    try:
+        metadata = metadata_versao(args.versao)
+    except FileNotFoundError:
+        print(f"❌ Versão não encontrada no registro: {args.versao}")
+        exit(1)
+elif PONTEIRO.exists():
+    metadata = ler_ponteiro()
+else:
+    print("❌ Erro: Modelo de produção não encontrado; execute '2_promover_modelo.py'")
+    exit(1)
+
+inicio = time.perf_counter()
+modelo = ModeloLote.da_versao(metadata)
+print(f"\n🤖 Versão {modelo.versao} ({modelo.diretorio or 'layout antigo'}) | {metadata['algoritmo']} | "
+      f"limiar {modelo.limiar:.3f} | carregada em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+saida = args.saida or Path("pontuacoes") / "+".join(a.stem for a in args.arquivos)
+marcos = set()
+
+
+def progresso(feitas, total):
+    # Uma linha a cada 10% das partes
+    marco = feitas * 10 // total
+    if marco not in marcos:
+        marcos.add(marco)
+        print(f"   {feitas}/{total} partes ({feitas * 100 // total}%)")
+
+
+def terminar(_sinal, _frame):
+    # SIGTERM segue o caminho do Ctrl+C: faixas em andamento terminam e o pool é encerrado
+    raise KeyboardInterrupt
+
+
+signal.signal(signal.SIGTERM, terminar)
+print(f"📂 Saída: {saida}\n")
+try:
+    resumo = pontuar_arquivos(args.arquivos, saida, modelo, workers=args.workers, threads=args.threads,
+                              bloco_mb=args.bloco_mb or BLOCO_MB, recomecar=args.recomecar, progresso=progresso)
+except ValueError as e:
+    print(f"❌ {e}")
+    exit(1)
+except KeyboardInterrupt:
+    print(f"\n⏸️  Interrompido: as partes gravadas ficam em {saida}; rode o mesmo comando para retomar")
+    exit(130)
+
+if resumo["partes_prontas"]:
+    print(f"   ♻️  {resumo['partes_prontas']} parte(s) já prontas de uma execução anterior")
+if not resumo["partes"]:
+    print("✅ Nada a fazer: todas as partes já estão gravadas")
+    exit(0)
+
+eficiencia = resumo["segundos_worker"] / (resumo["segundos"] * resumo["workers"])
+print(f"\n✅ {resumo['linhas']} transações pontuadas em {resumo['segundos']:.2f}s "
+      f"({resumo['partes']} partes, {resumo['workers']} workers)")
+print(f"   Vazão: {resumo['linhas_s']:,.0f} linhas/s ({resumo['linhas_s'] / resumo['workers']:,.0f} por worker, "
+      f"workers ocupados {eficiencia * 100:.0f}% do tempo)")
+print(f"   Fraudes: {resumo['fraudes']} ({resumo['fraudes'] / max(resumo['linhas'], 1) * 100:.1f}%)")
+print(f"\n👉 Leia com: pd.read_parquet('{saida}')")
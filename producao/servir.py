@@ -0,0 +1,162 @@
+"""
+SERVIDOR DE PRODUÇÃO (VÁRIOS WORKERS)
+
+Carrega a API e o modelo uma vez no processo pai e cria N workers com
+fork. Os workers herdam as páginas do modelo por copy-on-write: antes do
+fork, o pai aquece a inferência e congela o heap (gc.freeze), para que a
+coleta de lixo dos filhos não reescreva os cabeçalhos dos objetos
+herdados. O artefato em arrays já é mapeado em memória e fica no page
+cache, compartilhado por todos. O soquete é aberto no pai, e o kernel
+distribui as conexões entre os workers.
+
+O pai só supervisiona: reinicia um worker que morre e repassa SIGTERM/SIGINT
+para um desligamento gracioso. Cada worker recarrega o modelo sozinho quando
+o metadata.json muda.
+
+Uso (em producao/):
+    python servir.py                                # um worker por CPU
+    python servir.py --workers 4 --afinidade auto   # cada worker fixo em uma CPU
+    python servir.py --workers 2 --afinidade 0-1,4-5 --threads 2
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="API de produção com vários workers (fork + copy-on-write)")
+parser.add_argument("--workers", type=int, default=len(os.sched_getaffinity(0)), help="padrão: uma por CPU disponível")
+parser.add_argument("--host", default="0.0.0.0")
+parser.add_argument("--port", type=int, default=8001)
+parser.add_argument("--afinidade", default="off",
+                    help="off, auto (uma CPU por worker, em rodízio) ou lista de CPUs, ex.: 0-3,8")
+parser.add_argument("--threads", type=int, default=1,
+                    help="threads de BLAS/OpenMP por worker (OMP_NUM_THREADS e afins; padrão 1)")
+parser.add_argument("--backlog", type=int, default=2048)
+args = parser.parse_args()
+
+# Precisa valer antes de importar numpy/sklearn/XGBoost: os pools nativos leem na inicialização
+for variavel in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ[variavel] = str(args.threads)
+
+import gc
+import importlib.util
+from pathlib import Path
+
+import uvicorn
+
+
+def cpus_afinidade(especificacao):
+    """Lista de CPUs para o rodízio dos workers, ou None (sem afinidade)"""
+    if especificacao == "off":
+        return None
+    if especificacao == "auto":
+        return sorted(os.sched_getaffinity(0))
+    cpus = []
+    for parte in especificacao.split(","):
+        inicio, _, fim = parte.partition("-")
+        cpus.extend(range(int(inicio), int(fim or inicio) + 1))
+    return cpus
+
+
+def carregar_api():
+    """Importa 3_iniciar_api.py: lê o ponteiro e carrega as versões implantadas"""
+    spec = importlib.util.spec_from_file_location("api_producao", Path(__file__).resolve().parent / "3_iniciar_api.py")
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def iniciar_worker(indice, soquete, config, cpus):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Filho: sinais de volta ao padrão (o uvicorn instala os seus) e coleta de lixo ligada
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    codigo = 0
+    try:
+        if cpus:
+            os.sched_setaffinity(0, {cpus[indice % len(cpus)]})
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(args.threads)
+        except ImportError:
+            pass
+        uvicorn.Server(config).run(sockets=[soquete])
+    except BaseException as e:
+        print(f"❌ Worker {indice} (pid {os.getpid()}): {e!r}")
+        codigo = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(codigo)
+
+
+def main():
+    print("🏭 SERVIDOR DE PRODUÇÃO")
+    print("=" * 60)
+    cpus = cpus_afinidade(args.afinidade)
+    inicio = time.perf_counter()
+
+    # Sem coleta automática enquanto o heap a ser compartilhado é montado
+    gc.disable()
+    # O estimador precisa estar no heap do pai para ser herdado (e não carregado por worker)
+    os.environ["INICIO_RAPIDO"] = "0"
+    api = carregar_api()
+    aquecimento_ms = api.aquecer(api.implantacao)
+
+    config = uvicorn.Config(api.app, host=args.host, port=args.port, backlog=args.backlog,
+                            access_log=False, timeout_graceful_shutdown=10)
+    soquete = config.bind_socket()
+
+    # Tudo o que existe agora vai para a geração permanente: os filhos não o varrem
+    gc.collect()
+    gc.freeze()
+    print(f"\n✅ Pai pronto em {(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"(aquecimento {aquecimento_ms:.0f} ms, {gc.get_freeze_count()} objetos congelados)")
+    print(f"   Workers: {args.workers} | threads nativas por worker: {args.threads} | "
+          f"afinidade: {'desligada' if cpus is None else ','.join(map(str, cpus))}")
+    print(f"\nINFO:     Uvicorn running on http://{args.host}:{args.port} ({args.workers} workers)\n")
+    sys.stdout.flush()
+
+    workers = {}
+    parando = False
+
+    def parar(sinal, _frame):
+        nonlocal parando
+        parando = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+
+    for indice in range(args.workers):
+        workers[iniciar_worker(indice, soquete, config, cpus)] = (indice, time.monotonic())
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        indice, criado_em = workers.pop(pid, (None, None))
+        if indice is None or parando:
+            continue
+        print(f"⚠️  Worker {indice} (pid {pid}) saiu com código {os.waitstatus_to_exitcode(status)}; reiniciando")
+        # Evita laço de reinícios quando o worker morre logo na partida
+        if time.monotonic() - criado_em < 1.0:
+            time.sleep(1.0)
+        workers[iniciar_worker(indice, soquete, config, cpus)] = (indice, time.monotonic())
+
+    soquete.close()
+    print("👋 Servidor encerrado")
+
+
+if __name__ == "__main__":
+    main()
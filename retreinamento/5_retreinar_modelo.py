@@ -4,28 +4,35 @@
 Combina dados de Outubro + Novembro e retreina.
 """
 import mlflow
+import sys
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import f1_score, precision_score, recall_score
+from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
-# Tentar importar XGBoost
-try:
-    from xgboost import XGBClassifier
-    HAS_XGBOOST = True
-except ImportError:
-    HAS_XGBOOST = False
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.dados import carregar_periodo, dividir_holdout, iterar_periodo
+from comum.metricas import avaliar_em_blocos
+from comum.experimentos import grade_padrao, rodar_experimentos
+from comum.busca import busca_sucessiva
+from comum.incremental import comparar_incremental
+from comum.versoes import carregar_modelo_ativo
+
+# --busca: successive halving em vez da grade fixa
+MODO_BUSCA = "--busca" in sys.argv
+# --incremental: parte do modelo de produção e treina só com Novembro
+MODO_INCREMENTAL = "--incremental" in sys.argv
+# Incremental e refit são avaliados em 30% de Novembro, não por validação cruzada:
+# ficam em outro experimento para o placar não ordená-los junto com a média dos folds
+EXPERIMENTO = "deteccao-fraude-retreino-nov-2025" + ("-incremental" if MODO_INCREMENTAL else "")
 
 print("🔄 RETREINAMENTO DO MODELO")
 print("=" * 60)
 
 # Carregar e combinar dados
 print("\n📊 Combinando dados...")
-df_out = pd.read_csv("../dados/outubro_2025.csv")
-df_nov = pd.read_csv("../dados/novembro_2025.csv")
+df_out = carregar_periodo("2025-10")
+df_nov = carregar_periodo("2025-11")
 
 print(f"   Outubro 2025:  {len(df_out)} transações ({df_out['is_fraud'].sum()/len(df_out)*100:.0f}% fraude)")
 print(f"   Novembro 2025: {len(df_nov)} transações ({df_nov['is_fraud'].sum()/len(df_nov)*100:.0f}% fraude)")
@@ -34,82 +41,48 @@ df = pd.concat([df_out, df_nov], ignore_index=True)
 print(f"   {'─' * 50}")
 print(f"   Total:         {len(df)} transações ({df['is_fraud'].sum()/len(df)*100:.1f}% fraude)")
 
-# Preparar features
-X = df[["valor", "hora", "categoria_cod", "qtd_transacoes_24h"]]
-y = df["is_fraud"]
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+# Preparar features (holdout de 30%, o mesmo usado na calibração da promoção)
+X_train, X_test, y_train, y_test = dividir_holdout(df)
 
 # Configurações (mesmas de antes)
-experimentos = [
-    {"nome": "RandomForest (n=100, depth=10)", "model": RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)},
-    {"nome": "RandomForest (n=200, depth=15)", "model": RandomForestClassifier(n_estimators=200, max_depth=15, random_state=42)},
-    {"nome": "RandomForest (n=500, depth=20)", "model": RandomForestClassifier(n_estimators=500, max_depth=20, random_state=42)},
-    
-    {"nome": "GradientBoosting (n=100, lr=0.1)", "model": GradientBoostingClassifier(n_estimators=100, learning_rate=0.1, random_state=42)},
-    {"nome": "GradientBoosting (n=200, lr=0.05)", "model": GradientBoostingClassifier(n_estimators=200, learning_rate=0.05, random_state=42)},
-    {"nome": "GradientBoosting (n=300, lr=0.1)", "model": GradientBoostingClassifier(n_estimators=300, learning_rate=0.1, random_state=42)},
-    
-    {"nome": "LogisticRegression (C=1.0)", "model": LogisticRegression(C=1.0, max_iter=1000, random_state=42)},
-    {"nome": "LogisticRegression (C=0.1)", "model": LogisticRegression(C=0.1, max_iter=1000, random_state=42)},
-    {"nome": "LogisticRegression (C=10.0)", "model": LogisticRegression(C=10.0, max_iter=1000, random_state=42)},
-]
-
-if HAS_XGBOOST:
-    experimentos.insert(3, {"nome": "XGBoost (n=100, lr=0.1)", "model": XGBClassifier(n_estimators=100, learning_rate=0.1, random_state=42, eval_metric='logloss')})
-    experimentos.insert(4, {"nome": "XGBoost (n=200, lr=0.05)", "model": XGBClassifier(n_estimators=200, learning_rate=0.05, random_state=42, eval_metric='logloss')})
-    experimentos.insert(5, {"nome": "XGBoost (n=300, lr=0.1)", "model": XGBClassifier(n_estimators=300, learning_rate=0.1, random_state=42, eval_metric='logloss')})
+experimentos = grade_padrao()
 
 # Configurar MLflow
 mlflow.set_tracking_uri("file:../mlruns")
-mlflow.set_experiment("deteccao-fraude-retreino-nov-2025")
+experimento = mlflow.set_experiment(EXPERIMENTO)
 
 print("\n🔬 Rodando experimentos...\n")
-resultados = []
-
-for exp in experimentos:
-    with mlflow.start_run(run_name=exp["nome"]):
-        # Treinar
-        model = exp["model"]
-        model.fit(X_train, y_train)
-        
-        # Avaliar
-        y_pred = model.predict(X_test)
-        f1 = f1_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred)
-        recall = recall_score(y_test, y_pred)
-        
-        # Registrar no MLflow
-        mlflow.log_params(model.get_params())
-        mlflow.log_metric("f1_score", f1)
-        mlflow.log_metric("precision", precision)
-        mlflow.log_metric("recall", recall)
-        mlflow.sklearn.log_model(model, "model")
-        
-        resultados.append({
-            "nome": exp["nome"],
-            "f1": f1,
-            "model": model,
-            "run_id": mlflow.active_run().info.run_id
-        })
-        
-        destaque = " ⭐" if f1 == max([r["f1"] for r in resultados]) else ""
-        print(f"✅ {exp['nome']:40} | F1: {f1:.3f}{destaque}")
+if MODO_INCREMENTAL:
+    modelo_producao, metadata_producao = carregar_modelo_ativo()
+    # A base não pode ter visto Novembro: o incremental repetiria essas linhas e o holdout não estaria fora do treino
+    if "novembro" in metadata_producao["data_treino"]:
+        print(f"❌ O modelo de produção ({metadata_producao['versao']}) já foi treinado com Novembro; "
+              f"volte a primária para uma versão treinada só com Outubro (../producao/implantar.py primaria <diretorio>) ou rode sem --incremental")
+        exit(1)
+    try:
+        resultados = comparar_incremental(modelo_producao, metadata_producao, df_out, df_nov)
+    except ValueError as e:
+        print(f"❌ {e}; rode sem --incremental")
+        exit(1)
+elif MODO_BUSCA:
+    resultados = busca_sucessiva(experimento.experiment_id, X_train, X_test, y_train, y_test)
+else:
+    resultados = rodar_experimentos(experimentos, X_train, X_test, y_train, y_test)
 
 # Testar melhor modelo em dados de Novembro
 print("\n" + "=" * 60)
 melhor = max(resultados, key=lambda x: x["f1"])
 print(f"🏆 NOVO VENCEDOR: {melhor['nome']}")
-print(f"   F1 Score (treino): {melhor['f1']:.3f}")
+print(f"   F1 Score ({'30% de Novembro' if MODO_INCREMENTAL else 'treino'}): {melhor['f1']:.3f}"
+      + (f" ± {melhor['f1_cv_std']:.3f} (validação cruzada; holdout {melhor['f1_holdout']:.3f})" if "f1_cv_std" in melhor else ""))
 print(f"   Run ID: {melhor['run_id'][:12]}")
 
-# Validar especificamente em Novembro
-X_nov = df_nov[["valor", "hora", "categoria_cod", "qtd_transacoes_24h"]]
-y_nov = df_nov["is_fraud"]
-y_pred_nov = melhor["model"].predict(X_nov)
-f1_nov = f1_score(y_nov, y_pred_nov)
+# Validar especificamente em Novembro (em blocos, com a matriz de confusão acumulada). É o
+# predict do modelo (limiar 0.5): o limiar calibrado só é escolhido na promoção, no holdout
+f1_nov = avaliar_em_blocos(melhor["model"], iterar_periodo("2025-11")).f1
 
-print(f"\n✅ Validação em dados de Novembro:")
-print(f"   F1 Score: {f1_nov:.3f}")
+print(f"\n✅ Validação em dados de Novembro (mês inteiro, inclui as linhas de treino):")
+print(f"   F1@0.5: {f1_nov:.3f}")
 
 print(f"\n💾 Experimentos salvos no MLflow")
-print(f"\n👉 Próximo passo: Execute '6_promover_v2.py'")
+print(f"\n👉 Próximo passo: Execute '6_promover_v2.py{' --incremental' if MODO_INCREMENTAL else ''}'")
@@ -2,99 +2,180 @@
 6. PROMOVER MODELO v2.0
 
 Promove o modelo retreinado para produção.
+
+Uso:
+    python 6_promover_v2.py                 # v2.0 vira a versão primária
+    python 6_promover_v2.py --canario 0.1   # v2.0 recebe 10% do tráfego; v1.0 segue primária
+    python 6_promover_v2.py --sombra        # v2.0 pontua o mesmo tráfego sem afetar as respostas
+    python 6_promover_v2.py --incremental   # candidatos do '5_retreinar_modelo.py --incremental'
 """
 import mlflow
-import pickle
+import argparse
 import json
+import sys
+import warnings
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from comum.dados import meses_disponiveis
+from comum.orcamento import PODA_TOLERANCIA_F1, imprimir_selecao, podar_no_holdout, selecionar, servico_do_run
+from comum.placar import TOP_K, carregar_modelo_run, melhores_runs, treino_do_run
+from comum.versoes import MODELS_DIR, implantar, ler_ponteiro, registrar_versao
+
+# O perfil pontua o treino com matrizes NumPy; o modelo foi treinado com DataFrame
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+parser = argparse.ArgumentParser(description="Promove o modelo retreinado")
+modo = parser.add_mutually_exclusive_group()
+modo.add_argument("--canario", type=float, metavar="FRACAO", help="fração do tráfego roteada para o v2.0")
+modo.add_argument("--sombra", action="store_true", help="v2.0 em sombra, fora do caminho da resposta")
+parser.add_argument("--incremental", action="store_true",
+                    help="promove do experimento incremental/refit (F1 em 30%% de Novembro, não validação cruzada)")
+args = parser.parse_args()
+
 print("📦 PROMOVENDO MODELO v2.0")
 print("=" * 60)
 
 # Configurar MLflow
 mlflow.set_tracking_uri("file:../mlruns")
 
-# Carregar metadata v1.0
-metadata_v1_path = Path("../producao/metadata.json")
-with open(metadata_v1_path, "r") as f:
-    metadata_v1 = json.load(f)
+# Metadata da versão em produção (v1.0)
+metadata_v1 = ler_ponteiro()
+if (args.canario or args.sombra) and "diretorio" not in metadata_v1:
+    print("❌ Erro: a versão em produção não está no registro de versões; execute '../producao/2_promover_modelo.py'")
+    exit(1)
 
-# Buscar melhor modelo do retreino
-experiment = mlflow.get_experiment_by_name("deteccao-fraude-retreino-nov-2025")
+# Buscar melhor modelo do retreino (cada experimento tem um só critério de F1)
+sufixo = "-incremental" if args.incremental else ""
+experiment = mlflow.get_experiment_by_name("deteccao-fraude-retreino-nov-2025" + sufixo)
+rotulo_f1 = "F1 (30% Nov)" if args.incremental else "F1 (treino)"
 if experiment is None:
-    print("❌ Erro: Execute primeiro '5_retreinar_modelo.py'")
+    print(f"❌ Erro: Execute primeiro '5_retreinar_modelo.py{' --incremental' if args.incremental else ''}'")
     exit(1)
 
-runs = mlflow.search_runs(
-    experiment_ids=[experiment.experiment_id],
-    order_by=["metrics.f1_score DESC"]
-)
+# Candidatos do placar: vence o melhor F1 que cabe no orçamento de latência e memória
+runs = melhores_runs(experiment.experiment_id, k=TOP_K)
 
 if len(runs) == 0:
     print("❌ Nenhum experimento de retreino encontrado")
     exit(1)
 
-melhor_run = runs.iloc[0]
+melhor_run = selecionar(runs)
+imprimir_selecao(runs, melhor_run)
+if melhor_run is None:
+    print("❌ Nenhum modelo cabe no orçamento (ORCAMENTO_P99_MS, ORCAMENTO_LOTE_P99_MS, ORCAMENTO_MB)")
+    exit(1)
 run_id = melhor_run["run_id"]
-f1_v2 = melhor_run["metrics.f1_score"]
-precision_v2 = melhor_run["metrics.precision"]
-recall_v2 = melhor_run["metrics.recall"]
+f1_v2 = melhor_run["metricas"]["f1_score"]
+precision_v2 = melhor_run["metricas"]["precision"]
+recall_v2 = melhor_run["metricas"]["recall"]
 
 print("\n✅ Novo modelo identificado:")
-print(f"   Algoritmo: {melhor_run['tags.mlflow.runName']}")
-print(f"   F1 Score (treino): {f1_v2:.3f}")
+print(f"   Algoritmo: {melhor_run['nome']}")
+print(f"   {rotulo_f1}: {f1_v2:.3f}")
 print(f"   Run ID: {run_id[:12]}")
 
-# Comparação
+# Comparação: volume e taxa de fraude das linhas que o run treinou (parâmetros do run;
+# em runs antigos, sem eles, o índice de meses)
 f1_v1 = metadata_v1["f1_score"]
 melhoria = ((f1_v2 - f1_v1) / f1_v1) * 100
 
+meses_treino = ["2025-10", "2025-11"]
+# Holdout para poda, calibração e limiar: linhas que o candidato não viu. A grade treina no resto
+# do corte de Out+Nov; incremental e refit treinam com Outubro inteiro, e só o corte de Novembro sobra
+meses_holdout = ["2025-11"] if args.incremental else meses_treino
+meses = meses_disponiveis()
+n_v1, taxa_v1 = metadata_v1["n_transacoes_treino"], metadata_v1["taxa_fraude_treino"]
+treino = treino_do_run(melhor_run)
+n_v2, taxa_v2 = treino["n_transacoes_treino"], treino["taxa_fraude_treino"]
+if n_v2 is None:
+    n_v2 = sum(meses[m]["linhas"] for m in meses_treino)
+    taxa_v2 = sum(meses[m]["fraudes"] for m in meses_treino) / n_v2
+
 print(f"\n📊 COMPARAÇÃO v1.0 vs v2.0\n")
 print(f"                      v1.0      v2.0    Melhoria")
 print(f"   {'─' * 50}")
-print(f"   F1 (treino)        {f1_v1:.3f}     {f1_v2:.3f}    {melhoria:+.1f}%")
-print(f"   Dados              2000      4000     +100%")
-print(f"   Taxa fraude        10%       12.5%    Ajustado")
+print(f"   {'F1' if args.incremental else 'F1 (treino)':<18} {f1_v1:.3f}     {f1_v2:.3f}    {melhoria:+.1f}%")
+print(f"   Dados              {n_v1:<9} {n_v2:<8} {(n_v2 - n_v1) / n_v1 * 100:+.0f}%")
+print(f"   Taxa fraude        {f'{taxa_v1 * 100:.3g}%':<9} {f'{taxa_v2 * 100:.3g}%':<8} Ajustado")
+if args.incremental:
+    print(f"   (F1 do v1.0 do seu treino; o do v2.0 em 30% de Novembro, que ele não viu)")
 
 # Carregar modelo
 print(f"\n📥 Carregando modelo do MLflow...")
-model = mlflow.sklearn.load_model(f"runs:/{run_id}/model")
-
-# Salvar
-models_dir = Path("../producao/models")
-model_path = models_dir / "producao.pkl"
-with open(model_path, "wb") as f:
-    pickle.dump(model, f)
-
-print(f"✅ Modelo salvo em: {model_path}")
-
-# Criar metadata v2.0
-metadata_v2 = {
+model, pickle_run = carregar_modelo_run(melhor_run)
+servico, poda = servico_do_run(melhor_run), None
+if PODA_TOLERANCIA_F1 > 0:
+    model, poda = podar_no_holdout(model, meses_holdout)
+    if poda is not None:
+        # O modelo mudou: o pickle do run não serve mais
+        servico, pickle_run = poda.pop("servico"), None
+        print(f"✂️  Poda: {poda['arvores_originais']} → {poda['arvores']} árvores | F1 na parte de poda "
+              f"{poda['f1_poda_original']:.3f} → {poda['f1_poda']:.3f} | p99 {servico['latencia_lote1_p99_ms']:.2f} ms, "
+              f"{servico['tamanho_mb']:.1f} MB")
+    else:
+        print(f"✂️  Poda: nenhuma árvore removível dentro da tolerância de {PODA_TOLERANCIA_F1} no F1")
+
+# Registrar a versão (pickle, artefato em arrays e perfil de treino) em models/<versao>-<run>/
+metadata_v2 = registrar_versao(model, {
     "versao": "v2.0",
     "data_deploy": datetime.now().strftime("%Y-%m-%d"),
     "data_treino": "outubro_novembro_2025",
-    "algoritmo": melhor_run['tags.mlflow.runName'],
+    "algoritmo": melhor_run['nome'],
     "f1_score": float(f1_v2),
     "precision": float(precision_v2),
     "recall": float(recall_v2),
     "run_id": run_id,
-    "n_transacoes_treino": 4000,
-    "taxa_fraude_treino": 0.125,
+    "servico": servico,
+    "poda": poda,
+    "n_transacoes_treino": n_v2,
+    "taxa_fraude_treino": taxa_v2,
     "changelog": [
-        "Retreinado com dados Out+Nov (4000 registros)",
-        "Taxa de fraude ajustada: 12.5%",
+        f"Atualizado de forma incremental com Novembro ({n_v2 - n_v1} registros novos; {n_v2} no total)"
+        if treino["modo"] == "incremental"
+        else f"Retreinado com dados Out+Nov ({n_v2} registros)",
+        f"Taxa de fraude ajustada: {taxa_v2 * 100:.3g}%",
         "Novos padrões incorporados",
         f"Performance: {melhoria:+.1f}% vs v1.0"
     ]
-}
-
-metadata_path = Path("../producao/metadata.json")
-with open(metadata_path, "w") as f:
-    json.dump(metadata_v2, f, indent=2)
+}, meses_treino, pickle_origem=pickle_run, meses_holdout=meses_holdout)
+
+print(f"✅ Versão registrada em: {MODELS_DIR.name}/{metadata_v2['diretorio']}")
+if metadata_v2["artefato"]:
+    print(f"   Artefato {metadata_v2['tipo_artefato']}: {metadata_v2['artefato']}")
+print(f"   Perfil de treino: {metadata_v2['perfil']} | treino do run: {metadata_v2['n_transacoes_treino']} transações")
+
+# Calibração e limiar escolhidos no holdout (a API decide só com predict_proba e este limiar)
+holdout = metadata_v2["holdout"]
+if metadata_v2["calibracao"]:
+    c = metadata_v2["calibracao"]
+    print(f"   Calibração {c['metodo']}: Brier {c['brier_antes']:.4f} → {c['brier_depois']:.4f}")
+elif metadata_v2["calibracao_descartada"]:
+    c = metadata_v2["calibracao_descartada"]
+    print(f"   Calibração {c['metodo']} descartada: Brier {c['brier_antes']:.4f} → {c['brier_depois']:.4f} (não melhorou)")
+print(f"   Holdout de {', '.join(holdout['meses'])}, fora do treino: {holdout['n_calibracao']} transações para calibrar, "
+      f"{holdout['n']} para avaliar")
+print(f"   Limiar ({holdout['criterio']}, {holdout['cortes_avaliados']} cortes): {holdout['limiar']:.3f} | "
+      f"F1 holdout {holdout['f1_limiar_padrao']:.3f} (0.5) → {holdout['f1']:.3f}")
+
+# Troca atômica do ponteiro (metadata.json)
+sombra_atual = metadata_v1.get("sombra", {}).get("diretorio")
+if args.canario:
+    implantar(metadata_v1["diretorio"], canario=metadata_v2["diretorio"], fracao_canario=args.canario, sombra=sombra_atual)
+    print(f"🐤 Canário: v2.0 recebe {args.canario * 100:.0f}% do tráfego (primária: {metadata_v1['versao']})")
+elif args.sombra:
+    canario_atual = metadata_v1.get("canario", {})
+    implantar(metadata_v1["diretorio"], canario=canario_atual.get("diretorio"),
+              fracao_canario=canario_atual.get("fracao", 0.0), sombra=metadata_v2["diretorio"])
+    print(f"👥 Sombra: v2.0 pontua o tráfego da {metadata_v1['versao']} sem afetar as respostas")
+else:
+    implantar(metadata_v2["diretorio"])
 
 print(f"\n✅ Metadata atualizada:")
 print(json.dumps(metadata_v2, indent=2))
 
 print(f"\n🚀 Modelo v2.0 pronto para deploy!")
-print(f"\n👉 Reinicie a API: 'python ../producao/3_iniciar_api.py'")
+if args.canario or args.sombra:
+    print(f"   Para torná-lo primário: python ../producao/implantar.py primaria {metadata_v2['diretorio']}")
+print(f"\n👉 A API em execução recarrega o novo modelo automaticamente (sem reiniciar)")
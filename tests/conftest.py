@@ -0,0 +1,18 @@
+"""Configuração comum dos testes: raiz do projeto no sys.path e dados de Outubro."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+@pytest.fixture(scope="session")
+def outubro():
+    """(X, y) de dados/outubro_2025.csv com as FEATURES do modelo"""
+    from comum.features import FEATURES
+
+    df = pd.read_csv(RAIZ / "dados" / "outubro_2025.csv")
+    return df[FEATURES], df["is_fraud"]
@@ -0,0 +1,33 @@
+"""Paridade do motor de árvores compilado com o predict_proba dos estimadores."""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from comum.arvores import compilar
+
+TOLERANCIA = 1e-5
+
+
+def _xgboost():
+    xgboost = pytest.importorskip("xgboost")
+    return xgboost.XGBClassifier(n_estimators=50, learning_rate=0.1, random_state=42, eval_metric="logloss")
+
+
+MODELOS = {
+    "random_forest": lambda: RandomForestClassifier(n_estimators=50, max_depth=10, random_state=42),
+    "gradient_boosting_log_loss": lambda: GradientBoostingClassifier(n_estimators=50, random_state=42),
+    "gradient_boosting_exponential": lambda: GradientBoostingClassifier(
+        n_estimators=50, loss="exponential", random_state=42),
+    "xgboost": _xgboost,
+}
+
+
+@pytest.mark.parametrize("nome", list(MODELOS))
+def test_paridade_predict_proba(nome, outubro):
+    X, y = outubro
+    modelo = MODELOS[nome]().fit(X, y)
+    motor = compilar(modelo)
+
+    esperado = modelo.predict_proba(X)[:, 1]
+    obtido = motor.predict_proba(X.to_numpy())[:, 1]
+    assert np.abs(esperado - obtido).max() <= TOLERANCIA
@@ -0,0 +1,12 @@
+from comum.cache import CacheResultados
+
+
+def test_regravar_entrada_a_torna_a_mais_recente():
+    cache = CacheResultados(capacidade=2, ttl_s=60)
+    cache.guardar(["a", "b"], [0.1, 0.2])
+    cache.guardar(["a"], [0.1])
+    cache.guardar(["c"], [0.3])
+
+    # "b" era a menos recente depois de "a" ser regravada
+    assert list(cache._itens) == ["a", "c"]
+    assert cache.expulsoes == 1
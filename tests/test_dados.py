@@ -0,0 +1,28 @@
+import pandas as pd
+
+from comum import dados
+
+
+def test_cache_colunar_preserva_ids_nao_ascii(tmp_path, monkeypatch):
+    monkeypatch.setattr(dados, "CACHE_DIR", tmp_path / ".cache")
+    df = pd.read_csv(dados.DADOS_DIR / "outubro_2025.csv").head(20)
+    df.loc[0, "transaction_id"] = "TX-ação-001"
+    df.loc[1, "transaction_id"] = "TX-日本-002"
+    df.to_csv(tmp_path / "outubro_2025.csv", index=False)
+
+    carregado = dados.carregar_periodo("2025-10", diretorio=tmp_path)
+
+    assert carregado["transaction_id"].tolist() == df["transaction_id"].tolist()
+
+
+def test_partes_do_holdout_sao_disjuntas():
+    _, X_holdout, _, _ = dados.dividir_holdout(dados.carregar_periodo("2025-10"))
+
+    partes = dados.partes_holdout(["2025-10"])
+    assert set(partes) == {"calibracao", "avaliacao"}
+    com_poda = dados.partes_holdout(["2025-10"], poda=True)
+
+    # A avaliação não muda com a poda; a parte da poda sai da calibração
+    assert com_poda["avaliacao"][0].index.equals(partes["avaliacao"][0].index)
+    indices = [set(X.index) for X, _ in com_poda.values()]
+    assert sum(len(i) for i in indices) == len(set().union(*indices)) == len(X_holdout)
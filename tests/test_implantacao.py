@@ -0,0 +1,55 @@
+import numpy as np
+
+from comum.implantacao import AvaliadorSombra
+
+
+class _Codificador:
+    features = ["valor"]
+    dtype = np.float32
+
+
+class _Sombra:
+    versao = "v2.0"
+    codificador = _Codificador()
+    limiar = 0.5
+
+    def __init__(self, identificador, falha=False):
+        self.identificador = identificador
+        self.falha = falha
+
+    def predict_proba(self, X):
+        if self.falha:
+            raise RuntimeError("modelo quebrado")
+        return np.c_[1 - X[:, 0], X[:, 0]]
+
+
+def _registrar(avaliador, sombra):
+    matriz = np.array([[0.7]], dtype=np.float32)
+    avaliador.registrar(sombra, _Codificador(), None, matriz, np.array([0.6]), np.array([True]))
+
+
+def test_lote_com_erro_nao_interrompe_a_sombra():
+    avaliador = AvaliadorSombra()
+    avaliador._thread = object()
+    _registrar(avaliador, _Sombra("v2.0-aaaa", falha=True))
+    _registrar(avaliador, _Sombra("v2.0-aaaa"))
+
+    avaliador.processar()
+
+    estatisticas = avaliador.estatisticas()
+    assert estatisticas["erros"] == 1
+    assert estatisticas["ultimo_erro"] == "RuntimeError: modelo quebrado"
+    assert estatisticas["versoes"]["v2.0-aaaa"]["lotes"] == 1
+
+
+def test_builds_com_o_mesmo_rotulo_ficam_separados():
+    avaliador = AvaliadorSombra()
+    avaliador._thread = object()
+    _registrar(avaliador, _Sombra("v2.0-aaaa"))
+    _registrar(avaliador, _Sombra("v2.0-bbbb"))
+
+    avaliador.processar()
+
+    versoes = avaliador.estatisticas()["versoes"]
+    assert set(versoes) == {"v2.0-aaaa", "v2.0-bbbb"}
+    assert all(v["versao"] == "v2.0" and v["lotes"] == 1 for v in versoes.values())
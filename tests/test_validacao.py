@@ -0,0 +1,39 @@
+import numpy as np
+
+from comum.validacao import FoldsCompartilhados, atribuir_folds, quantizar
+
+
+def _dados(n=1000, semente=0):
+    rng = np.random.default_rng(semente)
+    X = np.c_[rng.lognormal(5, 1, n), rng.integers(0, 24, n)].astype(np.float32)
+    y = (rng.random(n) < 0.1).astype(np.int8)
+    return X, y
+
+
+def test_quantizar_usa_so_as_linhas_de_treino():
+    X, _ = _dados()
+    treino = slice(200, None)
+    alterado = X.copy()
+    alterado[:200, 0] *= 1000
+
+    # Linhas fora do treino não mudam as bordas nem as médias dos bins
+    assert np.array_equal(quantizar(X, treino=treino)[200:], quantizar(alterado, treino=treino)[200:])
+    assert len(np.unique(quantizar(X, treino=treino)[:, 0])) <= 256
+
+
+def test_fold_de_teste_nao_influencia_o_treino():
+    X, y = _dados()
+    folds = atribuir_folds(y, 5)
+    alterado = X.copy()
+    alterado[folds == 0, 0] *= 1000
+
+    cv, cv_alterado = FoldsCompartilhados.criar(X, y, 5), FoldsCompartilhados.criar(alterado, y, 5)
+    try:
+        X_treino, y_treino, X_teste, y_teste = cv.fold(0)
+        assert np.array_equal(X_treino, cv_alterado.fold(0)[0])
+        # Linhas e rótulos continuam alinhados (a hora não é quantizada)
+        assert sorted(zip(X_teste[:, 1], y_teste)) == sorted(zip(X[folds == 0, 1], y[folds == 0]))
+        assert sorted(zip(X_treino[:, 1], y_treino)) == sorted(zip(X[folds != 0, 1], y[folds != 0]))
+    finally:
+        cv.fechar()
+        cv_alterado.fechar()
@@ -0,0 +1,36 @@
+import itertools
+
+from comum.velocidade import ContadorVelocidade, hash_chave
+
+
+def _mesma_posicao(contador):
+    """Duas chaves cuja sondagem começa na mesma linha"""
+    vistas = {}
+    for i in itertools.count():
+        chave = f"cliente-{i}"
+        inicio = hash_chave(chave) & contador.mascara
+        if inicio in vistas:
+            return vistas[inicio], chave
+        vistas[inicio] = chave
+
+
+def test_linha_expirada_antes_da_chave_nao_conta_como_reaproveitada():
+    contador = ContadorVelocidade(capacidade=16)
+    primeira, segunda = _mesma_posicao(contador)
+    contador.registrar_lote([primeira, segunda], instante=0)
+
+    # As duas linhas expiraram; a sondagem da segunda passa pela da primeira antes de achá-la
+    contador.registrar_lote([segunda], instante=10**6)
+
+    assert contador.novos == 2
+    assert contador.reaproveitados == 0
+
+
+def test_linha_expirada_ocupada_conta_como_reaproveitada():
+    contador = ContadorVelocidade(capacidade=16)
+    primeira, segunda = _mesma_posicao(contador)
+    contador.registrar_lote([primeira], instante=0)
+    contador.registrar_lote([segunda], instante=10**6)
+
+    assert contador.novos == 1
+    assert contador.reaproveitados == 1
@@ -0,0 +1,58 @@
+import json
+import warnings
+
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+
+from comum.dados import carregar_periodo, dividir_holdout
+from comum.orcamento import truncar
+from comum.versoes import registrar_versao
+
+MESES = ["2025-10"]
+
+
+@pytest.fixture(scope="module")
+def modelo():
+    X_treino, _, y_treino, _ = dividir_holdout(carregar_periodo(*MESES))
+    return GradientBoostingClassifier(n_estimators=20, random_state=42).fit(X_treino, y_treino)
+
+
+def _metadata(**extras):
+    return {"versao": "v1.0", "run_id": "0123456789abcdef", "algoritmo": "GradientBoosting (n=20)",
+            "f1_score": 0.9, "precision": 0.9, "recall": 0.9, **extras}
+
+
+@pytest.fixture(autouse=True)
+def _sem_avisos_de_features():
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        yield
+
+
+def test_nova_promocao_nunca_reaproveita_o_diretorio(modelo, tmp_path):
+    primeira = registrar_versao(modelo, _metadata(), MESES, models_dir=tmp_path)
+    conteudo = (tmp_path / primeira["diretorio"] / "metadata.json").read_text()
+    segunda = registrar_versao(modelo, _metadata(), MESES, models_dir=tmp_path)
+
+    assert primeira["diretorio"] == "v1.0-01234567"
+    assert segunda["diretorio"] == "v1.0-01234567-2"
+    assert (tmp_path / primeira["diretorio"] / "metadata.json").read_text() == conteudo
+
+
+def test_calibracao_e_avaliacao_em_metades_do_holdout(modelo, tmp_path):
+    metadata = registrar_versao(modelo, _metadata(), MESES, models_dir=tmp_path)
+
+    _, X_holdout, _, _ = dividir_holdout(carregar_periodo(*MESES))
+    assert metadata["holdout"]["n"] + metadata["holdout"]["n_calibracao"] == len(X_holdout)
+
+
+def test_modelo_podado_tem_diretorio_e_f1_proprios(modelo, tmp_path):
+    poda = {"arvores": 10, "arvores_originais": 20, "f1_poda": 1.0, "f1_poda_original": 1.0, "tolerancia": 0.01}
+    metadata = registrar_versao(truncar(modelo, 10), _metadata(poda=poda), MESES, models_dir=tmp_path)
+
+    assert metadata["diretorio"] == "v1.0-01234567-poda10"
+    assert metadata["f1_score"] == metadata["holdout"]["f1"]
+    assert metadata["algoritmo"] == "GradientBoosting (n=20) (podado: 10 árvores)"
+    assert metadata["poda"]["f1_score_run"] == 0.9
+    with open(tmp_path / metadata["diretorio"] / "metadata.json") as f:
+        assert json.load(f)["poda"]["algoritmo_run"] == "GradientBoosting (n=20)"